@@ -106,6 +106,22 @@ class Component:
     def rerun_thermal(cls, net, branch_pit, node_pit, idx_lookups, options):
         return False
 
+    @classmethod
+    def protect_initial_values(cls, net, protected):
+        """
+        Function which marks the entries of the internal structure whose initial values are given
+        by the component input (e.g. controlled mass flows) and must therefore not be overwritten
+        by a warm start.
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :param protected: dictionary with boolean masks for (pit_type, column) tuples, e.g. \
+            ("branch", MDOTINIT)
+        :type protected: dict
+        :return: No Output.
+        """
+        pass
+
     @classmethod
     def create_node_lookups(cls, net, ft_lookups, table_lookup, idx_lookups, current_start,
                             current_table, internals):
@@ -118,6 +118,12 @@ class CirculationPump(BranchWOInternalsComponent):
         circ_pump_pit[~mask_t, TOUTINIT] = node_pit[to_nodes[~mask_t], TINIT]
         return circ_pump_pit
 
+    @classmethod
+    def protect_initial_values(cls, net, protected):
+        f, t = get_lookup(net, "branch", "from_to")[cls.table_name()]
+        protected[("branch", TOUTINIT)][f:t] |= np.isin(net[cls.table_name()].type.values,
+                                                          ["pt", "t"])
+
     @classmethod
     def adaption_after_derivatives_hydraulic(cls, net,
                                              branch_pit, node_pit,
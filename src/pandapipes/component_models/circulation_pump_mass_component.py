@@ -8,6 +8,7 @@ from pandapipes.component_models.abstract_models.circulation_pump import Circula
 from pandapipes.component_models.junction_component import Junction
 from pandapipes.idx_branch import JAC_DERIV_DP, JAC_DERIV_DP1, JAC_DERIV_DM, MDOTINIT, \
     LOAD_VEC_BRANCHES
+from pandapipes.pf.pipeflow_setup import get_lookup
 
 try:
     import pandaplan.core.pplog as logging
@@ -52,6 +53,12 @@ class CirculationPumpMass(CirculationPump):
         circ_pump_pit = super().create_pit_branch_entries(net, branch_pit)
         circ_pump_pit[:, MDOTINIT] = net[cls.table_name()].mdot_flow_kg_per_s.values
 
+    @classmethod
+    def protect_initial_values(cls, net, protected):
+        super().protect_initial_values(net, protected)
+        f, t = get_lookup(net, "branch", "from_to")[cls.table_name()]
+        protected[("branch", MDOTINIT)][f:t] = True
+
     @classmethod
     def adaption_after_derivatives_hydraulic(cls, net,
                                              branch_pit, node_pit,
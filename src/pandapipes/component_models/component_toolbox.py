@@ -92,13 +92,15 @@ def init_results_element(net, element, output, all_float):
     :return: No Output.
     """
     res_element = "res_" + element
+    # results are only stored with the given dtype, the pipeflow is always calculated in float64
+    res_dtype = net.get("_options", dict()).get("result_dtype", "float64")
     if all_float:
         net[res_element] = pd.DataFrame(np.nan, columns=output, index=net[element].index,
-                                        dtype=np.float64)
+                                        dtype=res_dtype)
     else:
         net[res_element] = pd.DataFrame(np.zeros(0, dtype=output), index=[])
         net[res_element] = pd.DataFrame(np.nan, index=net[element].index,
-                                        columns=net[res_element].columns)
+                                        columns=net[res_element].columns, dtype=res_dtype)
 
 
 def add_new_component(net, component, overwrite=False):
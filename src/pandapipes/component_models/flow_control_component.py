@@ -12,6 +12,7 @@ from pandapipes.component_models.component_toolbox import \
 from pandapipes.component_models.junction_component import Junction
 from pandapipes.idx_branch import (JAC_DERIV_DP, JAC_DERIV_DP1, JAC_DERIV_DM, MDOTINIT, LOAD_VEC_BRANCHES,
                                    FLOW_RETURN_CONNECT)
+from pandapipes.pf.pipeflow_setup import get_lookup
 from pandapipes.pf.result_extraction import extract_branch_results_without_internals
 
 
@@ -53,6 +54,12 @@ class FlowControlComponent(BranchWOInternalsComponent):
         fc_branch_pit[:, MDOTINIT] = net[cls.table_name()].controlled_mdot_kg_per_s.values
         fc_branch_pit[net[cls.table_name()].control_active, FLOW_RETURN_CONNECT] = True
 
+    @classmethod
+    def protect_initial_values(cls, net, protected):
+        # the controlled mass flow is the initial value and is not changed in the iteration
+        f, t = get_lookup(net, "branch", "from_to")[cls.table_name()]
+        protected[("branch", MDOTINIT)][f:t] |= net[cls.table_name()].control_active.values
+
     @classmethod
     def create_component_array(cls, net, component_pits):
         """
@@ -86,6 +86,13 @@ class HeatConsumer(BranchWOInternalsComponent):
                     %net[cls.table_name()].index[mask_q0])
         return hc_pit
 
+    @classmethod
+    def protect_initial_values(cls, net, protected):
+        f, t = get_lookup(net, "branch", "from_to")[cls.table_name()]
+        protected[("branch", MDOTINIT)][f:t] |= \
+            ~np.isnan(net[cls.table_name()].controlled_mdot_kg_per_s.values)
+        protected[("branch", TOUTINIT)][f:t] |= ~np.isnan(net[cls.table_name()].treturn_k.values)
+
     @classmethod
     def create_component_array(cls, net, component_pits):
         """
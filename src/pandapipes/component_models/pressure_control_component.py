@@ -75,6 +75,15 @@ class PressureControlComponent(BranchWOInternalsComponent):
         index_pc = junction_idx_lookups[juncts]
         node_pit[index_pc, PINIT] = press
 
+    @classmethod
+    def protect_initial_values(cls, net, protected):
+        pcs = net[cls.table_name()]
+        controlled = pcs.control_active.values & pcs.in_service.values
+        junction_idx_lookups = get_lookup(net, "node", "index")[
+            cls.get_connected_node_type().table_name()]
+        protected[("node", PINIT)][junction_idx_lookups[pcs['controlled_junction'].values[
+            controlled]]] = True
+
     @classmethod
     def create_pit_branch_entries(cls, net, branch_pit):
         """
@@ -2,8 +2,6 @@
 # and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
-from operator import itemgetter
-
 import numpy as np
 from numpy import dtype
 
@@ -34,8 +32,10 @@ class Pump(BranchWOInternalsComponent):
 
     """
     STD_TYPE = 0
+    CUSTOM_CURVE = 1
+    REG_PAR = 2
 
-    internal_cols = 1
+    internal_cols = 2
 
     @classmethod
     def from_to_node_cols(cls):
@@ -82,12 +82,32 @@ class Pump(BranchWOInternalsComponent):
         """
         tbl = net[cls.table_name()]
         if len(tbl):
-            pump_array = np.zeros(shape=(len(tbl), cls.internal_cols), dtype=np.float64)
-
+            from pandapipes.std_types.std_type_class import PumpStdType
             std_types_lookup = get_std_type_lookup(net, cls.table_name())
             std_type, pos = np.where(net[cls.table_name()]['std_type'].values
                                      == std_types_lookup[:, np.newaxis])
+            std_types = [net['std_types']['pump'][st] for st in std_types_lookup]
+
+            # std types that override get_pressure are evaluated with their own method, all others
+            # are evaluated from their regression parameters
+            custom_curve = np.array([type(st).get_pressure is not PumpStdType.get_pressure
+                                     for st in std_types], dtype=bool)
+
+            # the regression parameters of all std types are stacked (highest order first) and
+            # padded with leading zeros, so that all curves can be evaluated at once
+            reg_pars = [np.zeros(0) if custom
+                        else np.atleast_1d(np.asarray(st.reg_par, dtype=np.float64))
+                        for st, custom in zip(std_types, custom_curve)]
+            n_reg_par = max(len(rp) for rp in reg_pars)
+            stacked_reg_pars = np.zeros((len(reg_pars), n_reg_par), dtype=np.float64)
+            for i, rp in enumerate(reg_pars):
+                stacked_reg_pars[i, n_reg_par - len(rp):] = rp
+
+            pump_array = np.zeros(shape=(len(tbl), cls.internal_cols + n_reg_par),
+                                  dtype=np.float64)
             pump_array[pos, cls.STD_TYPE] = std_type
+            pump_array[pos, cls.CUSTOM_CURVE] = custom_curve[std_type]
+            pump_array[pos, cls.REG_PAR:] = stacked_reg_pars[std_type]
             component_pits[cls.table_name()] = pump_array
 
     @classmethod
@@ -102,8 +122,6 @@ class Pump(BranchWOInternalsComponent):
             area = pump_branch_pit[:, AREA]
 
             pump_array = get_component_array(net, cls.table_name())
-            idx = pump_array[:, cls.STD_TYPE].astype(np.int32)
-            std_types = get_std_type_lookup(net, cls.table_name())[idx]
 
             from_nodes = pump_branch_pit[:, FROM_NODE].astype(np.int32)
             # to_nodes = pump_branch_pit[:, TO_NODE].astype(np.int32)
@@ -121,11 +139,21 @@ class Pump(BranchWOInternalsComponent):
             else:
                 v_from = v_mps
             vol = v_from * area
-            if len(std_types):
-                fcts = itemgetter(*std_types)(net['std_types']['pump'])
-                fcts = [fcts] if not isinstance(fcts, tuple) else fcts
-                pl = np.array(list(map(lambda x, y: x.get_pressure(y), fcts, vol)))
-                pump_branch_pit[:, PL] = pl
+            # evaluate the regression polynomials (c.f. PumpStdType.get_pressure, volume flow in
+            # m^3/h) of all pumps with Horner's scheme
+            vol_h = vol * 3600
+            pl = np.zeros_like(vol)
+            for reg_par in pump_array[:, cls.REG_PAR:].T:
+                pl = pl * vol_h + reg_par
+            # no reverse flow and no negative pressure lift - bypassing is assumed
+            pump_branch_pit[:, PL] = np.where(vol < 0, 0., np.fmax(pl, 0.))
+
+            custom = np.flatnonzero(pump_array[:, cls.CUSTOM_CURVE])
+            if len(custom):
+                idx = pump_array[custom, cls.STD_TYPE].astype(np.int32)
+                std_types = get_std_type_lookup(net, cls.table_name())[idx]
+                pump_branch_pit[custom, PL] = [net['std_types']['pump'][st].get_pressure(v)
+                                               for st, v in zip(std_types, vol[custom])]
 
     @classmethod
     def extract_results(cls, net, options, branch_results, mode):
@@ -3,3 +3,8 @@
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
 from pandapipes.control.run_control import run_control
+from pandapipes.control.controller.bulk_profile_control import BulkProfileControl, \
+    merge_const_controls
+from pandapipes.control.controller.setpoint_control import BulkSetpointControl, \
+    PressureBandControl, FlowBandControl, ReturnTemperatureControl, MassStorageLimitControl, \
+    MassStorageIntegrationControl
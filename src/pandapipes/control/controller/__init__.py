@@ -0,0 +1,9 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+from pandapipes.control.controller.bulk_profile_control import BulkProfileControl, \
+    merge_const_controls
+from pandapipes.control.controller.setpoint_control import BulkSetpointControl, \
+    PressureBandControl, FlowBandControl, ReturnTemperatureControl, MassStorageLimitControl, \
+    MassStorageIntegrationControl
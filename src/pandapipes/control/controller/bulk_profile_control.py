@@ -0,0 +1,166 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import numpy as np
+import pandas as pd
+from pandapower.control import ConstControl
+from pandapower.control.basic_controller import Controller
+from pandapower.timeseries import DFData
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BulkProfileControl(Controller):
+    """
+    A controller that writes the profile values of all profile driven columns of the net in each
+    time step, e.g. the mass flows of thousands of sinks.
+
+    In contrast to one ConstControl per element group, the profiles of each (table, column) are
+    stored in one 2-D array with one row per time step and one column per element, and the values
+    of a time step are written with one vectorized assignment per (table, column). As only one
+    controller is registered, the dispatch overhead of the control loop does not grow with the
+    number of profiled element groups.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param profiles: The profiles as dictionary with (table, column) as keys and either \
+            DataFrames (time steps as index, element indices as columns) or 2-D arrays of shape \
+            (n_time_steps, n_elements) as values
+    :type profiles: dict
+    :param time_steps: The time steps of the rows of profiles given as arrays. If None, the rows \
+            are the time steps 0, 1, 2, ...
+    :type time_steps: list, default None
+    :param element_index: The element indices of the columns of profiles given as arrays as \
+            dictionary with (table, column) as keys. If an entry is missing, the columns are all \
+            elements of the table in the order of the table.
+    :type element_index: dict, default None
+    :param scale_factor: Scaling factor for all profile values
+    :type scale_factor: float, default 1.0
+    :param in_service: Indicates if the controller is currently in_service
+    :type in_service: bool, default True
+    :param order: Within the same level, controllers with lower order are called first
+    :type order: real, default -1
+    :param level: Level to which the controller belongs. Low level is called before higher level.
+    :type level: real, default -1
+    :param drop_same_existing_ctrl: Indicates if already existing controllers of the same type \
+            should be dropped
+    :type drop_same_existing_ctrl: bool, default False
+    :param initial_run: Whether a pipeflow should be run before the control step is applied
+    :type initial_run: bool, default False
+    """
+
+    def __init__(self, net, profiles, time_steps=None, element_index=None, scale_factor=1.0,
+                 in_service=True, order=-1, level=-1, drop_same_existing_ctrl=False,
+                 initial_run=False):
+        super().__init__(net, in_service=in_service, recycle=False, order=order, level=level,
+                         drop_same_existing_ctrl=drop_same_existing_ctrl, initial_run=initial_run)
+        element_index = dict() if element_index is None else element_index
+        self.scale_factor = scale_factor
+        self.profiles = dict()
+        self.time_step_rows = dict()
+        self.positions = dict()
+        for (table, column), profile in profiles.items():
+            if table not in net or column not in net[table]:
+                raise UserWarning("The column %s of table %s does not exist in the net."
+                                  % (column, table))
+            if isinstance(profile, pd.DataFrame):
+                steps, elements, values = profile.index, profile.columns, profile.values
+            else:
+                values = np.atleast_2d(profile)
+                steps = range(len(values)) if time_steps is None else time_steps
+                elements = element_index.get((table, column), net[table].index)
+            values = np.asarray(values)
+            if values.shape != (len(steps), len(elements)):
+                raise UserWarning("The profiles of %s.%s have the shape %s instead of (%d, %d) "
+                                  "(time steps, elements)." % (table, column, values.shape,
+                                                               len(steps), len(elements)))
+            positions = net[table].index.get_indexer(pd.Index(elements))
+            if np.any(positions < 0):
+                raise UserWarning("The elements %s of table %s do not exist in the net."
+                                  % (np.asarray(elements)[positions < 0], table))
+            if len(positions) == len(net[table]) \
+                    and np.array_equal(positions, np.arange(len(positions))):
+                positions = None
+            self.profiles[(table, column)] = values
+            self.time_step_rows[(table, column)] = {t: row for row, t in enumerate(steps)}
+            self.positions[(table, column)] = positions
+        self.applied = False
+
+    def time_step(self, net, time):
+        """
+        Writes the profile values of the given time step to the net.
+        """
+        self.applied = False
+        for (table, column), values in self.profiles.items():
+            row_values = values[self.time_step_rows[(table, column)][time]]
+            if np.issubdtype(row_values.dtype, np.number):
+                row_values = row_values * self.scale_factor
+            positions = self.positions[(table, column)]
+            if positions is None:
+                net[table][column] = row_values
+            else:
+                column_values = net[table][column].to_numpy(copy=True)
+                column_values[positions] = row_values
+                net[table][column] = column_values
+
+    def is_converged(self, net):
+        return self.applied
+
+    def control_step(self, net):
+        self.applied = True
+
+    def __str__(self):
+        return super().__str__() + " [%s]" % ", ".join(
+            "%s.%s" % table_column for table_column in self.profiles)
+
+
+def merge_const_controls(net, drop=True, **kwargs):
+    """
+    Replaces all ConstControl controllers of the net that read their profiles from a DFData data \
+    source by one BulkProfileControl with the same profiles.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param drop: If True, the merged ConstControl controllers are removed, otherwise they are only \
+            set out of service
+    :type drop: bool, default True
+    :param kwargs: Additional keyword arguments for the BulkProfileControl
+    :type kwargs: dict
+    :return: ctrl - The BulkProfileControl (None if no ConstControl could be merged)
+    :rtype: BulkProfileControl
+    """
+    profiles = dict()
+    merged = list()
+    for idx, ctrl in net.controller.object.items():
+        if type(ctrl) is not ConstControl or not net.controller.at[idx, "in_service"] \
+                or not isinstance(ctrl.data_source, DFData) or ctrl.profile_name is None \
+                or ctrl.write_flag == "object":
+            continue
+        element_index = np.atleast_1d(ctrl.element_index)
+        profile_name = np.atleast_1d(ctrl.profile_name)
+        profile = ctrl.data_source.df.loc[:, profile_name]
+        if np.issubdtype(profile.values.dtype, np.number):
+            profile = profile * ctrl.scale_factor
+        profile.columns = element_index
+        profiles.setdefault((ctrl.element, ctrl.variable), list()).append(profile)
+        merged.append(idx)
+    if not merged:
+        logger.info("The net contains no ConstControl with a DFData data source that can be "
+                    "merged.")
+        return None
+    profiles = {key: pd.concat(dfs, axis=1) for key, dfs in profiles.items()}
+    for key, profile in profiles.items():
+        if profile.columns.has_duplicates:
+            raise UserWarning("Some elements of %s.%s are controlled by several ConstControls."
+                              % key)
+    if drop:
+        net.controller.drop(merged, inplace=True)
+    else:
+        net.controller.loc[merged, "in_service"] = False
+    return BulkProfileControl(net, profiles, **kwargs)
@@ -0,0 +1,551 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import numpy as np
+import pandas as pd
+from pandapower.control.basic_controller import Controller
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _get_positions(net, table, index):
+    index = net[table].index if index is None else pd.Index(np.atleast_1d(index))
+    positions = net[table].index.get_indexer(index)
+    if np.any(positions < 0):
+        raise UserWarning("The elements %s of table %s do not exist in the net."
+                          % (np.asarray(index)[positions < 0], table))
+    return positions
+
+
+def _broadcast(values, n, name):
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 0:
+        return np.full(n, float(values))
+    if values.shape != (n,):
+        raise UserWarning("%s has to be a scalar or an array with %d entries." % (name, n))
+    return values.copy()
+
+
+class BulkSetpointControl(Controller):
+    """
+    Base class of vectorized controllers that adapt a set point column of many elements at once,
+    so that a measured result of each element (e.g. the pressure at a junction) stays within a band
+    [lower, upper].
+
+    The measured results are read from the result tables with one vectorized read per control
+    step, and the new set points are written with one assignment to the set point column. In each
+    control step, the set point u of each element with a measured value y outside of its band is
+    changed by du = (y_band - y) / s, where y_band is the violated band limit and s is the
+    sensitivity dy/du. The sensitivity of each element starts with the given value and is
+    updated with the secant of the last two control steps of the same time step. The set points are limited to
+    [min_setpoint, max_setpoint] and the change per control step to max_step.
+
+    The controller is converged if all measured values are within their band (up to the tolerance
+    *tol*), or if their set points are at the limit in the required direction. Elements without
+    result (e.g. out of service or not connected) are ignored.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param element: The table of the controlled elements, e.g. "press_control"
+    :type element: str
+    :param variable: The set point column, e.g. "controlled_p_bar"
+    :type variable: str
+    :param element_index: The indices of the controlled elements (None for all elements)
+    :type element_index: iterable
+    :param measurement_table: The result table of the measured values, e.g. "res_junction"
+    :type measurement_table: str
+    :param measurement_column: The column of the measured values, e.g. "p_bar"
+    :type measurement_column: str
+    :param measurement_index: The indices of the measured elements, one for each controlled \
+            element (None for the controlled elements themselves)
+    :type measurement_index: iterable, default None
+    :param lower: The lower limit(s) of the band
+    :type lower: float or iterable, default -inf
+    :param upper: The upper limit(s) of the band
+    :type upper: float or iterable, default inf
+    :param sensitivity: The initial sensitivity dy/du of the measured values to the set points
+    :type sensitivity: float or iterable, default 1.
+    :param min_setpoint: The minimum set point(s)
+    :type min_setpoint: float or iterable, default -inf
+    :param max_setpoint: The maximum set point(s)
+    :type max_setpoint: float or iterable, default inf
+    :param max_step: The maximum change of the set points in one control step
+    :type max_step: float, default inf
+    :param tol: The tolerance of the band limits
+    :type tol: float, default 1e-4
+    :param name: The name of the controller
+    :type name: str, default None
+    :param in_service: Indicates if the controller is currently in_service
+    :type in_service: bool, default True
+    :param order: Within the same level, controllers with lower order are called first
+    :type order: real, default 0
+    :param level: Level to which the controller belongs. Low level is called before higher level.
+    :type level: real, default 0
+    :param drop_same_existing_ctrl: Indicates if already existing controllers of the same type \
+            should be dropped
+    :type drop_same_existing_ctrl: bool, default False
+    :param initial_run: Whether a pipeflow should be run before the control step is applied
+    :type initial_run: bool, default True
+    """
+
+    def __init__(self, net, element, variable, element_index, measurement_table,
+                 measurement_column, measurement_index=None, lower=-np.inf, upper=np.inf,
+                 sensitivity=1., min_setpoint=-np.inf, max_setpoint=np.inf, max_step=np.inf,
+                 tol=1e-4, name=None, in_service=True, order=0, level=0,
+                 drop_same_existing_ctrl=False, initial_run=True):
+        super().__init__(net, name=name, in_service=in_service, order=order, level=level,
+                         drop_same_existing_ctrl=drop_same_existing_ctrl, initial_run=initial_run)
+        if element not in net or variable not in net[element]:
+            raise UserWarning("The column %s of table %s does not exist in the net."
+                              % (variable, element))
+        self.element = element
+        self.variable = variable
+        self.element_index = net[element].index.values.copy() if element_index is None \
+            else np.atleast_1d(element_index)
+        self.measurement_table = measurement_table
+        self.measurement_column = measurement_column
+        self.measurement_index = self.element_index if measurement_index is None \
+            else np.atleast_1d(measurement_index)
+        n = len(self.element_index)
+        if len(self.measurement_index) != n:
+            raise UserWarning("One measured element is required for each controlled element.")
+        self.lower = _broadcast(lower, n, "lower")
+        self.upper = _broadcast(upper, n, "upper")
+        if np.any(self.lower > self.upper):
+            raise UserWarning("The lower band limits must not be greater than the upper ones.")
+        self.sensitivity = _broadcast(sensitivity, n, "sensitivity")
+        self.min_setpoint = _broadcast(min_setpoint, n, "min_setpoint")
+        self.max_setpoint = _broadcast(max_setpoint, n, "max_setpoint")
+        self.max_step = max_step
+        self.tol = tol
+        self._element_positions = None
+        self._measurement_positions = None
+        self._last_setpoints = None
+        self._last_measured = None
+
+    def __len__(self):
+        return len(self.element_index)
+
+    def initialize_control(self, net):
+        self._element_positions = _get_positions(net, self.element, self.element_index)
+        # the result table of the measured values is initialized with the table of the elements
+        self._measurement_positions = _get_positions(
+            net, self.measurement_table[4:] if self.measurement_table.startswith("res_")
+            else self.measurement_table, self.measurement_index)
+        self._last_setpoints = None
+        self._last_measured = None
+
+    def time_step(self, net, time):
+        # the secant must not span the changes of the inputs between two time steps
+        self._last_setpoints = None
+        self._last_measured = None
+
+    def get_setpoints(self, net):
+        """
+        Returns the current set points of the controlled elements.
+        """
+        return net[self.element][self.variable].to_numpy(dtype=np.float64)[
+            self._element_positions]
+
+    def get_measured_values(self, net):
+        """
+        Returns the measured values of the controlled elements (NaN if there is no result).
+        """
+        table = net[self.measurement_table]
+        if self.measurement_column not in table:
+            return np.full(len(self), np.nan)
+        return table[self.measurement_column].to_numpy(dtype=np.float64)[
+            self._measurement_positions]
+
+    def get_deviations(self, measured):
+        """
+        Returns the deviations of the measured values from the band, i.e. lower - y if y is below
+        the band, upper - y if y is above the band and 0 otherwise.
+        """
+        return np.where(measured < self.lower, self.lower - measured,
+                        np.where(measured > self.upper, self.upper - measured, 0.))
+
+    def is_converged(self, net):
+        setpoints = self.get_setpoints(net)
+        measured = self.get_measured_values(net)
+        deviations = self.get_deviations(measured)
+        direction = deviations * self.sensitivity
+        saturated = ((direction > 0) & (setpoints >= self.max_setpoint)) \
+            | ((direction < 0) & (setpoints <= self.min_setpoint))
+        return bool(np.all((np.abs(deviations) <= self.tol) | saturated | np.isnan(measured)))
+
+    def new_setpoints(self, net, setpoints, measured):
+        """
+        Returns the new set points of the controlled elements for the given current set points
+        and measured values.
+        """
+        if self._last_setpoints is not None:
+            du = setpoints - self._last_setpoints
+            dy = measured - self._last_measured
+            with np.errstate(divide="ignore", invalid="ignore"):
+                secant = dy / du
+            update = (np.abs(du) > 1e-12) & np.isfinite(secant) & (secant != 0)
+            self.sensitivity[update] = secant[update]
+        step = self.get_deviations(measured) / self.sensitivity
+        step = np.clip(np.nan_to_num(step), -self.max_step, self.max_step)
+        return setpoints + step
+
+    def control_step(self, net):
+        setpoints = self.get_setpoints(net)
+        measured = self.get_measured_values(net)
+        new_setpoints = np.clip(self.new_setpoints(net, setpoints, measured), self.min_setpoint,
+                                self.max_setpoint)
+        self._last_setpoints = setpoints
+        self._last_measured = measured
+        column = net[self.element][self.variable].to_numpy(dtype=np.float64, copy=True)
+        column[self._element_positions] = new_setpoints
+        net[self.element][self.variable] = column
+
+    def __str__(self):
+        return super().__str__() + " [%s.%s, %d elements]" % (self.element, self.variable,
+                                                            len(self))
+
+
+class PressureBandControl(BulkSetpointControl):
+    """
+    Adapts the set points (controlled_p_bar) of many pressure controls at once, so that the
+    pressure at a monitored junction of each pressure control (e.g. the junction with the lowest
+    pressure in the supplied area) stays within the band [p_min_bar, p_max_bar]. C.f.
+    BulkSetpointControl for the control method.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param press_control_index: The indices of the pressure controls (None for all)
+    :type press_control_index: iterable
+    :param junction_index: The monitored junction of each pressure control (None for the \
+            controlled junctions)
+    :type junction_index: iterable
+    :param p_min_bar: The lower limit(s) of the pressure band
+    :type p_min_bar: float or iterable
+    :param p_max_bar: The upper limit(s) of the pressure band
+    :type p_max_bar: float or iterable
+    :param min_p_bar: The minimum set point(s) of the pressure controls
+    :type min_p_bar: float or iterable, default 0
+    :param max_p_bar: The maximum set point(s) of the pressure controls
+    :type max_p_bar: float or iterable, default inf
+    :param kwargs: Further keyword arguments of the BulkSetpointControl
+    :type kwargs: dict
+    """
+
+    def __init__(self, net, press_control_index, junction_index, p_min_bar, p_max_bar,
+                 min_p_bar=0., max_p_bar=np.inf, **kwargs):
+        if junction_index is None:
+            pc_index = net.press_control.index if press_control_index is None \
+                else press_control_index
+            junction_index = net.press_control.loc[pc_index, "controlled_junction"].values
+        super().__init__(net, "press_control", "controlled_p_bar", press_control_index,
+                         "res_junction", "p_bar", junction_index, lower=p_min_bar,
+                         upper=p_max_bar, min_setpoint=min_p_bar, max_setpoint=max_p_bar,
+                         **kwargs)
+
+
+class FlowBandControl(BulkSetpointControl):
+    """
+    Adapts the set points (controlled_mdot_kg_per_s) of many flow controls at once, so that a
+    measured result of each flow control (by default the pressure at a monitored junction) stays
+    within the band [lower, upper]. As the measured values usually decrease with higher mass flows
+    (e.g. the pressure downstream of a flow control), the initial sensitivity should be negative.
+    C.f. BulkSetpointControl for the control method.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param flow_control_index: The indices of the flow controls (None for all)
+    :type flow_control_index: iterable
+    :param measurement_index: The measured element of each flow control (by default a junction)
+    :type measurement_index: iterable
+    :param lower: The lower limit(s) of the band
+    :type lower: float or iterable
+    :param upper: The upper limit(s) of the band
+    :type upper: float or iterable
+    :param measurement_table: The result table of the measured values
+    :type measurement_table: str, default "res_junction"
+    :param measurement_column: The column of the measured values
+    :type measurement_column: str, default "p_bar"
+    :param min_mdot_kg_per_s: The minimum set point(s) of the flow controls
+    :type min_mdot_kg_per_s: float or iterable, default 0
+    :param max_mdot_kg_per_s: The maximum set point(s) of the flow controls
+    :type max_mdot_kg_per_s: float or iterable, default inf
+    :param sensitivity: The initial sensitivity of the measured values to the mass flows
+    :type sensitivity: float or iterable, default -1.
+    :param kwargs: Further keyword arguments of the BulkSetpointControl
+    :type kwargs: dict
+    """
+
+    def __init__(self, net, flow_control_index, measurement_index, lower, upper,
+                 measurement_table="res_junction", measurement_column="p_bar",
+                 min_mdot_kg_per_s=0., max_mdot_kg_per_s=np.inf, sensitivity=-1., **kwargs):
+        super().__init__(net, "flow_control", "controlled_mdot_kg_per_s", flow_control_index,
+                         measurement_table, measurement_column, measurement_index, lower=lower,
+                         upper=upper, sensitivity=sensitivity, min_setpoint=min_mdot_kg_per_s,
+                         max_setpoint=max_mdot_kg_per_s, **kwargs)
+
+
+class ReturnTemperatureControl(BulkSetpointControl):
+    """
+    Adapts the mass flows (controlled_mdot_kg_per_s) of many heat consumers at once, so that their
+    return temperatures (res_heat_consumer.t_to_k) reach the given set points, e.g. to model the
+    valves of consumers with limited mass flows. The heat consumers have to be defined by qext_w
+    and controlled_mdot_kg_per_s.
+
+    As the extracted heat is fixed, the new mass flow of each heat consumer follows directly from
+    the energy balance as mdot * (t_from - t_to) / (t_from - treturn_k). If the flow temperature
+    is not higher than the return temperature set point, the mass flow is set to its maximum.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param heat_consumer_index: The indices of the heat consumers (None for all)
+    :type heat_consumer_index: iterable
+    :param treturn_k: The return temperature set point(s)
+    :type treturn_k: float or iterable
+    :param min_mdot_kg_per_s: The minimum mass flow(s) of the heat consumers
+    :type min_mdot_kg_per_s: float or iterable, default 0
+    :param max_mdot_kg_per_s: The maximum mass flow(s) of the heat consumers
+    :type max_mdot_kg_per_s: float or iterable, default inf
+    :param tol: The tolerance of the return temperatures in K
+    :type tol: float, default 0.01
+    :param kwargs: Further keyword arguments of the BulkSetpointControl
+    :type kwargs: dict
+    """
+
+    def __init__(self, net, heat_consumer_index, treturn_k, min_mdot_kg_per_s=0.,
+                 max_mdot_kg_per_s=np.inf, tol=0.01, **kwargs):
+        super().__init__(net, "heat_consumer", "controlled_mdot_kg_per_s", heat_consumer_index,
+                         "res_heat_consumer", "t_to_k", lower=treturn_k, upper=treturn_k,
+                         sensitivity=1., min_setpoint=min_mdot_kg_per_s,
+                         max_setpoint=max_mdot_kg_per_s, tol=tol, **kwargs)
+
+    def new_setpoints(self, net, setpoints, measured):
+        t_from = net.res_heat_consumer["t_from_k"].to_numpy(dtype=np.float64)[
+            self._measurement_positions]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            new_setpoints = setpoints * (t_from - measured) / (t_from - self.lower)
+        new_setpoints[t_from <= self.lower] = self.max_setpoint[t_from <= self.lower]
+        no_result = ~np.isfinite(new_setpoints)
+        new_setpoints[no_result] = setpoints[no_result]
+        step = np.clip(new_setpoints - setpoints, -self.max_step, self.max_step)
+        return setpoints + step
+
+
+class MassStorageLimitControl(Controller):
+    """
+    Limits the mass flows (mdot_kg_per_s) of many mass storages at once, so that their stored
+    mass stays within [min_m_stored_kg, max_m_stored_kg] during the next time step of the given
+    duration. The stored mass is taken from the column m_stored_kg of the mass storage table, or
+    from init_m_stored_kg if the column does not exist.
+
+    The limits are applied in time_step (after all controllers with a lower level or order, e.g.
+    the profile controllers that write the mass flows) and in control_step. The controller is
+    converged if all mass flows are within their limits.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param duration_s: The duration of a time step in seconds
+    :type duration_s: float
+    :param mass_storage_index: The indices of the mass storages (None for all)
+    :type mass_storage_index: iterable, default None
+    :param name: The name of the controller
+    :type name: str, default None
+    :param in_service: Indicates if the controller is currently in_service
+    :type in_service: bool, default True
+    :param order: Within the same level, controllers with lower order are called first
+    :type order: real, default 0
+    :param level: Level to which the controller belongs. Low level is called before higher level.
+    :type level: real, default 0
+    :param drop_same_existing_ctrl: Indicates if already existing controllers of the same type \
+            should be dropped
+    :type drop_same_existing_ctrl: bool, default False
+    :param initial_run: Whether a pipeflow should be run before the control step is applied
+    :type initial_run: bool, default False
+    """
+
+    def __init__(self, net, duration_s, mass_storage_index=None, name=None, in_service=True,
+                 order=0, level=0, drop_same_existing_ctrl=False, initial_run=False):
+        super().__init__(net, name=name, in_service=in_service, order=order, level=level,
+                         drop_same_existing_ctrl=drop_same_existing_ctrl, initial_run=initial_run)
+        if duration_s <= 0:
+            raise UserWarning("The duration of a time step has to be positive.")
+        self.duration_s = duration_s
+        self.element_index = net.mass_storage.index.values.copy() if mass_storage_index is None \
+            else np.atleast_1d(mass_storage_index)
+        self._positions = None
+
+    def __len__(self):
+        return len(self.element_index)
+
+    def initialize_control(self, net):
+        self._positions = _get_positions(net, "mass_storage", self.element_index)
+
+    def get_mdot_limits(self, net):
+        """
+        Returns the minimum and maximum mass flows (mdot_kg_per_s, i.e. before scaling) of the
+        mass storages in the next time step.
+        """
+        table = net.mass_storage
+        column = "m_stored_kg" if "m_stored_kg" in table else "init_m_stored_kg"
+        m_stored = table[column].to_numpy(dtype=np.float64)[self._positions]
+        scaling = table["scaling"].to_numpy(dtype=np.float64)[self._positions] * self.duration_s
+        min_m = table["min_m_stored_kg"].to_numpy(dtype=np.float64)[self._positions]
+        max_m = table["max_m_stored_kg"].to_numpy(dtype=np.float64)[self._positions]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limits = np.vstack([(min_m - m_stored) / scaling, (max_m - m_stored) / scaling])
+        # negative scaling factors swap the limits
+        return np.nanmin(limits, axis=0), np.nanmax(limits, axis=0)
+
+    def limit_mass_flows(self, net):
+        """
+        Clips the mass flows of the mass storages to their limits.
+        """
+        if self._positions is None:
+            self.initialize_control(net)
+        mdot_min, mdot_max = self.get_mdot_limits(net)
+        column = net.mass_storage["mdot_kg_per_s"].to_numpy(dtype=np.float64, copy=True)
+        mdot = column[self._positions]
+        limited = np.clip(mdot, mdot_min, mdot_max)
+        if np.any(limited != mdot):
+            column[self._positions] = limited
+            net.mass_storage["mdot_kg_per_s"] = column
+
+    def time_step(self, net, time):
+        self.limit_mass_flows(net)
+
+    def is_converged(self, net):
+        mdot_min, mdot_max = self.get_mdot_limits(net)
+        mdot = net.mass_storage["mdot_kg_per_s"].to_numpy(dtype=np.float64)[self._positions]
+        return bool(np.all((mdot >= mdot_min - 1e-12) & (mdot <= mdot_max + 1e-12)))
+
+    def control_step(self, net):
+        self.limit_mass_flows(net)
+
+    def __str__(self):
+        return super().__str__() + " [%d mass storages]" % len(self)
+
+
+class MassStorageIntegrationControl(MassStorageLimitControl):
+    """
+    Integrates the stored mass of many mass storages over a time series at once. In each time
+    step, the mass flows (mdot_kg_per_s) are limited to the stored mass as in
+    :code:`MassStorageLimitControl`. At the end of each time step, the stored masses of all
+    storages are updated with one vectorized operation from the resulting mass flows
+    (res_mass_storage.mdot_kg_per_s, i.e. including the scaling) and the duration of a time step,
+    limited to [min_m_stored_kg, max_m_stored_kg] and written to the column m_stored_kg of the
+    mass storage table, which is created from init_m_stored_kg if it does not exist. Storages
+    without results (e.g. out of service) keep their stored mass.
+
+    The stored masses and the states of charge ((m_stored_kg - min_m_stored_kg) /
+    (max_m_stored_kg - min_m_stored_kg), NaN for storages without upper limit) after each time
+    step are logged into array buffers and can be retrieved with get_trajectories(). As the stored
+    masses depend on all previous time steps, the controller carries a state from one time step to
+    the next (*carries_state*), so that time series with this controller cannot be calculated in
+    parallel.
+
+    :param net: The pandapipes network in which the controller resides
+    :type net: pandapipesNet
+    :param duration_s: The duration of a time step in seconds
+    :type duration_s: float
+    :param mass_storage_index: The indices of the mass storages (None for all)
+    :type mass_storage_index: iterable, default None
+    :param n_time_steps: The expected number of time steps to preallocate the buffers for (they \
+            are enlarged if necessary)
+    :type n_time_steps: int, default 0
+    :param kwargs: Additional keyword arguments for the MassStorageLimitControl
+    :type kwargs: dict
+    """
+
+    carries_state = True
+
+    def __init__(self, net, duration_s, mass_storage_index=None, n_time_steps=0, **kwargs):
+        super().__init__(net, duration_s, mass_storage_index=mass_storage_index, **kwargs)
+        if "m_stored_kg" not in net.mass_storage:
+            net.mass_storage["m_stored_kg"] = \
+                net.mass_storage["init_m_stored_kg"].to_numpy(dtype=np.float64, copy=True)
+        self._n_time_steps = int(n_time_steps)
+        self._init_buffers()
+
+    def _init_buffers(self):
+        n_rows = max(self._n_time_steps, 1)
+        self._time_steps = np.empty(n_rows, dtype=object)
+        self._m_stored = np.empty((n_rows, len(self)), dtype=np.float64)
+        self._soc = np.empty((n_rows, len(self)), dtype=np.float64)
+        self._n_logged = 0
+
+    def reset(self, net):
+        """
+        Resets the stored masses to init_m_stored_kg and clears the logged trajectories, e.g.
+        before the same time series is calculated again.
+        """
+        if self._positions is None:
+            self.initialize_control(net)
+        column = net.mass_storage["m_stored_kg"].to_numpy(dtype=np.float64, copy=True)
+        column[self._positions] = \
+            net.mass_storage["init_m_stored_kg"].to_numpy(dtype=np.float64)[self._positions]
+        net.mass_storage["m_stored_kg"] = column
+        self._init_buffers()
+
+    def integrate(self, net):
+        """
+        Updates the stored masses with the resulting mass flows of the last pipeflow and returns
+        them.
+        """
+        if self._positions is None:
+            self.initialize_control(net)
+        table = net.mass_storage
+        column = table["m_stored_kg"].to_numpy(dtype=np.float64, copy=True)
+        mdot = net.res_mass_storage["mdot_kg_per_s"].to_numpy(dtype=np.float64)[self._positions]
+        m_stored = column[self._positions] + np.nan_to_num(mdot) * self.duration_s
+        m_stored = np.clip(m_stored, table["min_m_stored_kg"].to_numpy(
+            dtype=np.float64)[self._positions], table["max_m_stored_kg"].to_numpy(
+            dtype=np.float64)[self._positions])
+        column[self._positions] = m_stored
+        table["m_stored_kg"] = column
+        return m_stored
+
+    def get_state_of_charge(self, net, m_stored=None):
+        """
+        Returns the states of charge of the mass storages.
+        """
+        table = net.mass_storage
+        if m_stored is None:
+            m_stored = table["m_stored_kg"].to_numpy(dtype=np.float64)[self._positions]
+        min_m = table["min_m_stored_kg"].to_numpy(dtype=np.float64)[self._positions]
+        max_m = table["max_m_stored_kg"].to_numpy(dtype=np.float64)[self._positions]
+        capacity = max_m - min_m
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(np.isfinite(capacity) & (capacity > 0),
+                            (m_stored - min_m) / capacity, np.nan)
+
+    def finalize_step(self, net, time):
+        m_stored = self.integrate(net)
+        if self._n_logged == len(self._time_steps):
+            n_rows = 2 * len(self._time_steps)
+            self._time_steps = np.resize(self._time_steps, n_rows)
+            self._m_stored = np.resize(self._m_stored, (n_rows, len(self)))
+            self._soc = np.resize(self._soc, (n_rows, len(self)))
+        self._time_steps[self._n_logged] = time
+        self._m_stored[self._n_logged] = m_stored
+        self._soc[self._n_logged] = self.get_state_of_charge(net, m_stored)
+        self._n_logged += 1
+
+    def get_trajectories(self):
+        """
+        Returns the stored masses and the states of charge of the mass storages after each
+        logged time step.
+
+        :return: (m_stored_kg, soc) - DataFrames with the time steps as index and the mass \
+                storage indices as columns
+        :rtype: tuple(pandas.DataFrame)
+        """
+        index = pd.Index(self._time_steps[:self._n_logged], name="time_step")
+        return tuple(pd.DataFrame(buffer[:self._n_logged].copy(), index=index,
+                                  columns=self.element_index)
+                     for buffer in (self._m_stored, self._soc))
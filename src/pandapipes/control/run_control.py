@@ -2,13 +2,22 @@
 # and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+from functools import partial
+
 from pandapower.control import run_control as run_control_pandapower, \
     prepare_run_ctrl as prepare_run_control_pandapower
 import pandapipes as ppipe
 from pandapipes.pipeflow import PipeflowNotConverged
 
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
 
-def run_control(net, ctrl_variables=None, max_iter=30, **kwargs):
+
+def run_control(net, ctrl_variables=None, max_iter=30, partial_resolve=False, **kwargs):
     """
     Function to run a control of the pandapipes network.
 
@@ -18,6 +27,13 @@ def run_control(net, ctrl_variables=None, max_iter=30, **kwargs):
     :type ctrl_variables: dict, default None
     :param max_iter: Maximal amount of iterations
     :type max_iter: int, default 30
+    :param partial_resolve: If True, the pipeflows of the control loop reuse the lookups, the \
+            connectivity check, the result tables and the structure of the system matrix of the \
+            previous pipeflow, as long as the controllers only change values of the elements \
+            (c.f. pipeflow option reuse_structure). All pipeflows after the first one are warm \
+            started with the results of the previous pipeflow. If such a pipeflow does not \
+            converge, it is repeated with a cold start.
+    :type partial_resolve: bool, default False
     :param kwargs: Additional keyword arguments
     :type kwargs: dict
     :return: No output
@@ -25,7 +41,42 @@ def run_control(net, ctrl_variables=None, max_iter=30, **kwargs):
     if ctrl_variables is None:
         ctrl_variables = prepare_run_ctrl(net, None, **kwargs)
 
-    run_control_pandapower(net, ctrl_variables=ctrl_variables, max_iter=max_iter, **kwargs)
+    if not partial_resolve:
+        run_control_pandapower(net, ctrl_variables=ctrl_variables, max_iter=max_iter, **kwargs)
+        return
+
+    # the run function is only replaced during this control loop, as the control variables are
+    # reused in each time step of a time series
+    run_fct = ctrl_variables["run"]
+    errors = ctrl_variables.get("errors", (PipeflowNotConverged,))
+    ctrl_variables["run"] = partial(_run_partial_resolve, run_fct, errors, {"n_runs": 0})
+    try:
+        run_control_pandapower(net, ctrl_variables=ctrl_variables, max_iter=max_iter, **kwargs)
+    finally:
+        ctrl_variables["run"] = run_fct
+
+
+def _run_partial_resolve(run_fct, errors, state, net, **kwargs):
+    """
+    Runs the given run function with the option reuse_structure. All runs after the first one are
+    warm started with the results of the previous run and are repeated with a cold start if they do
+    not converge.
+    """
+    warm = state["n_runs"] > 0
+    state["n_runs"] += 1
+    kwargs["reuse_structure"] = True
+    if warm:
+        kwargs["warm_start"] = True
+    try:
+        run_fct(net, **kwargs)
+    except errors:
+        if not warm:
+            raise
+        logger.info("The warm started calculation of the control loop did not converge. It is "
+                    "repeated with a cold start.")
+        kwargs["warm_start"] = False
+        kwargs["reuse_structure"] = False
+        run_fct(net, **kwargs)
 
 
 def prepare_run_ctrl(net, ctrl_variables, **kwargs):
@@ -2,11 +2,14 @@
 # and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+import glob
 import json
 import os
 import pickle
 from typing import Union
 
+import numpy as np
+
 from pandapower.io_utils import PPJSONEncoder, to_dict_with_coord_transform, \
     get_raw_data_from_pickle, transform_net_with_df_and_geo, PPJSONDecoder
 from pandapower.io_utils import encrypt_string, decrypt_string
@@ -180,3 +183,96 @@ def from_json_string(json_string, convert=False, encryption_key=None, ignore_unk
             elif isinstance(n, pandapowerNet):
                 convert_format_pandapower(net)
     return net
+
+
+SNAPSHOT_STRUCTURE_FILE = "structure.p"
+SNAPSHOT_ARRAY_FILE = "array_%d.npy"
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    Pickler that stores numerical arrays (e.g. the blocks of DataFrames or profiles) as separate
+    .npy files instead of the pickle stream.
+    """
+
+    def __init__(self, file, path, min_array_bytes):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = path
+        self.min_array_bytes = min_array_bytes
+        self.array_files = dict()
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray or obj.dtype.kind not in "biufc" \
+                or obj.nbytes < self.min_array_bytes:
+            return None
+        if id(obj) not in self.array_files:
+            file_name = SNAPSHOT_ARRAY_FILE % len(self.array_files)
+            np.save(os.path.join(self.path, file_name), obj)
+            # the array is kept, so that its id is not reused during pickling
+            self.array_files[id(obj)] = (file_name, obj)
+        return self.array_files[id(obj)][0]
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, path, mode):
+        super().__init__(file)
+        self.path = path
+        self.mode = mode
+
+    def persistent_load(self, pid):
+        return np.load(os.path.join(self.path, pid), mmap_mode=self.mode)
+
+
+def to_snapshot(net, path, min_array_bytes=4096):
+    """
+    Saves a pandapipes network or a multinet (with all nets, controllers and their profiles) as
+    snapshot in the folder *path*. All numerical arrays with at least *min_array_bytes* bytes, e.g.
+    the columns of the tables, the profiles of DFData data sources or the buffers of output
+    writers, are stored as separate .npy files, and only the remaining structure is pickled.
+
+    A snapshot is loaded with from_snapshot, which maps the .npy files into memory instead of
+    reading them. Thereby, several processes (e.g. parallel scenario or time series workers) that
+    load the same snapshot share the memory of the arrays, and only the values that a process
+    changes are copied. If the folder is in a shared memory file system (e.g. /dev/shm on Linux),
+    the arrays are not written to disk at all.
+
+    :param net: The pandapipes network or multinet to save
+    :type net: pandapipesNet or MultiNet
+    :param path: The folder of the snapshot, which is created if it does not exist. Arrays of a \
+            previous snapshot in this folder are removed.
+    :type path: str
+    :param min_array_bytes: Minimum size of the arrays that are stored as .npy files
+    :type min_array_bytes: int, default 4096
+    :return: No output
+
+    :Example:
+        >>> pandapipes.to_snapshot(multinet, "/dev/shm/scenario_base")
+        >>> multinet = pandapipes.from_snapshot("/dev/shm/scenario_base")  # in each worker
+
+    """
+    os.makedirs(path, exist_ok=True)
+    for file_name in glob.glob(os.path.join(path, SNAPSHOT_ARRAY_FILE.replace("%d", "*"))):
+        os.remove(file_name)
+    with open(os.path.join(path, SNAPSHOT_STRUCTURE_FILE), "wb") as f:
+        _SnapshotPickler(f, path, min_array_bytes).dump(net)
+
+
+def from_snapshot(path, mode="c"):
+    """
+    Loads a pandapipes network or a multinet from a snapshot that was saved with to_snapshot.
+
+    :param path: The folder of the snapshot
+    :type path: str
+    :param mode: How the arrays are mapped into memory: "c" (copy-on-write, i.e. changed values \
+            are only copied for this process and not written to the files), "r" (read-only, \
+            changes of the arrays raise an error) or None (the arrays are read into memory)
+    :type mode: str, default "c"
+    :return: net - The pandapipes network or multinet of the snapshot
+    :rtype: pandapipesNet or MultiNet
+    """
+    structure_file = os.path.join(path, SNAPSHOT_STRUCTURE_FILE)
+    if not os.path.isfile(structure_file):
+        raise UserWarning("The folder %s contains no snapshot." % path)
+    with open(structure_file, "rb") as f:
+        return _SnapshotUnpickler(f, path, mode).load()
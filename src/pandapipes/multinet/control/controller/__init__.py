@@ -3,3 +3,4 @@
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
 from .multinet_control import *
+from .bulk_coupling_control import BulkCouplingControl, merge_coupling_controls
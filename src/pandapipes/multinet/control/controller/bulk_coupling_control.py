@@ -0,0 +1,302 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import numpy as np
+import pandas as pd
+from pandapower.control.basic_controller import Controller
+
+from pandapipes.multinet.control.controller.multinet_control import P2GControlMultiEnergy, \
+    G2PControlMultiEnergy
+from pandapipes.properties.fluids import get_fluid
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _check_efficiency(efficiency, unit_type):
+    if efficiency is None:
+        raise UserWarning("The efficiency of the %s units has to be given." % unit_type)
+    efficiency = np.asarray(efficiency, dtype=np.float64)
+    if not np.all(np.isfinite(efficiency)) or np.any(efficiency <= 0):
+        raise UserWarning("The efficiency of the %s units has to be a positive number, not %s."
+                          % (unit_type, efficiency))
+    return efficiency
+
+
+class BulkCouplingControl(Controller):
+    """
+    A controller to be used in a multinet that couples many power and gas elements at once, e.g.
+    thousands of electrolyzers (P2G) and CHPs (G2P).
+
+    In contrast to one P2GControlMultiEnergy or G2PControlMultiEnergy per coupling point, the
+    coupling points are stored in groups with the same source and target column, e.g. all loads
+    whose power consumption is converted to the mass flow of gas sources. In each control step,
+    every group reads the (scaled) values of all its elements with one vectorized read, multiplies
+    them with the conversion factors (including the efficiencies) and writes the results with one
+    vectorized assignment. The coupling points are added with add_p2g and add_g2p (or directly
+    with the parameters of the constructor).
+
+    :param multinet: pandapipes-Mulitnet that includes the power and gas network
+    :type multinet: pandapipes.Multinet
+    :param p2g_index_power: Indices of the loads in the power net of the P2G units
+    :type p2g_index_power: iterable of integers, default None
+    :param p2g_index_gas: Indices of the corresponding sources in the gas net
+    :type p2g_index_gas: iterable of integers, default None
+    :param p2g_efficiency: Efficiency factor (based on HHV) of all or of each P2G unit, required \
+            if p2g_index_power is given
+    :type p2g_efficiency: float or iterable of floats, default None
+    :param g2p_index_power: Indices of the sgens (or gens) in the power net of the G2P units
+    :type g2p_index_power: iterable of integers, default None
+    :param g2p_index_gas: Indices of the corresponding sinks in the gas net
+    :type g2p_index_gas: iterable of integers, default None
+    :param g2p_efficiency: Efficiency factor (based on HHV) of all or of each G2P unit, required \
+            if g2p_index_power is given
+    :type g2p_efficiency: float or iterable of floats, default None
+    :param element_type_power: Type of the power elements of the G2P units, "sgen" or "gen"
+    :type element_type_power: str, default "sgen"
+    :param calc_gas_from_power: If True, the gas consumption of the G2P units is calculated from \
+            their power generation instead of vice versa
+    :type calc_gas_from_power: bool, default False
+    :param name_power_net: Key name to find the power net in multinet['nets']
+    :type name_power_net: str, default "power"
+    :param name_gas_net: Key name to find the gas net in multinet['nets']
+    :type name_gas_net: str, default "gas"
+    :param in_service: Indicates if the controller is currently in_service
+    :type in_service: bool, default True
+    :param order: Within the same level, controllers with lower order are called first
+    :type order: real, default 0
+    :param level: Level to which the controller belongs. Low level is called before higher level.
+    :type level: real, default 0
+    :param drop_same_existing_ctrl: Indicates if already existing controllers of the same type \
+            should be dropped
+    :type drop_same_existing_ctrl: bool, default False
+    :param initial_run: Whether a power and pipe flow should be run before the control step is \
+            applied
+    :type initial_run: bool, default True
+    :param name: The name of the controller
+    :type name: str, default "BulkCouplingControl"
+    """
+
+    def __init__(self, multinet, p2g_index_power=None, p2g_index_gas=None, p2g_efficiency=None,
+                 g2p_index_power=None, g2p_index_gas=None, g2p_efficiency=None,
+                 element_type_power="sgen", calc_gas_from_power=False, name_power_net='power',
+                 name_gas_net='gas', in_service=True, order=0, level=0,
+                 drop_same_existing_ctrl=False, initial_run=True, name="BulkCouplingControl"):
+        # checked before the controller is added to the multinet
+        if p2g_index_power is not None:
+            _check_efficiency(p2g_efficiency, "P2G")
+        if g2p_index_power is not None:
+            _check_efficiency(g2p_efficiency, "G2P")
+        super().__init__(
+            multinet, name, in_service, order, level, drop_same_existing_ctrl=drop_same_existing_ctrl,
+            initial_run=initial_run,
+        )
+        self.name_net_power = name_power_net
+        self.name_net_gas = name_gas_net
+        self.fluid_calorific_value = get_fluid(multinet['nets'][name_gas_net]).get_property('hhv')
+        self.groups = dict()
+        self._positions = None
+        self._values = dict()
+        self.applied = False
+        if p2g_index_power is not None:
+            self.add_p2g(p2g_index_power, p2g_index_gas, p2g_efficiency)
+        if g2p_index_power is not None:
+            self.add_g2p(g2p_index_power, g2p_index_gas, g2p_efficiency, element_type_power,
+                         calc_gas_from_power)
+
+    def conversion_factor_mw_to_kgps(self):
+        return 1e3 / (self.fluid_calorific_value * 3600)
+
+    def add_p2g(self, element_index_power, element_index_gas, efficiency):
+        """
+        Adds P2G units that convert the power consumption of loads in the power net to the mass
+        flow of sources in the gas net.
+
+        :param element_index_power: Indices of the loads in the power net
+        :type element_index_power: int or iterable of integers
+        :param element_index_gas: Indices of the corresponding sources in the gas net
+        :type element_index_gas: int or iterable of integers
+        :param efficiency: Efficiency factor (based on HHV) of all or of each unit
+        :type efficiency: float or iterable of floats
+        :return: No output
+        """
+        self._add_group((self.name_net_power, "load", "p_mw"),
+                        (self.name_net_gas, "source", "mdot_kg_per_s"),
+                        element_index_power, element_index_gas,
+                        _check_efficiency(efficiency, "P2G") * self.conversion_factor_mw_to_kgps())
+
+    def add_g2p(self, element_index_power, element_index_gas, efficiency,
+                element_type_power="sgen", calc_gas_from_power=False):
+        """
+        Adds G2P units that convert the mass flow of sinks in the gas net to the power generation
+        of sgens or gens in the power net (or vice versa, if calc_gas_from_power is True).
+
+        :param element_index_power: Indices of the sgens or gens in the power net
+        :type element_index_power: int or iterable of integers
+        :param element_index_gas: Indices of the corresponding sinks in the gas net
+        :type element_index_gas: int or iterable of integers
+        :param efficiency: Efficiency factor (based on HHV) of all or of each unit
+        :type efficiency: float or iterable of floats
+        :param element_type_power: Type of the power elements, "sgen" or "gen"
+        :type element_type_power: str, default "sgen"
+        :param calc_gas_from_power: If True, the gas consumption is calculated from the power \
+                generation
+        :type calc_gas_from_power: bool, default False
+        :return: No output
+        """
+        power = (self.name_net_power, element_type_power, "p_mw")
+        gas = (self.name_net_gas, "sink", "mdot_kg_per_s")
+        efficiency = _check_efficiency(efficiency, "G2P")
+        if calc_gas_from_power:
+            self._add_group(power, gas, element_index_power, element_index_gas,
+                            self.conversion_factor_mw_to_kgps() / efficiency)
+        else:
+            self._add_group(gas, power, element_index_gas, element_index_power,
+                            efficiency / self.conversion_factor_mw_to_kgps())
+
+    def _add_group(self, read, write, read_index, write_index, factor):
+        read_index = np.atleast_1d(np.asarray(read_index, dtype=np.int64))
+        write_index = np.atleast_1d(np.asarray(write_index, dtype=np.int64))
+        if len(read_index) != len(write_index):
+            raise UserWarning("The number of %s elements (%d) does not match the number of %s "
+                              "elements (%d)." % (read[1], len(read_index), write[1],
+                                                  len(write_index)))
+        factor = np.broadcast_to(factor, read_index.shape)
+        if (read, write) in self.groups:
+            old_read, old_write, old_factor = self.groups[(read, write)]
+            read_index = np.concatenate([old_read, read_index])
+            write_index = np.concatenate([old_write, write_index])
+            factor = np.concatenate([old_factor, factor])
+        if len(np.unique(write_index)) != len(write_index):
+            raise UserWarning("Some %s elements are written by several coupling points."
+                              % write[1])
+        self.groups[(read, write)] = (read_index, write_index, np.array(factor))
+        self._positions = None
+
+    def __len__(self):
+        return sum(len(group[0]) for group in self.groups.values())
+
+    def get_all_net_names(self):
+        return [self.name_net_power, self.name_net_gas]
+
+    def initialize_control(self, multinet):
+        self.applied = False
+        self._positions = dict()
+        for (read, write), (read_index, write_index, _) in self.groups.items():
+            positions = list()
+            for (net_name, table, _), index in [(read, read_index), (write, write_index)]:
+                table_index = multinet['nets'][net_name][table].index
+                table_positions = table_index.get_indexer(pd.Index(index))
+                if np.any(table_positions < 0):
+                    raise UserWarning("The elements %s of table %s do not exist in the %s net."
+                                      % (index[table_positions < 0], table, net_name))
+                positions.append(table_positions)
+            self._positions[(read, write)] = positions
+
+    def control_step(self, multinet):
+        self._values = dict()
+        for (read, write), (_, _, factor) in self.groups.items():
+            read_positions = self._positions[(read, write)][0]
+            net_name, table, column = read
+            read_table = multinet['nets'][net_name][table]
+            values = read_table[column].to_numpy(dtype=np.float64)[read_positions] \
+                * read_table["scaling"].to_numpy(dtype=np.float64)[read_positions]
+            self._values[(read, write)] = values * factor
+        self.write_to_net(multinet)
+        self.applied = True
+
+    def write_to_net(self, multinet):
+        for (read, write), values in self._values.items():
+            write_positions = self._positions[(read, write)][1]
+            net_name, table, column = write
+            write_table = multinet['nets'][net_name][table]
+            column_values = write_table[column].to_numpy(dtype=np.float64, copy=True)
+            column_values[write_positions] = values
+            write_table[column] = column_values
+
+    def get_exchange_values(self):
+        return np.concatenate([self._values[key] for key in self.groups])
+
+    def set_exchange_values(self, multinet, values):
+        position = 0
+        for key in self.groups:
+            n = len(self._values[key])
+            self._values[key] = values[position:position + n]
+            position += n
+        self.write_to_net(multinet)
+
+    def is_converged(self, multinet):
+        return self.applied
+
+    def __str__(self):
+        return super().__str__() + " [%d coupling points]" % len(self)
+
+
+def merge_coupling_controls(multinet, drop=True, **kwargs):
+    """
+    Replaces all P2GControlMultiEnergy and G2PControlMultiEnergy controllers of the multinet (e.g.
+    created with coupled_p2g_const_control or coupled_g2p_const_control) by one
+    BulkCouplingControl with the same coupling points. All merged controllers have to couple the
+    same power and gas net and belong to the same level. The ConstControls of the power and gas
+    nets that provide the profiles can be merged with merge_const_controls.
+
+    :param multinet: pandapipes-Mulitnet that includes the power and gas network
+    :type multinet: pandapipes.Multinet
+    :param drop: If True, the merged controllers are removed, otherwise they are only set out of \
+            service
+    :type drop: bool, default True
+    :param kwargs: Additional keyword arguments for the BulkCouplingControl. By default, the \
+            order and level of the merged controllers are used.
+    :type kwargs: dict
+    :return: ctrl - The BulkCouplingControl (None if no controller could be merged)
+    :rtype: BulkCouplingControl
+    """
+    merged = list()
+    for idx, ctrl in multinet.controller.object.items():
+        if type(ctrl) in (P2GControlMultiEnergy, G2PControlMultiEnergy) \
+                and multinet.controller.at[idx, "in_service"]:
+            merged.append(idx)
+    if not merged:
+        logger.info("The multinet contains no P2G or G2P controller that can be merged.")
+        return None
+    controllers = multinet.controller.loc[merged]
+    for column in ["level", "order"]:
+        values = controllers[column].unique()
+        if column == "level" and len(values) > 1:
+            raise UserWarning("The coupling controllers belong to different levels %s and cannot "
+                              "be merged." % list(values))
+        if column not in kwargs and len(values) == 1:
+            kwargs[column] = controllers[column].iat[0]
+    net_names = {(ctrl.name_net_power, ctrl.name_net_gas) for ctrl in controllers.object}
+    if len(net_names) > 1:
+        raise UserWarning("The coupling controllers couple different nets %s and cannot be "
+                          "merged." % sorted(net_names))
+    name_power_net, name_gas_net = net_names.pop()
+    if drop:
+        multinet.controller.drop(merged, inplace=True)
+    else:
+        multinet.controller.loc[merged, "in_service"] = False
+    bulk = BulkCouplingControl(multinet, name_power_net=name_power_net, name_gas_net=name_gas_net,
+                               **kwargs)
+    # the coupling points of the same kind are collected first, so that each group is added once
+    coupling_points = dict()
+    for ctrl in controllers.object:
+        kind = ("p2g",) if isinstance(ctrl, P2GControlMultiEnergy) \
+            else ("g2p", ctrl.elm_type_power, ctrl.el_power_led)
+        index_power = np.atleast_1d(ctrl.elm_idx_power)
+        points = coupling_points.setdefault(kind, (list(), list(), list()))
+        points[0].append(index_power)
+        points[1].append(np.atleast_1d(ctrl.elm_idx_gas))
+        points[2].append(np.broadcast_to(ctrl.efficiency, index_power.shape))
+    for kind, points in coupling_points.items():
+        index_power, index_gas, efficiency = [np.concatenate(p) for p in points]
+        if kind[0] == "p2g":
+            bulk.add_p2g(index_power, index_gas, efficiency)
+        else:
+            bulk.add_g2p(index_power, index_gas, efficiency, kind[1], kind[2])
+    return bulk
@@ -108,6 +108,13 @@ class P2GControlMultiEnergy(Controller):
             multinet['nets'][self.name_net_gas].source.loc[self.elm_idx_gas,
                                                            'mdot_kg_per_s'] = self.mdot_kg_per_s
 
+    def get_exchange_values(self):
+        return self.mdot_kg_per_s
+
+    def set_exchange_values(self, multinet, values):
+        self.mdot_kg_per_s = values
+        self.write_to_net(multinet)
+
     def is_converged(self, multinet):
         return self.applied
 
@@ -259,6 +266,16 @@ class G2PControlMultiEnergy(Controller):
                 multinet['nets'][self.name_net_power][self.elm_type_power].loc[
                     self.elm_idx_power, 'p_mw'] = self.power_gen
 
+    def get_exchange_values(self):
+        return self.gas_cons if self.el_power_led else self.power_gen
+
+    def set_exchange_values(self, multinet, values):
+        if self.el_power_led:
+            self.gas_cons = values
+        else:
+            self.power_gen = values
+        self.write_to_net(multinet)
+
     def is_converged(self, multinet):
         return self.applied
 
@@ -371,6 +388,13 @@ class GasToGasConversion(Controller):
             multinet['nets'][self.name_net_to].source.loc[self.element_index_to,
                                                           'mdot_kg_per_s'] = self.mdot_kg_per_s_out
 
+    def get_exchange_values(self):
+        return self.mdot_kg_per_s_out
+
+    def set_exchange_values(self, multinet, values):
+        self.mdot_kg_per_s_out = values
+        self.write_to_net(multinet)
+
     def is_converged(self, multinet):
         return self.applied
 
@@ -2,16 +2,21 @@
 # and Energy System Technology (IEE), Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+import multiprocessing
+import pickle
+
 import numpy as np
 import pandas as pd
 
 import pandapipes as ppipes
 from pandapower.auxiliary import pandapowerNet
 from pandapipes.control.run_control import prepare_run_ctrl as prepare_run_ctrl_ppipes
+from pandapipes.pf.pipeflow_setup import get_warm_start_state, RELEASABLE_INTERNALS
+from pandapipes.timeseries.input_state import get_input_state, count_changed_inputs
 from pandapower.control.run_control import prepare_run_ctrl as prepare_run_ctrl_pp, \
     net_initialization, get_recycle, control_initialization, control_finalization, \
     _evaluate_net as _evaluate_net, control_implementation, get_controller_order, \
-    NetCalculationNotConverged
+    NetCalculationNotConverged, _control_repair
 
 try:
     import pandaplan.core.pplog as logging
@@ -21,6 +26,291 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+# entries of the nets that are not required by the worker processes
+WORKER_EXCLUDED_ENTRIES = ["controller", "output_writer"]
+# internal entries of pandapower nets that are copied back from the worker processes
+WORKER_PANDAPOWER_INTERNALS = ["_ppc", "_pd2ppc_lookups", "_is_elements", "_isolated_buses",
+                               "_options"]
+
+
+def _get_worker_results(net):
+    """
+    Returns the entries of a net calculated in a worker process that are copied back to the net of
+    the multinet: the result tables, the convergence flags and the internal results. Instead of the
+    internal structures of a pipeflow, only its compact warm start state is copied.
+    """
+    results = {key: value for key, value in net.items() if key.startswith("res_")
+               or key in ["converged", "OPF_converged", "_internal_results"]}
+    if isinstance(net, ppipes.pandapipesNet):
+        results["_warm_start"] = get_warm_start_state(net)
+        results["_options"] = net.get("_options")
+    else:
+        results.update({key: net[key] for key in WORKER_PANDAPOWER_INTERNALS if key in net})
+    return results
+
+
+def _net_worker(connection, pickled_net):
+    net = pickle.loads(pickled_net)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        run_funct, tables, kwargs = message
+        for key, table in tables.items():
+            net[key] = table
+        error = None
+        try:
+            run_funct(net, **kwargs)
+        except Exception as err:
+            error = err
+        connection.send((error, _get_worker_results(net)))
+    connection.close()
+
+
+class NetWorkerPool:
+    """
+    Persistent worker processes that hold a copy of one net of a multinet each, so that the
+    pipeflows and power flows of different nets can be calculated concurrently. The solvers of
+    pandapower and pandapipes hold the GIL for most of the calculation time, so that threads do
+    not help here.
+
+    The nets are transferred to the workers only once. For each run, all tables of the net (apart
+    from the result tables and the controllers) are sent to the worker, so that the values written
+    by the controllers are considered, and the result tables, the convergence flags and the internal
+    results are copied back. The workers keep the internal structures of their nets, so that the
+    pipeflow options warm_start and reuse_structure apply to the runs in the worker. Of these
+    structures, only the compact warm start state of pandapipes nets (and the internal structures
+    of pandapower nets, e.g. _ppc) are copied back, and the outdated structures of pandapipes nets
+    are removed from the nets of the multinet. All other entries of the nets (e.g. the fluid or the
+    standard types) must not change while the pool is used.
+
+    :param multinet: multinet with several pandapipes/pandapower nets
+    :type multinet: pandapipes.Multinet
+    :param net_names: The names of the nets for which workers are started. If None, workers are \
+            started for all nets.
+    :type net_names: list, default None
+    """
+
+    def __init__(self, multinet, net_names=None):
+        self.multinet = multinet
+        self.net_names = list(multinet['nets'].keys()) if net_names is None else list(net_names)
+        self._workers = dict()
+        self._connections = dict()
+        for net_name in self.net_names:
+            net = multinet['nets'][net_name]
+            excluded = {key: net.pop(key) for key in WORKER_EXCLUDED_ENTRIES if key in net}
+            try:
+                pickled_net = pickle.dumps(net, protocol=pickle.HIGHEST_PROTOCOL)
+            finally:
+                net.update(excluded)
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_net_worker,
+                                             args=(worker_connection, pickled_net), daemon=True)
+            worker.start()
+            worker_connection.close()
+            self._workers[net_name] = worker
+            self._connections[net_name] = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def send(self, net_name, run_funct, **kwargs):
+        """
+        Starts the run function for the current tables of the given net in its worker.
+        """
+        net = self.multinet['nets'][net_name]
+        tables = {key: value for key, value in net.items() if isinstance(value, pd.DataFrame)
+                  and not key.startswith(("res_", "_")) and key not in WORKER_EXCLUDED_ENTRIES}
+        self._connections[net_name].send((run_funct, tables, kwargs))
+
+    def receive(self, net_name):
+        """
+        Waits for the run of the given net and copies the results to the net.
+
+        :return: error - The exception raised by the run function (None if there was none)
+        :rtype: Exception
+        """
+        error, results = self._connections[net_name].recv()
+        net = self.multinet['nets'][net_name]
+        if isinstance(net, ppipes.pandapipesNet):
+            for key in RELEASABLE_INTERNALS:
+                net.pop(key, None)
+        net.update(results)
+        return error
+
+    def close(self):
+        """
+        Stops all worker processes.
+        """
+        for net_name, connection in self._connections.items():
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+            self._workers[net_name].join(timeout=5)
+        self._workers, self._connections = dict(), dict()
+
+
+class CouplingAcceleration:
+    """
+    Accelerated fixed-point iteration of the values that coupling controllers (e.g.
+    P2GControlMultiEnergy, G2PControlMultiEnergy, GasToGasConversion) exchange between the nets of
+    a multinet. If the coupling values depend on the results of the nets (e.g. through another
+    controller that feeds back results of one net into the inputs of the coupling controllers), the
+    control loop is a fixed-point iteration x = g(x) on the coupling values, where g comprises the
+    calculation of the nets and the control steps.
+
+    After each control step, the values x_k that were used in the last calculation of the nets are
+    compared to the new values g(x_k) written by the coupling controllers. As long as the
+    residual r_k = g(x_k) - x_k is larger than *tol*, the coupling controllers are reset, so that
+    they are called again, and the relaxed values x_k+1 = x_k + omega_k * r_k are written to the
+    nets instead of g(x_k):
+
+        - **relaxation**: constant relaxation factor omega_k = *relaxation_factor* (1 is plain \
+            successive substitution, but with convergence check on the coupling values)
+        - **aitken**: dynamic relaxation factor with the vector form of Aitken's delta-squared \
+            method, omega_k = -omega_k-1 * r_k-1 * (r_k - r_k-1) / abs(r_k - r_k-1)^2, starting \
+            from *relaxation_factor*
+
+    Coupling controllers provide their coupling values with get_exchange_values() and
+    set_exchange_values(multinet, values). The number of control steps that were evaluated in the
+    last control loop is stored in *iterations*.
+
+    :param method: The acceleration method, "relaxation" or "aitken"
+    :type method: str, default "aitken"
+    :param relaxation_factor: The constant (or initial for "aitken") relaxation factor
+    :type relaxation_factor: float, default 1.
+    :param tol: Absolute tolerance of the residual of the coupling values
+    :type tol: float, default 1e-6
+    :param max_relaxation_factor: Upper limit of the absolute value of the relaxation factor of \
+            the "aitken" method
+    :type max_relaxation_factor: float, default 10.
+    """
+
+    METHODS = ["relaxation", "aitken"]
+
+    def __init__(self, method="aitken", relaxation_factor=1., tol=1e-6,
+                 max_relaxation_factor=10.):
+        if method not in self.METHODS:
+            raise UserWarning("The coupling acceleration %s is not supported, please choose one "
+                              "of %s." % (method, self.METHODS))
+        self.method = method
+        self.relaxation_factor = relaxation_factor
+        self.tol = tol
+        self.max_relaxation_factor = max_relaxation_factor
+        self.iterations = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Discards the coupling values of the previous iterations, e.g. before a new control loop.
+        """
+        self.iterations = 0
+        self._controllers = None
+        self._clear_iterates()
+
+    def _clear_iterates(self):
+        self._values = None
+        self._residual = None
+        self._omega = self.relaxation_factor
+
+    def apply(self, multinet, levelorder):
+        """
+        Relaxes the coupling values that the coupling controllers of the level wrote in the last
+        control step and resets the controllers if the coupling values are not converged yet.
+
+        :param multinet: multinet with multinet controllers
+        :type multinet: pandapipes.Multinet
+        :param levelorder: array of tuples (controller, net) of the current level
+        :type levelorder: array-like
+        :return: converged - True if the coupling values did not change by more than tol
+        :rtype: bool
+        """
+        controllers = [ctrl for ctrl, net in levelorder
+                       if net is multinet and hasattr(ctrl, "get_exchange_values")]
+        if not controllers:
+            return True
+        if self._controllers is None or len(controllers) != len(self._controllers) \
+                or any(c1 is not c2 for c1, c2 in zip(controllers, self._controllers)):
+            # new level
+            self._clear_iterates()
+            self._controllers = controllers
+        values = [np.asarray(ctrl.get_exchange_values(), dtype=np.float64) for ctrl in controllers]
+        new_values = np.concatenate([v.ravel() for v in values])
+        self.iterations += 1
+        if self._values is None:
+            self._values = new_values
+            self._reset_controllers()
+            return False
+        residual = new_values - self._values
+        if np.max(np.abs(residual)) <= self.tol:
+            return True
+        if self.method == "aitken" and self._residual is not None:
+            residual_change = residual - self._residual
+            denominator = np.dot(residual_change, residual_change)
+            if denominator > 0:
+                self._omega = float(np.clip(
+                    -self._omega * np.dot(self._residual, residual_change) / denominator,
+                    -self.max_relaxation_factor, self.max_relaxation_factor))
+        self._values = self._values + self._omega * residual
+        self._residual = residual
+        position = 0
+        for ctrl, value in zip(controllers, values):
+            relaxed = self._values[position:position + value.size]
+            position += value.size
+            ctrl.set_exchange_values(multinet, relaxed.reshape(value.shape) if value.ndim
+                                     else relaxed[0])
+        self._reset_controllers()
+        return False
+
+    def _reset_controllers(self):
+        for ctrl in self._controllers:
+            ctrl.applied = False
+
+
+def _input_state_changed(net, net_variables, tol):
+    """
+    Checks if the inputs of the net (c.f. pandapipes.timeseries.input_state) changed by more than
+    tol since its last converged run.
+    """
+    if not net_variables.get('converged', False):
+        return True
+    n_changed, _ = count_changed_inputs(get_input_state(net), net_variables.get('input_state'),
+                                        tol)
+    return n_changed != 0
+
+
+def _store_input_state(net, net_variables):
+    net_variables['input_state'] = get_input_state(net) if net_variables['converged'] else None
+
+
+def _evaluate_nets_in_workers(multinet, pool, net_names, levelorders, ctrl_variables, **kwargs):
+    """
+    Runs the given nets concurrently in the worker processes of the pool and handles the errors in
+    the same way as _evaluate_net.
+    """
+    for net_name in net_names:
+        pool.send(net_name, ctrl_variables['nets'][net_name]['run'], **kwargs)
+    errors = {net_name: pool.receive(net_name) for net_name in net_names}
+    for net_name in net_names:
+        net = multinet['nets'][net_name]
+        net_variables = ctrl_variables['nets'][net_name]
+        error = errors[net_name]
+        if error is not None:
+            if not isinstance(error, net_variables['errors']) \
+                    or not net_variables['continue_on_divergence']:
+                raise error
+            net._ppc = None
+            _control_repair(levelorders[net_name])
+            pool.send(net_name, net_variables['run'], **kwargs)
+            pool.receive(net_name)
+        net_variables['converged'] = net['converged'] or net.get('OPF_converged', False)
+
+
 def _evaluate_multinet(multinet, levelorder, ctrl_variables, **kwargs):
     """
     Within a control loop after all controllers applied their their action "_evaluate_multinet"
@@ -43,12 +333,33 @@ def _evaluate_multinet(multinet, levelorder, ctrl_variables, **kwargs):
     levelorder = np.array(levelorder)
     multinet_converged = []
     rel_nets = _relevant_nets(multinet, levelorder)
+    acceleration = ctrl_variables.get('coupling_acceleration')
+    if acceleration is not None:
+        acceleration.apply(multinet, levelorder)
+    run_nets = {net_name: bool(np.any(rel_nets[net_name])) for net_name in multinet['nets'].keys()}
+    tol = ctrl_variables.get('skip_unchanged_tol')
+    if tol is not None:
+        for net_name, run in run_nets.items():
+            if run and not _input_state_changed(multinet['nets'][net_name],
+                                                ctrl_variables['nets'][net_name], tol):
+                logger.debug("The inputs of net %s did not change, its results are kept."
+                             % net_name)
+                run_nets[net_name] = False
+    pool = ctrl_variables.get('worker_pool')
+    if pool is not None:
+        net_names = [net_name for net_name in pool.net_names if run_nets[net_name]]
+        _evaluate_nets_in_workers(
+            multinet, pool, net_names,
+            {net_name: levelorder[rel_nets[net_name]] for net_name in net_names},
+            ctrl_variables, **kwargs)
     for net_name in multinet['nets'].keys():
         net = multinet['nets'][net_name]
-        rel_levelorder = levelorder[rel_nets[net_name]]
-        ctrl_variables['nets'][net_name] = _evaluate_net(
-            net, rel_levelorder, ctrl_variables['nets'][net_name], **kwargs) if np.any(
-            rel_nets[net_name]) else ctrl_variables['nets'][net_name]
+        if run_nets[net_name] and (pool is None or net_name not in pool.net_names):
+            rel_levelorder = levelorder[rel_nets[net_name]]
+            ctrl_variables['nets'][net_name] = _evaluate_net(
+                net, rel_levelorder, ctrl_variables['nets'][net_name], **kwargs)
+        if run_nets[net_name] and tol is not None:
+            _store_input_state(net, ctrl_variables['nets'][net_name])
         multinet_converged += [ctrl_variables['nets'][net_name]['converged']]
     ctrl_variables['converged'] = np.all(multinet_converged)
     return ctrl_variables
@@ -102,19 +413,49 @@ def net_initialization_multinet(multinet, ctrl_variables, **kwargs):
     :rtype: dict
     """
     ctrl_variables['converged'] = False
+    pool = ctrl_variables.get('worker_pool')
+    tol = ctrl_variables.get('skip_unchanged_tol')
 
+    pool_runs = []
     for net_name in multinet['nets'].keys():
         net = multinet['nets'][net_name]
         kwargs['recycle'] = ctrl_variables['nets'][net_name]['recycle']
         kwargs['only_v_results'] = ctrl_variables['nets'][net_name]['only_v_results']
+        if tol is not None and ctrl_variables['nets'][net_name]['initial_run']:
+            if not _input_state_changed(net, ctrl_variables['nets'][net_name], tol):
+                logger.debug("The inputs of net %s did not change, the initial run is skipped."
+                             % net_name)
+                ctrl_variables['converged'] = max(ctrl_variables['converged'],
+                                                  ctrl_variables['nets'][net_name]['converged'])
+                continue
+        if pool is not None and net_name in pool.net_names \
+                and ctrl_variables['nets'][net_name]['initial_run']:
+            # the initial runs in the worker processes are started here and collected below
+            pool.send(net_name, ctrl_variables['nets'][net_name]['run'], **kwargs)
+            pool_runs.append(net_name)
+            continue
         ctrl_variables['nets'][net_name] = net_initialization(
             net, ctrl_variables['nets'][net_name], **kwargs)
+        if tol is not None and ctrl_variables['nets'][net_name]['initial_run']:
+            _store_input_state(net, ctrl_variables['nets'][net_name])
+        ctrl_variables['converged'] = max(ctrl_variables['converged'],
+                                          ctrl_variables['nets'][net_name]['converged'])
+    errors = [pool.receive(net_name) for net_name in pool_runs]
+    for net_name, error in zip(pool_runs, errors):
+        if error is not None:
+            raise error
+        net = multinet['nets'][net_name]
+        ctrl_variables['nets'][net_name]['converged'] = \
+            net['converged'] or net.get('OPF_converged', False)
+        if tol is not None:
+            _store_input_state(net, ctrl_variables['nets'][net_name])
         ctrl_variables['converged'] = max(ctrl_variables['converged'],
                                           ctrl_variables['nets'][net_name]['converged'])
     return ctrl_variables
 
 
-def run_control(multinet, ctrl_variables=None, max_iter=30, **kwargs):
+def run_control(multinet, ctrl_variables=None, max_iter=30, parallel_nets=False,
+                coupling_acceleration=None, skip_unchanged_tol=None, **kwargs):
     """
     Main function to call a multnet with controllers.
 
@@ -147,6 +488,20 @@ def run_control(multinet, ctrl_variables=None, max_iter=30, **kwargs):
     :type ctrl_variables: dict, default: None
     :param max_iter: number of iterations for each controller to converge
     :type max_iter: int, default: 30
+    :param parallel_nets: if True, the nets are calculated concurrently in persistent worker \
+        processes (c.f. NetWorkerPool), one per net. A pool that is already given in \
+        ctrl_variables['worker_pool'] (e.g. by a time series) is used instead.
+    :type parallel_nets: bool, default: False
+    :param coupling_acceleration: if given, the values exchanged by the coupling controllers are \
+        iterated until they converge, with relaxation or Aitken acceleration (c.f. \
+        CouplingAcceleration). Either the name of the method ("relaxation" or "aitken") or a \
+        CouplingAcceleration instance.
+    :type coupling_acceleration: str or CouplingAcceleration, default: None
+    :param skip_unchanged_tol: if given, a net is only calculated again if one of its input values \
+        (e.g. the mass flows written by the coupling controllers) changed by more than this \
+        absolute tolerance since its last converged run. Otherwise, its results and convergence \
+        state are kept. In a time series, this also applies to the runs of previous time steps.
+    :type skip_unchanged_tol: float, default: None
     :param kwargs: additional keyword arguments handed to each run function
     :type kwargs: dict
     :return: runs an entire control loop
@@ -155,15 +510,32 @@ def run_control(multinet, ctrl_variables=None, max_iter=30, **kwargs):
     ctrl_variables = prepare_run_ctrl(multinet, ctrl_variables)
     controller_order = ctrl_variables['controller_order']
 
-    # initialize each controller prior to the first power flow
-    control_initialization(controller_order)
-
-    # initial run (takes time, but is not needed for every kind of controller)
-    ctrl_variables = net_initialization_multinet(multinet, ctrl_variables, **kwargs)
-
-    # run each controller step in given controller order
-    control_implementation(multinet, controller_order, ctrl_variables, max_iter,
-                           evaluate_net_fct=_evaluate_multinet, **kwargs)
+    own_pool = parallel_nets and ctrl_variables.get('worker_pool') is None \
+        and len(multinet['nets']) > 1
+    if own_pool:
+        ctrl_variables['worker_pool'] = NetWorkerPool(multinet)
+    if coupling_acceleration is not None:
+        if not isinstance(coupling_acceleration, CouplingAcceleration):
+            coupling_acceleration = CouplingAcceleration(coupling_acceleration)
+        coupling_acceleration.reset()
+        ctrl_variables['coupling_acceleration'] = coupling_acceleration
+    if skip_unchanged_tol is not None:
+        ctrl_variables['skip_unchanged_tol'] = skip_unchanged_tol
+    try:
+        # initialize each controller prior to the first power flow
+        control_initialization(controller_order)
+
+        # initial run (takes time, but is not needed for every kind of controller)
+        ctrl_variables = net_initialization_multinet(multinet, ctrl_variables, **kwargs)
+
+        # run each controller step in given controller order
+        control_implementation(multinet, controller_order, ctrl_variables, max_iter,
+                               evaluate_net_fct=_evaluate_multinet, **kwargs)
+    finally:
+        if own_pool:
+            ctrl_variables.pop('worker_pool').close()
+        ctrl_variables.pop('coupling_acceleration', None)
+        ctrl_variables.pop('skip_unchanged_tol', None)
 
     # call finalize function of each controller
     control_finalization(controller_order)
@@ -2,6 +2,13 @@
 # and Energy System Technology (IEE), Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from time import perf_counter
+
+import numpy as np
 import tqdm
 from pandapower import pandapowerNet
 from pandapower.control.util.diagnostic import control_diagnostic
@@ -10,8 +17,13 @@ from pandapower.timeseries.run_time_series import get_recycle_settings, init_tim
     init_output_writer
 
 from pandapipes import pandapipesNet
-from pandapipes.multinet.control.run_control_multinet import prepare_run_ctrl, run_control
-from pandapipes.timeseries.run_time_series import init_default_outputwriter as init_default_ow_pps, run_loop
+from pandapipes.multinet.control.run_control_multinet import prepare_run_ctrl, run_control, \
+    NetWorkerPool
+from pandapipes.timeseries.output_buffer import OutputBuffer
+from pandapipes.timeseries.output_sink import ChunkedOutputSink
+from pandapipes.timeseries.run_time_series import init_default_outputwriter as init_default_ow_pps, run_loop, \
+    check_independent_time_steps
+from pandapipes.timeseries.statistics import run_with_statistics
 
 try:
     import pandaplan.core.pplog as pplog
@@ -20,6 +32,28 @@ except ImportError:
 
 logger = pplog.getLogger(__name__)
 
+class _MultinetStatistics:
+    """
+    Forwards the collection of the statistics of a time step to the TimeSeriesStatistics of each
+    net, with the wall time of the output writer and the convergence of the respective net.
+    """
+
+    def __init__(self, statistics):
+        self.statistics = statistics
+        self.output_times = dict()
+        self.converged = dict()
+
+    def start_step(self, time_step):
+        self.output_times = dict()
+        self.converged = dict()
+        for statistics in self.statistics.values():
+            statistics.start_step(time_step)
+
+    def finish_step(self, pf_converged, ctrl_converged, output_time):
+        for net_name, statistics in self.statistics.items():
+            statistics.finish_step(pf_converged and self.converged.get(net_name, True),
+                                   ctrl_converged, self.output_times.get(net_name, 0.))
+
 
 def _call_output_writer(multinet, time_step, pf_converged, ctrl_converged, ts_variables):
     """
@@ -38,14 +72,19 @@ def _call_output_writer(multinet, time_step, pf_converged, ctrl_converged, ts_va
     :return: calling each output writer in order to save the results which are retrieved
     :rtype: None
     """
+    statistics = ts_variables.get("statistics", None)
     for net_name in multinet['nets'].keys():
         net = multinet['nets'][net_name]
+        output_start = perf_counter()
         output_writer_routine(net, time_step, pf_converged, ctrl_converged,
                               ts_variables['nets'][net_name]["recycle_options"])
+        if statistics is not None:
+            statistics.output_times[net_name] = perf_counter() - output_start
+            statistics.converged[net_name] = ts_variables['nets'][net_name].get('converged', True)
 
 
 def init_time_series(multinet, time_steps, continue_on_divergence=False, verbose=True,
-                     **kwargs):
+                     statistics=None, **kwargs):
     """
     Initializes the time series calculation.
     Besides it creates the dict ts_variables, which includes necessary variables for the time series / control loop.
@@ -58,6 +97,8 @@ def init_time_series(multinet, time_steps, continue_on_divergence=False, verbose
     :type continue_on_divergence: bool, default: False
     :param verbose: prints progess bar or logger debug messages
     :type verbose: bool, default: True
+    :param statistics: TimeSeriesStatistics for some or all nets, with the net names as keys
+    :type statistics: dict, default: None
     :param kwargs: additional keyword arguments handed to each run function
     :type kwargs: dict
     :return: ts_variables which contains all relevant information and boundaries required for time series and
@@ -84,8 +125,18 @@ def init_time_series(multinet, time_steps, continue_on_divergence=False, verbose
         ts_variables['nets'][net_name]['run'] = run[
             net_name] if run is not None else ts_variables['nets'][net_name]['run']
         ts_variables['nets'][net_name]['recycle_options'] = recycle_options
+        if statistics is not None and net_name in statistics:
+            ts_variables['nets'][net_name]['run'] = partial(
+                run_with_statistics, ts_variables['nets'][net_name]['run'], statistics[net_name])
         init_output_writer(net, time_steps)
 
+    if statistics is not None:
+        unknown = set(statistics.keys()) - set(multinet['nets'].keys())
+        if unknown:
+            raise UserWarning("The multinet contains no nets %s for the given statistics."
+                              % sorted(unknown))
+        ts_variables["statistics"] = _MultinetStatistics(statistics)
+
     # time steps to be calculated (list or range)
     ts_variables["time_steps"] = time_steps
     # If True, a diverged run is ignored and the next step is calculated
@@ -100,8 +151,112 @@ def init_time_series(multinet, time_steps, continue_on_divergence=False, verbose
     return ts_variables
 
 
+def run_loop_parallel(multinet, ts_variables, n_workers, **kwargs):
+    """
+    Runs the time series loop of a multinet in several processes. The time steps are split into
+    n_workers contiguous parts, and each process calculates one part with its own copy of the
+    multinet. The results are merged into the output buffers of the nets in the order of the time
+    steps.
+
+    The multinet is handed to the processes as snapshot (c.f. to_snapshot) in a temporary folder,
+    so that the processes share the memory of its tables and profiles.
+
+    This is only valid if the time steps are independent of each other, i.e. not for mass storages
+    or controllers that carry a state from one time step to the next (c.f.
+    check_independent_time_steps), otherwise a UserWarning is raised. The output writers of all
+    nets have to be OutputBuffers.
+
+    :param multinet: multinet with multinet controllers, net distinct controllers and several \
+        pandapipes/pandapower nets
+    :type multinet: pandapipes.Multinet
+    :param ts_variables: contains all relevant information and boundaries required for time \
+        series and control analyses
+    :type ts_variables: dict
+    :param n_workers: number of parts and processes
+    :type n_workers: int
+    :param kwargs: additional keyword arguments handed to each run function
+    :type kwargs: dict
+    :return: No output
+    """
+    # imported here, as pandapipes.io depends on the multinet
+    from pandapipes.io.file_io import to_snapshot
+
+    check_independent_time_steps(multinet, **kwargs)
+    output_writers = dict()
+    for net_name, net in multinet['nets'].items():
+        check_independent_time_steps(net, **kwargs)
+        ow = net.output_writer.iat[0, 0]
+        if not isinstance(ow, OutputBuffer) or isinstance(ow, ChunkedOutputSink):
+            raise UserWarning("A parallel multinet time series requires an OutputBuffer as "
+                              "output writer of each net, which is not given for net %s. It has "
+                              "to be created explicitly for pandapower nets." % net_name)
+        output_writers[net_name] = ow
+
+    parts = [p for p in np.array_split(np.asarray(ts_variables["time_steps"]), n_workers)
+             if len(p)]
+    # the buffers are initialized again in each process and need not be stored
+    np_results = {net_name: ow.np_results for net_name, ow in output_writers.items()}
+    for ow in output_writers.values():
+        ow.np_results = dict()
+    snapshot_path = tempfile.mkdtemp(prefix="multinet_snapshot_")
+    try:
+        to_snapshot(multinet, snapshot_path)
+    finally:
+        for net_name, ow in output_writers.items():
+            ow.np_results = np_results[net_name]
+    kwargs = {k: v for k, v in kwargs.items() if k not in ["output_writer", "progress_function"]}
+    statistics = ts_variables.get("statistics", None)
+    if statistics is not None:
+        kwargs["statistics"] = statistics.statistics
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+            futures = {executor.submit(_run_time_series_part, snapshot_path, part.tolist(),
+                                       ts_variables["continue_on_divergence"], i == len(parts) - 1,
+                                       kwargs): part for i, part in enumerate(parts)}
+            for future in as_completed(futures):
+                part = futures[future]
+                part_results, res_tables, part_statistics = future.result()
+                for net_name, (results, failed, unstable) in part_results.items():
+                    output_writers[net_name].merge_results(part, results, failed, unstable)
+                if res_tables is not None:
+                    for net_name, tables in res_tables.items():
+                        multinet['nets'][net_name].update(tables)
+                if part_statistics is not None:
+                    for net_name, net_statistics in part_statistics.items():
+                        statistics.statistics[net_name].merge(net_statistics)
+                if "progress_bar" in ts_variables:
+                    ts_variables["progress_bar"].update(len(part))
+    finally:
+        shutil.rmtree(snapshot_path, ignore_errors=True)
+
+    for net_name, ow in output_writers.items():
+        ow.time_step = ts_variables["time_steps"][-1]
+        ow.dump(multinet['nets'][net_name])
+
+
+def _run_time_series_part(snapshot_path, time_steps, continue_on_divergence, return_res_tables,
+                          kwargs):
+    from pandapipes.io.file_io import from_snapshot
+
+    multinet = from_snapshot(snapshot_path)
+    for net in multinet['nets'].values():
+        ow = net.output_writer.iat[0, 0]
+        ow.write_time = None
+        ow.output_path = None
+    run_timeseries(multinet, time_steps, continue_on_divergence, verbose=False, **kwargs)
+    part_results = dict()
+    res_tables = dict() if return_res_tables else None
+    for net_name, net in multinet['nets'].items():
+        ow = net.output_writer.iat[0, 0]
+        part_results[net_name] = (ow.np_results, ow._failed, ow._unstable)
+        if return_res_tables:
+            res_tables[net_name] = {k: net[k] for k in net.keys() if k.startswith("res_")}
+    return part_results, res_tables, kwargs.get("statistics", None)
+
+
 def run_timeseries(multinet, time_steps=None, continue_on_divergence=False,
-                   verbose=True, **kwargs):
+                   verbose=True, n_workers=1, **kwargs):
     """
     Time Series main function.
     Runs multiple run functions for each net in multinet. Within each time step several controller loops are conducted
@@ -109,6 +264,9 @@ def run_timeseries(multinet, time_steps=None, continue_on_divergence=False,
     A normal pp.runpp/pps.pipeflow can be optionally replaced by other run functions by setting the run function in
     kwargs.
 
+    If a net has no output writer, the default output writer of pandapipes (an OutputBuffer) or
+    pandapower is used.
+
     :param multinet: multinet with multinet controllers, net distinct controllers and several pandapipes/pandapower nets
     :type multinet: pandapipes.Multinet
     :param time_steps: the number of times a time series calculation shall be conducted
@@ -117,17 +275,41 @@ def run_timeseries(multinet, time_steps=None, continue_on_divergence=False,
     :type continue_on_divergence: bool, default: False
     :param verbose: prints progess bar or logger debug messages
     :type verbose: bool, default: True
-    :param kwargs: additional keyword arguments handed to each run function
+    :param n_workers: number of processes in which the time steps are calculated. If larger than \
+        1, the time steps are split into contiguous parts that are calculated in parallel (c.f. \
+        run_loop_parallel), as in the time series of single nets. Only valid if the time steps \
+        are independent of each other and if all nets have an OutputBuffer as output writer.
+    :type n_workers: int, default: 1
+    :param kwargs: additional keyword arguments handed to each run function. With \
+        parallel_nets=True, the nets are calculated concurrently in persistent worker processes \
+        (c.f. run_control). With a dictionary of TimeSeriesStatistics as *statistics* (with the \
+        net names as keys), the wall times, iterations and convergence of each net are collected \
+        in each time step (not possible together with parallel_nets).
     :type kwargs: dict
     :return: runs the time series loop
     :rtype: None
     """
-    ts_variables = init_time_series(multinet, time_steps, continue_on_divergence, verbose, **kwargs)
+    statistics = kwargs.pop("statistics", None)
+    if statistics is not None and kwargs.get('parallel_nets', False):
+        raise UserWarning("The statistics of the nets cannot be collected if the nets are "
+                          "calculated in worker processes (parallel_nets).")
+    ts_variables = init_time_series(multinet, time_steps, continue_on_divergence, verbose,
+                                    statistics=statistics, **kwargs)
 
     for net_name in multinet['nets'].keys():
         control_diagnostic(multinet['nets'][net_name])
 
-    run_loop(multinet, ts_variables, run_control, _call_output_writer, **kwargs)
+    if n_workers > 1:
+        run_loop_parallel(multinet, ts_variables, n_workers, **kwargs)
+    else:
+        if kwargs.get('parallel_nets', False) and len(multinet['nets']) > 1:
+            # the workers are kept for all time steps, so that the nets are transferred only once
+            ts_variables['worker_pool'] = NetWorkerPool(multinet)
+        try:
+            run_loop(multinet, ts_variables, run_control, _call_output_writer, **kwargs)
+        finally:
+            if 'worker_pool' in ts_variables:
+                ts_variables.pop('worker_pool').close()
 
     # cleanup functions after the last time step was calculated
     for net_name in multinet['nets'].keys():
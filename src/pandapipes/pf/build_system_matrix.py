@@ -262,11 +262,37 @@ def build_system_matrix(net, branch_pit, node_pit, heat_mode):
         load_vector[slack_mass_matrix_indices[tsb_unique]] += tsb_sums
         load_vector[slack_mass_matrix_indices] -= node_pit[slack_nodes, MDOTSLACKINIT]
     else:
-        load_vector = np.zeros(len_n + len_b)
-        load_vector[len_n:] = branch_pit[:, LOAD_VEC_BRANCHES_T]
-        load_vector[:len_n] = node_pit[:, LOAD_T] * (-1)
-        tn_unique, tn_sums = _sum_by_group(use_numba, tn, branch_pit[:, LOAD_VEC_NODES_TO_T])
-        load_vector[tn_unique] += tn_sums
-        load_vector[infeed_node] = 0
+        load_vector = _heat_load_vector(branch_pit, node_pit, tn, infeed_node, use_numba)
 
     return system_matrix, load_vector
+
+
+def build_load_vector_heat(net, branch_pit, node_pit):
+    """
+    Builds only the load vector of the thermal system (c.f. build_system_matrix), e.g. to evaluate
+    the residual for an already factorized system matrix.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param branch_pit: pandapipes internal table for branching components such as pipes or valves
+    :type branch_pit: numpy.ndarray
+    :param node_pit:  pandapipes internal table for node components
+    :type node_pit: numpy.ndarray
+    :return: load_vector
+    :rtype: numpy.ndarray
+    """
+    tn = get_to_nodes_corrected(branch_pit)
+    infeed_node = np.arange(len(node_pit))[node_pit[:, INFEED].astype(np.bool_)]
+    return _heat_load_vector(branch_pit, node_pit, tn, infeed_node,
+                             get_net_option(net, "use_numba"))
+
+
+def _heat_load_vector(branch_pit, node_pit, tn, infeed_node, use_numba):
+    len_n = len(node_pit)
+    load_vector = np.zeros(len_n + len(branch_pit))
+    load_vector[len_n:] = branch_pit[:, LOAD_VEC_BRANCHES_T]
+    load_vector[:len_n] = node_pit[:, LOAD_T] * (-1)
+    tn_unique, tn_sums = _sum_by_group(use_numba, tn, branch_pit[:, LOAD_VEC_NODES_TO_T])
+    load_vector[tn_unique] += tn_sums
+    load_vector[infeed_node] = 0
+    return load_vector
@@ -116,6 +116,32 @@ def _sum_by_group(use_numba, indices, *values):
         return _sum_by_group_numba(indices, *values)
 
 
+def _sum_by_segment(use_numba, pointers, *values):
+    """
+    Auxiliary function to sum up values over contiguous segments. The segments are defined by
+    CSR-style pointers, i.e. segment i comprises the entries pointers[i]:pointers[i + 1]. All \
+    segments must be non-empty. In contrast to `_sum_by_group`, no sorting is necessary and the \
+    results are returned in segment order.
+
+    :param use_numba: If True, the numba segment kernel is used, otherwise np.add.reduceat
+    :type use_numba: bool
+    :param pointers: start indices of all segments plus the end index of the last segment
+    :type pointers: np.ndarray
+    :param values: arrays with one entry per segment member
+    :type values: np.ndarray
+    :return: sums - list with one array of segment sums per value array
+    :rtype: list[np.ndarray]
+    """
+    n_segments = len(pointers) - 1
+    if n_segments <= 0 or pointers[-1] == 0:
+        return [np.zeros(max(n_segments, 0), dtype=np.float64) for _ in values]
+    if use_numba and numba_installed:
+        val_arr = np.array(list(values), dtype=np.float64).transpose()
+        summed = _sum_values_by_segment(pointers.astype(np.int64), val_arr, n_segments, len(values))
+        return [summed[:, i] for i in range(len(values))]
+    return [np.add.reduceat(np.asarray(v, dtype=np.float64), pointers[:-1]) for v in values]
+
+
 def select_from_pit(table_index_array, input_array, data):
     """
         Auxiliary function to retrieve values from a table like a pit. Each data entry corresponds
@@ -158,6 +184,16 @@ def _sum_values_by_index(indices, value_arr, max_ind, le, n_vals):
     return new_indices, summed_values
 
 
+@jit(nopython=True)
+def _sum_values_by_segment(pointers, value_arr, n_segments, n_vals):
+    summed_values = np.zeros((n_segments, n_vals), dtype=np.float64)
+    for s in range(n_segments):
+        for i in range(pointers[s], pointers[s + 1]):
+            for j in range(n_vals):
+                summed_values[s, j] += value_arr[i, j]
+    return summed_values
+
+
 @jit(nopython=True)
 def max_nb(arr):
     return np.max(arr)
@@ -10,6 +10,7 @@ from scipy.sparse import coo_matrix, csgraph
 
 from pandapipes.idx_branch import (
     TOUTINIT,
+    MDOTINIT,
     FROM_NODE,
     TO_NODE,
     branch_cols,
@@ -18,9 +19,10 @@ from pandapipes.idx_branch import (
     FLOW_RETURN_CONNECT,
     ACTIVE,
     ELEMENT_IDX as ELEMENT_IDX_BR,
+    BRANCH_TYPE,
 )
 from pandapipes.idx_node import NODE_TYPE, P, NODE_TYPE_T, node_cols, T, ACTIVE as ACTIVE_ND, \
-    TABLE_IDX as TABLE_IDX_ND, ELEMENT_IDX as ELEMENT_IDX_ND, INFEED, GE, TINIT
+    TABLE_IDX as TABLE_IDX_ND, ELEMENT_IDX as ELEMENT_IDX_ND, INFEED, GE, TINIT, PINIT
 from pandapipes.properties.fluids import get_fluid
 
 try:
@@ -48,7 +50,21 @@ default_options = {"friction_model": "nikuradse", "tol_p": 1e-5, "tol_m": 1e-5,
                    "max_iter_colebrook": 10, "only_update_hydraulic_matrix": False,
                    "reuse_internal_data": False, "use_numba": True,
                    "quit_on_inconsistency_connectivity": False, "calc_compression_power": True,
-                   "transient": False, "dt": None, "tolerance_colebrook": 1e-4,}
+                   "transient": False, "dt": None, "tolerance_colebrook": 1e-4,
+                   "keep_internals": "full", "warm_start": False, "result_dtype": "float64",
+                   "reuse_structure": False}
+
+# the pit columns that make up the warm start state of a net
+WARM_START_COLS = {"node": [PINIT, TINIT], "branch": [MDOTINIT, TOUTINIT]}
+
+# the pit columns that determine the connectivity and the structure of the hydraulic system matrix
+CONNECTIVITY_COLS = {"node": [ACTIVE_ND, NODE_TYPE, NODE_TYPE_T, INFEED],
+                     "branch": [ACTIVE_BR, FROM_NODE, TO_NODE, BRANCH_TYPE, DIRECTED,
+                                FLOW_RETURN_CONNECT]}
+
+# internal structures that are only required during or directly after the pipeflow
+RELEASABLE_INTERNALS = ["_pit", "_active_pit", "_active_old_pit", "_old_pit", "_lookups",
+                        "_internal_data"]
 
 
 def get_net_option(net, option_name):
@@ -170,7 +186,7 @@ def get_lookup(net, pit_type="node", lookup_type="index"):
     all_lookup_types = ["index", "table", "from_to", "active_hydraulics", "active_heat_transfer",
                         "length", "from_to_active_hydraulics", "from_to_active_heat_transfer",
                         "index_active_hydraulics", "index_active_heat_transfer", "zero_flow",
-                        "old_pit_cols"]
+                        "old_pit_cols", "internal_pointers"]
     if lookup_type not in all_lookup_types:
         type_names = "', '".join(all_lookup_types)
         logger.error("No lookup type '%s' exists. Please choose one of '%s'."
@@ -269,6 +285,34 @@ def init_options(net, **kwargs):
 
         - **use_numba** (bool): True - If True, use numba for more efficient internal calculations
 
+        - **keep_internals** (str): "full" - Defines which internal structures are kept in the net\
+                after the pipeflow. With "full", the internal structures (pit, lookups, ...) are\
+                kept. With "results", only the result tables are kept. With "minimal", only the\
+                result tables and a compact warm start state (pressures, mass flows and\
+                temperatures, c.f. **warm_start**) are kept. Transient simulations always keep\
+                the full internal structures.
+
+        - **warm_start** (bool): False - If True, the pipeflow is initialized with the results of\
+                the last converged pipeflow (either from the internal structure or from the\
+                compact warm start state), as long as the structure of the net did not change.\
+                Initial values that are given by the component input (e.g. pressures of external\
+                grids or controlled mass flows) are not overwritten.
+
+        - **result_dtype** (str): "float64" - The data type in which the results are stored in the\
+                result tables (res_*) and in the default time series outputs. With "float32",\
+                the memory of stored results is halved, whereas the pipeflow itself is always\
+                calculated in float64 precision.
+
+        - **reuse_structure** (bool): False - If True, the lookups of the last pipeflow are\
+                reused, as long as the element tables, the numbers of internal nodes and\
+                branches (e.g. the sections of pipes), the fluid and the options mode and\
+                result_dtype did not change. If additionally the active elements and the node and\
+                branch types are the same as in the last pipeflow, also its connectivity check\
+                is reused, and in the hydraulics mode the result tables are only overwritten and\
+                the structure of the system matrix is reused (c.f.\
+                **only_update_hydraulic_matrix**). This option is meant for repeated pipeflows of the\
+                same net, e.g. in a control loop, and requires keep_internals="full".
+
     :param net: The pandapipesNet for which the options are initialized
     :type net: pandapipesNet
     :return: No output
@@ -311,6 +355,8 @@ def init_options(net, **kwargs):
         opts["use_numba"] = False
     opts["fluid"] = get_fluid(net).name
     _mode_check(opts)
+    _keep_internals_check(opts)
+    _result_dtype_check(opts)
 
     net["_options"] = opts
 
@@ -344,6 +390,27 @@ def _mode_check(opts):
         )
         opts["mode"] = "sequential"
 
+def _keep_internals_check(opts):
+    if opts["keep_internals"] not in ["full", "results", "minimal"]:
+        raise UserWarning("The option keep_internals must be one of 'full', 'results' or "
+                          "'minimal', not %s." % opts["keep_internals"])
+    if opts["transient"] and opts["keep_internals"] != "full":
+        logger.warning("Transient simulations require the internal structures of the previous time"
+                       " step. The option keep_internals is set to 'full'.")
+        opts["keep_internals"] = "full"
+
+
+def _result_dtype_check(opts):
+    try:
+        result_dtype = np.dtype(opts["result_dtype"])
+    except TypeError:
+        result_dtype = None
+    if result_dtype not in [np.float32, np.float64]:
+        raise UserWarning("The option result_dtype must be either 'float32' or 'float64', not %s."
+                          % opts["result_dtype"])
+    opts["result_dtype"] = result_dtype.name
+
+
 def create_internal_results(net):
     """
     Initializes a dictionary that shall contain some internal results later.
@@ -371,7 +438,7 @@ def write_internal_results(net, **kwargs):
     net["_internal_results"].update(kwargs)
 
 
-def initialize_pit(net):
+def initialize_pit(net, warm_start_state=None, reuse_lookups=False):
     """
     Initializes and fills the internal structure which is called pit (pandapipes internal tables).
     The structure is a dictionary which should contain one array for all nodes and one array for all
@@ -379,12 +446,19 @@ def initialize_pit(net):
 
     :param net: The pandapipes network for which to create and fill the internal structure
     :type net: pandapipesNet
+    :param warm_start_state: The state of a previous pipeflow to initialize the pit with (c.f. \
+        `get_warm_start_state`)
+    :type warm_start_state: dict, default None
+    :param reuse_lookups: If True, the lookups of the last pipeflow are used (c.f. \
+        `structure_unchanged`)
+    :type reuse_lookups: bool, default False
     :return: (node_pit, branch_pit) - The two internal structure arrays
     :rtype: tuple(np.array)
 
     """
     if not get_net_option(net, "transient") or get_net_option(net, "simulation_time_step") == 0:
-        create_lookups(net)
+        if not reuse_lookups:
+            create_lookups(net)
         pit = create_empty_pit(net)
     else:
         pit = net["_pit"]
@@ -397,6 +471,8 @@ def initialize_pit(net):
         comp.create_pit_branch_entries(net, pit["branch"])
         comp.create_component_array(net, pit["components"])
 
+    apply_warm_start_state(net, pit, warm_start_state)
+
     if not get_net_option(net, "transient") or get_net_option(net, "simulation_time_step") == 0 or not net.converged:
         # This needs to be done after the pit values are set
         create_old_pit(net, [TINIT], [TOUTINIT])
@@ -407,6 +483,171 @@ def initialize_pit(net):
                        "Without any nodes, you are not able to conduct a pipeflow!")
         return
 
+def get_warm_start_state(net):
+    """
+    Returns the state of the last converged pipeflow that can be used to initialize the next \
+    pipeflow. The state is taken from the compact warm start state (stored with the option \
+    keep_internals="minimal") or from the internal structure (pit) of the net.
+
+    :param net: The pandapipes network from which to retrieve the warm start state
+    :type net: pandapipesNet
+    :return: warm_start_state - dictionary with the node and branch values of the columns in \
+        WARM_START_COLS and the from_to lookups, or None if no state is available
+    :rtype: dict
+    """
+    if "_warm_start" in net and net["_warm_start"] is not None:
+        return net["_warm_start"]
+    if not net.get("converged", False) or "_pit" not in net or "_lookups" not in net:
+        return None
+    return {"node": net["_pit"]["node"][:, WARM_START_COLS["node"]].copy(),
+            "branch": net["_pit"]["branch"][:, WARM_START_COLS["branch"]].copy(),
+            "node_from_to": copy.deepcopy(net["_lookups"]["node_from_to"]),
+            "branch_from_to": copy.deepcopy(net["_lookups"]["branch_from_to"])}
+
+
+def apply_warm_start_state(net, pit, warm_start_state):
+    """
+    Overwrites the initial values of the pit with the given warm start state. This is only done if \
+    the structure of the net (the from_to lookups) did not change. Initial values that are given \
+    by the component input (fixed pressure and temperature nodes as well as entries that are \
+    marked by `Component.protect_initial_values`) are kept.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param pit: The internal structure that is to be initialized
+    :type pit: dict
+    :param warm_start_state: The warm start state (c.f. `get_warm_start_state`)
+    :type warm_start_state: dict
+    :return: applied - True if the warm start state was applied
+    :rtype: bool
+    """
+    if warm_start_state is None:
+        return False
+    for pit_type in ("node", "branch"):
+        if warm_start_state["%s_from_to" % pit_type] != get_lookup(net, pit_type, "from_to"):
+            logger.info("The structure of the net changed, so that the warm start state cannot be "
+                        "used. The pipeflow is initialized with the standard initial values.")
+            return False
+    node_pit, branch_pit = pit["node"], pit["branch"]
+    protected = {("node", PINIT): node_pit[:, NODE_TYPE] == P,
+                 ("node", TINIT): node_pit[:, NODE_TYPE_T] == T,
+                 ("branch", MDOTINIT): np.zeros(len(branch_pit), dtype=bool),
+                 ("branch", TOUTINIT): np.zeros(len(branch_pit), dtype=bool)}
+    for comp in net['component_list']:
+        comp.protect_initial_values(net, protected)
+    for (pit_type, col), mask in protected.items():
+        values = warm_start_state[pit_type][:, WARM_START_COLS[pit_type].index(col)]
+        use = ~mask & np.isfinite(values)
+        pit[pit_type][use, col] = values[use]
+    return True
+
+
+def get_structure_key(net):
+    """
+    Returns the properties of the net that determine its lookups and result tables, i.e. the fluid,
+    the options mode and result_dtype, the indices of all element tables and the numbers of
+    internal nodes and branches of the elements (e.g. given by the sections of pipes).
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :return: structure_key - tuple with the fluid, the options and the table indices and numbers \
+            of internal nodes and branches
+    :rtype: tuple
+    """
+    tables = tuple((comp.table_name(), net[comp.table_name()].index.values.copy(),
+                    _get_internal_numbers(net, comp))
+                   for comp in net['component_list'] if comp.table_name() in net)
+    return get_fluid(net).name, get_net_option(net, "mode"), \
+        get_net_option(net, "result_dtype"), tables
+
+
+def _get_internal_numbers(net, comp):
+    """
+    Returns the numbers of internal nodes and branches of all elements of a component (only for \
+    branches with internal nodes, otherwise an empty array).
+    """
+    if not hasattr(comp, "get_internal_node_number"):
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([np.asarray(comp.get_internal_node_number(net), dtype=np.int64),
+                           np.asarray(comp.get_internal_branch_number(net), dtype=np.int64)])
+
+
+def structure_unchanged(net):
+    """
+    Checks if the lookups and result tables of the last pipeflow can be reused (c.f. option \
+    reuse_structure), i.e. if the internal structures of the last pipeflow exist and the structure \
+    key (c.f. `get_structure_key`) did not change.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :return: unchanged - True if the structure of the net did not change
+    :rtype: bool
+    """
+    if get_net_option(net, "transient") or "_pit" not in net \
+            or "structure_key" not in net.get("_lookups", dict()):
+        return False
+    fluid, mode, result_dtype, tables = net["_lookups"]["structure_key"]
+    new_fluid, new_mode, new_result_dtype, new_tables = get_structure_key(net)
+    if (fluid, mode, result_dtype) != (new_fluid, new_mode, new_result_dtype) \
+            or len(tables) != len(new_tables):
+        return False
+    return all(tbl == new_tbl and np.array_equal(idx, new_idx)
+               and np.array_equal(internals, new_internals)
+               for (tbl, idx, internals), (new_tbl, new_idx, new_internals)
+               in zip(tables, new_tables))
+
+
+def get_connectivity_key(net):
+    """
+    Returns the pit columns that determine the result of the connectivity check and the structure \
+    of the hydraulic system matrix (c.f. CONNECTIVITY_COLS).
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :return: connectivity_key - dictionary with the node and branch columns
+    :rtype: dict
+    """
+    return {pit_type: net["_pit"][pit_type][:, cols] for pit_type, cols in
+            CONNECTIVITY_COLS.items()}
+
+
+def connectivity_unchanged(net):
+    """
+    Checks if the connectivity check of the last pipeflow can be reused, i.e. if the active \
+    elements and the node and branch types in the pit are the same as in the last pipeflow.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :return: unchanged - True if the connectivity of the net did not change
+    :rtype: bool
+    """
+    key = net["_lookups"].get("connectivity_key", None)
+    if key is None or "node_active_hydraulics" not in net["_lookups"]:
+        return False
+    new_key = get_connectivity_key(net)
+    return all(np.array_equal(key[pit_type], new_key[pit_type]) for pit_type in key)
+
+
+def release_internals(net):
+    """
+    Removes the internal structures from the net after the pipeflow according to the option \
+    keep_internals. With "minimal", a compact warm start state is stored before (c.f. \
+    `get_warm_start_state`).
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :return: No output
+    """
+    keep_internals = get_net_option(net, "keep_internals")
+    net.pop("_warm_start", None)
+    if keep_internals == "full":
+        return
+    if keep_internals == "minimal":
+        net["_warm_start"] = get_warm_start_state(net)
+    for key in RELEASABLE_INTERNALS:
+        net.pop(key, None)
+
+
 def create_empty_pit(net):
     """
     Creates an empty internal structure which is called pit (pandapipes internal tables). The\
@@ -498,6 +739,9 @@ def create_lookups(net):
       - branch_index: Lookup from component index (e.g. pipe 1) to pit index (e.g. 5) for branches.
       - internal_nodes_lookup: Lookup for internal nodes of branch components that makes result\
                                extraction a lot easier.
+      - branch_internal_pointers: CSR-style segment pointers (relative to the table start in the\
+                                  branch pit) of the internal sections of each branch component\
+                                  with internals. Used to reduce section results to elements.
 
     :param net: The pandapipes network for which to create the lookups
     :type net: pandapipesNet
@@ -523,7 +767,30 @@ def create_lookups(net):
                        "node_table": node_table_lookups, "branch_table": branch_table_lookups,
                        "node_index": node_idx_lookups, "branch_index": branch_idx_lookups,
                        "node_length": node_from, "branch_length": branch_from,
-                       "internal_nodes": internal_nodes, "internal_branches": internal_branches}
+                       "internal_nodes": internal_nodes, "internal_branches": internal_branches,
+                       "branch_internal_pointers": create_internal_pointers(internal_branches)}
+
+
+def create_internal_pointers(internal_branches):
+    """
+    Create the section-to-element reduction plan for branch components with internals. As the \
+    internal sections of each element are stored consecutively in the branch pit (in the order of \
+    the component table), the sections of element i are found at the rows \
+    pointers[i]:pointers[i + 1] relative to the start of the component in the branch pit.
+
+    :param internal_branches: The lookup with first and last internal branch of each element \
+        (c.f. `get_internal_lookup_structure`)
+    :type internal_branches: dict
+    :return: pointers - Dictionary with segment pointers for each table
+    :rtype: dict
+    """
+    pointers = dict()
+    for tbl, lookup in internal_branches.items():
+        pointers[tbl] = np.zeros(len(lookup) + 1, dtype=np.int64)
+        if len(lookup):
+            pointers[tbl][:-1] = lookup[:, 0]
+            pointers[tbl][-1] = lookup[-1, 1] + 1
+    return pointers
 
 
 def identify_active_nodes_branches(net, hydraulic=True):
@@ -3,7 +3,6 @@ import numpy as np
 from pandapipes.constants import NORMAL_PRESSURE, NORMAL_TEMPERATURE
 from pandapipes.idx_branch import (
     QEXT,
-    ELEMENT_IDX,
     FROM_NODE,
     TO_NODE,
     MDOTINIT,
@@ -17,7 +16,7 @@ from pandapipes.idx_branch import (
     FROM_NODE_T_SWITCHED, DP_FRICT_LOSS,
 )
 from pandapipes.idx_node import TABLE_IDX as TABLE_IDX_NODE, PINIT, PAMB, TINIT as TINIT_NODE
-from pandapipes.pf.internals_toolbox import _sum_by_group
+from pandapipes.pf.internals_toolbox import _sum_by_segment
 from pandapipes.pf.pipeflow_setup import get_table_number, get_lookup, get_net_option
 from pandapipes.properties.fluids import get_fluid
 from pandapipes.properties.properties_toolbox import get_branch_real_density
@@ -195,13 +194,15 @@ def extract_branch_results_with_internals(net, branch_results, table_name,
     # table?)
     f, t = get_lookup(net, "branch", "from_to")[table_name]
 
-    branch_pit = net["_pit"]["branch"]
-    # since the function _sum_by_group sorts the entries by an index (in this case the index of the
-    # respective table), the placement of the indices mus be known to allocate the values correctly
-    placement_table = np.argsort(net[table_name].index.values)
-    idx_pit = branch_pit[f:t, ELEMENT_IDX]
+    # section-to-element reduction plan: the internal sections of each element are stored
+    # consecutively (in the order of the table) in the branch pit, so that the sections of element
+    # i are found at pointers[i]:pointers[i + 1] (relative to f)
+    pointers = get_lookup(net, "branch", "internal_pointers")[table_name]
+    sections = np.diff(pointers)
+    last_sections = f + pointers[1:] - 1
 
     node_pit = net["_pit"]["node"]
+    use_numba = get_net_option(net, "use_numba")
 
     # the id of the external node table inside the node_pit (mostly this is "junction": 0)
     ext_node_tbl_idx = get_table_number(get_lookup(net, "node", "table"), internal_node_name)
@@ -228,32 +229,20 @@ def extract_branch_results_with_internals(net, branch_results, table_name,
             external_active = comp_connected[end_nodes_external]
             for res_name, entry in res_ext:
                 res_table[res_name].values[external_active] = branch_results[entry][f:t][considered]
-        if len(res_mean) > 0:
-            # results that relate to the whole branch and shall be averaged (by summing up all
-            # values and dividing by number of internal sections)
-            use_numba = get_net_option(net, "use_numba")
-            res = _sum_by_group(use_numba, idx_pit, np.ones_like(idx_pit),
-                                comp_connected.astype(np.int32),
-                                *[branch_results[rn[1]][f:t] for rn in res_mean])
-            connected_ind = res[2] > 0.99
-            num_internals = res[1][connected_ind]
-
-            # hint: idx_pit[placement_table] should result in the indices as ordered in the table
-            pt = placement_table[connected_ind]
-
-            for i, (res_name, entry) in enumerate(res_mean_hydraulics):
-                res_table[res_name].values[pt] = res[i + 3][connected_ind] / num_internals
-        if len(res_branch) > 0:
-            use_numba = get_net_option(net, "use_numba")
-            _, sections, connected_sum = _sum_by_group(use_numba, idx_pit, np.ones_like(idx_pit),
-                                comp_connected.astype(np.int32))
-            connected_ind = connected_sum > 0.99
-            indices_last_section = (np.cumsum(sections) - 1).astype(int)[connected_ind]
-            # hint: idx_pit[placement_table] should result in the indices as ordered in the table
-            pt = placement_table[connected_ind]
-
-            for i, (res_name, entry) in enumerate(res_branch):
-                res_table[res_name].values[pt] = branch_results[entry][indices_last_section]
+        if len(res_mean) == 0 and len(res_branch) == 0:
+            continue
+        # results that relate to the whole branch and shall be averaged (by summing up all values
+        # and dividing by number of internal sections)
+        connected_sum, *mean_sums = _sum_by_segment(
+            use_numba, pointers, comp_connected, *[branch_results[rn[1]][f:t] for rn in res_mean])
+        connected_ind = connected_sum > 0.99
+        for (res_name, _), summed in zip(res_mean, mean_sums):
+            res_table[res_name].values[connected_ind] = \
+                summed[connected_ind] / sections[connected_ind]
+        # results that are taken from the last internal section of each element
+        for res_name, entry in res_branch:
+            res_table[res_name].values[connected_ind] = \
+                branch_results[entry][last_sections[connected_ind]]
 
 
 def extract_branch_results_without_internals(net, branch_results, required_results_hydraulic,
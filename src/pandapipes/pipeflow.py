@@ -2,6 +2,8 @@
 # and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+from time import perf_counter
+
 import numpy as np
 from scipy.sparse.linalg import spsolve
 
@@ -14,7 +16,8 @@ from pandapipes.pf.pipeflow_setup import (
     get_net_option, get_net_options, set_net_option, init_options, create_internal_results,
     write_internal_results, get_lookup, create_lookups, initialize_pit, reduce_pit,
     set_user_pf_options, init_all_result_tables, identify_active_nodes_branches,
-    check_infeed_number, PipeflowNotConverged
+    check_infeed_number, get_warm_start_state, release_internals, structure_unchanged,
+    connectivity_unchanged, get_structure_key, get_connectivity_key, PipeflowNotConverged
 )
 from pandapipes.pf.result_extraction import extract_all_results, extract_results_active_pit
 
@@ -60,14 +63,22 @@ def pipeflow(net, sol_vec=None, **kwargs):
     # Inputs & initialization of variables
     # ------------------------------------------------------------------------------------------
 
+    start_time = perf_counter()
+
     # Init physical constants and options
     init_options(net, **kwargs)
+    create_internal_results(net)
 
-    # init result tables
-    init_all_result_tables(net)
+    # the state of the previous pipeflow has to be retrieved before the lookups are overwritten
+    warm_start_state = get_warm_start_state(net) if get_net_option(net, "warm_start") else None
 
-    create_lookups(net)
-    initialize_pit(net)
+    reuse_structure = get_net_option(net, "reuse_structure") and structure_unchanged(net)
+    if not reuse_structure:
+        # init result tables
+        init_all_result_tables(net)
+
+        create_lookups(net)
+    initialize_pit(net, warm_start_state, reuse_structure)
 
     net.converged = False
     calculation_mode = get_net_option(net, "mode")
@@ -75,27 +86,66 @@ def pipeflow(net, sol_vec=None, **kwargs):
     calculate_heat = calculation_mode in ["heat", 'sequential']
     calculate_bidrect = calculation_mode == "bidirectional"
 
+    reuse_connectivity = reuse_structure and connectivity_unchanged(net)
+    if get_net_option(net, "reuse_structure"):
+        prepare_structure_reuse(net, reuse_structure, reuse_connectivity)
 
-    # TODO: This is not necessary in every time step, but we need the result! The result of the
-    #       connectivity check is currently not saved anywhere!
     # cannot be moved to calculate_hydraulics as the active node/branch hydraulics lookup is also required to
     # determine the active node/branch heat transfer lookup
-    identify_active_nodes_branches(net)
+    if not reuse_connectivity:
+        identify_active_nodes_branches(net)
 
     if calculation_mode == 'heat':
         use_given_hydraulic_results(net, sol_vec)
 
     if not (calculate_hydraulics | calculate_heat | calculate_bidrect):
         raise UserWarning("No proper calculation mode chosen.")
-    elif calculate_bidrect:
-        bidirectional(net)
-    else:
-        if calculate_hydraulics:
-            hydraulics(net)
-        if calculate_heat:
-            heat_transfer(net)
 
-    extract_all_results(net, calculation_mode)
+    solve_start_time = perf_counter()
+    try:
+        if calculate_bidrect:
+            bidirectional(net)
+        else:
+            if calculate_hydraulics:
+                hydraulics(net)
+            if calculate_heat:
+                heat_transfer(net)
+
+        extract_start_time = perf_counter()
+        extract_all_results(net, calculation_mode)
+        write_internal_results(net, time_setup_s=solve_start_time - start_time,
+                               time_solve_s=extract_start_time - solve_start_time,
+                               time_extract_s=perf_counter() - extract_start_time)
+    finally:
+        # the internal structures are also released if the pipeflow does not converge
+        release_internals(net)
+
+
+def prepare_structure_reuse(net, reuse_structure, reuse_connectivity):
+    """
+    Prepares a pipeflow with the option reuse_structure. The result tables are initialized again
+    if the lookups were reused, but the connectivity changed or other modes than hydraulics are
+    calculated. In the hydraulics mode, the structure of the system matrix is kept for the next
+    pipeflow, unless the connectivity changed.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param reuse_structure: True if the lookups of the last pipeflow are reused
+    :type reuse_structure: bool
+    :param reuse_connectivity: True if the connectivity check of the last pipeflow is reused
+    :type reuse_connectivity: bool
+    :return: No output
+    """
+    hydraulics_only = get_net_option(net, "mode") == "hydraulics"
+    if reuse_structure and not (reuse_connectivity and hydraulics_only):
+        init_all_result_tables(net)
+    net["_lookups"]["structure_key"] = get_structure_key(net)
+    net["_lookups"]["connectivity_key"] = get_connectivity_key(net)
+    if hydraulics_only:
+        if not reuse_connectivity:
+            net.pop("_internal_data", None)
+        set_net_option(net, "only_update_hydraulic_matrix", True)
+        set_net_option(net, "reuse_internal_data", True)
 
 
 def use_given_hydraulic_results(net, sol_vec):
@@ -117,7 +167,6 @@ def newton_raphson(net, funct, mode, solver_vars, tols, pit_names, iter_name):
     niter = 0
     # This branch is used to stop the solver after a specified error tolerance is reached
     errors = {var: [] for var in solver_vars}
-    create_internal_results(net)
     residual_norm = None
     # This loop is left as soon as the solver converged
     # Assumes this loop is the Newton-Raphson iteration loop
@@ -308,6 +357,9 @@ def rerun_hydraulics(net):
     if rerun:
         extract_results_active_pit(net, 'hydraulics')
         identify_active_nodes_branches(net)
+        # the connectivity differs from the one given by the initial pit
+        net["_lookups"].pop("connectivity_key", None)
+        net.pop("_internal_data", None)
         hydraulics(net)
 
 def rerun_heat_transfer(net):
@@ -358,13 +410,49 @@ def solve_temperature(net):
 
     """
 
+    options = net["_options"]
+    branch_pit = net["_active_pit"]["branch"]
+    node_pit = net["_active_pit"]["node"]
+
+    calculate_thermal_derivatives_active_pit(net)
+
+    t_init_old = node_pit[:, TINIT].copy()
+    t_out_old = branch_pit[:, TOUTINIT].copy()
+    filtered = [None, None]
+    if not check_infeed_number(node_pit):
+        return [branch_pit[:, TOUTINIT], t_out_old, node_pit[:, TINIT], t_init_old], np.array([
+            np.nan]), filtered
+
+    jacobian, epsilon = build_system_matrix(net, branch_pit, node_pit, True)
+
+    x = spsolve(jacobian, epsilon)
+
+    if np.any(np.isnan(x)):
+        return [branch_pit[:, TOUTINIT], t_out_old, node_pit[:, TINIT], t_init_old], np.array([
+            np.nan]), filtered
+
+    node_pit[:, TINIT] -= x[:len(node_pit)] * options["alpha"]
+    branch_pit[:, TOUTINIT] -= x[len(node_pit):] * options["alpha"]
+
+    return [branch_pit[:, TOUTINIT], t_out_old, node_pit[:, TINIT], t_init_old], epsilon, filtered
+
+
+def calculate_thermal_derivatives_active_pit(net):
+    """
+    Calculates the derivatives and load vector entries of the temperature equations for the active
+    pit (including the adaptions of all components), i.e. all entries that are required to build
+    the thermal system matrix.
+
+    :param net: The pandapipesNet for which to calculate the derivatives
+    :type net: pandapipesNet
+    :return: No output
+    """
     options = net["_options"]
     branch_pit = net["_active_pit"]["branch"]
     node_pit = net["_active_pit"]["node"]
     branch_pit_old = net["_active_old_pit"]["branch"]
     node_pit_old = net["_active_old_pit"]["node"]
 
-
     branch_lookups = get_lookup(net, "branch", "from_to_active_heat_transfer")
 
     # Negative velocity values are turned to positive ones (including exchange of from_node and
@@ -386,26 +474,6 @@ def solve_temperature(net):
                                                 branch_pit_old, node_pit_old,
                                                 branch_lookups, options)
 
-    t_init_old = node_pit[:, TINIT].copy()
-    t_out_old = branch_pit[:, TOUTINIT].copy()
-    filtered = [None, None]
-    if not check_infeed_number(node_pit):
-        return [branch_pit[:, TOUTINIT], t_out_old, node_pit[:, TINIT], t_init_old], np.array([
-            np.nan]), filtered
-
-    jacobian, epsilon = build_system_matrix(net, branch_pit, node_pit, True)
-
-    x = spsolve(jacobian, epsilon)
-
-    if np.any(np.isnan(x)):
-        return [branch_pit[:, TOUTINIT], t_out_old, node_pit[:, TINIT], t_init_old], np.array([
-            np.nan]), filtered
-
-    node_pit[:, TINIT] -= x[:len(node_pit)] * options["alpha"]
-    branch_pit[:, TOUTINIT] -= x[len(node_pit):] * options["alpha"]
-
-    return [branch_pit[:, TOUTINIT], t_out_old, node_pit[:, TINIT], t_init_old], epsilon, filtered
-
 
 def set_damping_factor(net, niter, errors):
     """
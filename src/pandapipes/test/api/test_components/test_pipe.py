@@ -5,6 +5,7 @@ import numpy as np
 import pytest
 
 import pandapipes
+from pandapipes.idx_branch import RE, TOUTINIT
 from pandapipes.properties.fluids import _add_fluid_to_net
 import copy
 
@@ -123,6 +124,40 @@ def test_pipe_sections_temperature(use_numba):
     )
 
 
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_pipe_sections_mean_results(use_numba):
+    """
+        This test verifies that the mean and outlet results of pipes with several sections are
+        assigned to the correct pipes, also if the pipe table index is not sorted and the pipes are
+        not the first branch component in the internal structure.
+        :return:
+        :rtype:
+        """
+    net = pandapipes.create_empty_network("net", add_stdtypes=False)
+    pandapipes.create_junctions(net, 4, pn_bar=5, tfluid_k=330)
+    pandapipes.create_valve(net, 0, 1, "ju", 200)
+    pandapipes.create_pipe_from_parameters(net, 1, 2, 2.0, 100, k_mm=.1, sections=3, u_w_per_m2k=5,
+                                           text_k=285.15, index=7)
+    pandapipes.create_pipe_from_parameters(net, 2, 3, 1.0, 80, k_mm=.1, sections=5, u_w_per_m2k=5,
+                                           text_k=285.15, index=2)
+    pandapipes.create_ext_grid(net, 0, p_bar=5, t_k=360, type="pt")
+    pandapipes.create_sink(net, 3, mdot_kg_per_s=2)
+    pandapipes.create_fluid_from_lib(net, "water")
+
+    pandapipes.pipeflow(net, mode="sequential", use_numba=use_numba)
+
+    f, _ = pandapipes.get_lookup(net, "branch", "from_to")["pipe"]
+    pointers = pandapipes.get_lookup(net, "branch", "internal_pointers")["pipe"]
+    assert np.all(pointers == [0, 3, 8])
+
+    branch_pit = net["_pit"]["branch"]
+    for pos, sec_f, sec_t in zip(range(2), pointers[:-1], pointers[1:]):
+        rows = np.arange(f + sec_f, f + sec_t)
+        assert np.isclose(net.res_pipe.reynolds.values[pos], np.mean(branch_pit[rows, RE]))
+        assert np.isclose(net.res_pipe.t_outlet_k.values[pos], branch_pit[rows[-1], TOUTINIT])
+    assert np.isclose(net.res_pipe.at[7, "t_to_k"], net.res_pipe.at[2, "t_from_k"])
+
+
 @pytest.fixture
 def create_net_3_juncs():
     net = pandapipes.create_empty_network()
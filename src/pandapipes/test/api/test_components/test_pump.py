@@ -9,6 +9,7 @@ import pandas as pd
 import pytest
 
 import pandapipes
+from pandapipes.std_types.std_type_class import PumpStdType
 from pandapipes.test import data_path
 
 
@@ -134,6 +135,70 @@ def test_pump_from_std_type(use_numba):
     assert np.all(v_diff < 0.01)
 
 
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_pump_several_std_types(use_numba):
+    """
+    pumps of different std types (with regression polynomials of different degrees) in one net
+        :return:
+        :rtype:
+        """
+    net = pandapipes.create_empty_network("net", add_stdtypes=True, fluid="water")
+
+    j0 = pandapipes.create_junction(net, pn_bar=5, tfluid_k=283.15)
+    std_types = ['P3', 'P1', 'P1', 'P2', 'custom']
+    pandapipes.create_std_type(net, "pump", "custom",
+                               PumpStdType("custom", [-1e-3, 2e-2, 0.5, 3.]))
+    for i, std_type in enumerate(std_types):
+        j1, j2, j3 = pandapipes.create_junctions(net, 3, pn_bar=5, tfluid_k=283.15)
+        pandapipes.create_pipe_from_parameters(net, j0, j1, 0.1, 100, k_mm=0.1)
+        pandapipes.create_pump(net, j1, j2, std_type=std_type, index=10 - i)
+        pandapipes.create_pipe_from_parameters(net, j2, j3, 0.1, 100, k_mm=0.1)
+        pandapipes.create_sink(net, j3, 1 + 2 * i)
+    pandapipes.create_ext_grid(net, j0, 5, 283.15, type="p")
+
+    pandapipes.pipeflow(net, use_numba=use_numba)
+
+    vdot = net.res_pump.mdot_from_kg_per_s.values / net.fluid.get_density(273.15)
+    for idx, v, dp in zip(net.pump.index, vdot, net.res_pump.deltap_bar.values):
+        expected = net.std_types["pump"][net.pump.at[idx, "std_type"]].get_pressure(v)
+        assert expected > 0
+        assert np.isclose(dp, expected, rtol=1e-4)
+
+
+class ConstantLiftPumpStdType(PumpStdType):
+    def get_pressure(self, vdot_m3_per_s):
+        return 2.5 if vdot_m3_per_s >= 0 else 0.
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_pump_custom_get_pressure(use_numba):
+    """
+    std types that override get_pressure are evaluated with their own method
+        :return:
+        :rtype:
+        """
+    net = pandapipes.create_empty_network("net", add_stdtypes=True, fluid="water")
+
+    j0 = pandapipes.create_junction(net, pn_bar=5, tfluid_k=283.15)
+    pandapipes.create_std_type(net, "pump", "constant",
+                               ConstantLiftPumpStdType("constant", [-1e-3, 2e-2, 0.5, 3.]))
+    for i, std_type in enumerate(['P1', 'constant', 'P2']):
+        j1, j2, j3 = pandapipes.create_junctions(net, 3, pn_bar=5, tfluid_k=283.15)
+        pandapipes.create_pipe_from_parameters(net, j0, j1, 0.1, 100, k_mm=0.1)
+        pandapipes.create_pump(net, j1, j2, std_type=std_type)
+        pandapipes.create_pipe_from_parameters(net, j2, j3, 0.1, 100, k_mm=0.1)
+        pandapipes.create_sink(net, j3, 1 + 2 * i)
+    pandapipes.create_ext_grid(net, j0, 5, 283.15, type="p")
+
+    pandapipes.pipeflow(net, use_numba=use_numba)
+
+    assert np.isclose(net.res_pump.at[1, "deltap_bar"], 2.5)
+    vdot = net.res_pump.mdot_from_kg_per_s.values / net.fluid.get_density(273.15)
+    for idx in [0, 2]:
+        expected = net.std_types["pump"][net.pump.at[idx, "std_type"]].get_pressure(vdot[idx])
+        assert np.isclose(net.res_pump.at[idx, "deltap_bar"], expected, rtol=1e-4)
+
+
 @pytest.mark.parametrize("use_numba", [True, False])
 def test_pump_bypass_on_reverse_flow(use_numba):
     """
@@ -4,8 +4,12 @@
 
 import os
 
+import numpy as np
+import pandas as pd
 import pandapipes
 import pytest
+from pandapower.control import ConstControl
+from pandapower.timeseries import DFData
 from pandas.testing import assert_frame_equal
 from pandapipes.test.multinet.test_control_multinet import get_gas_example, get_power_example_simple
 from pandapipes.multinet.create_multinet import create_empty_multinet, add_nets_to_multinet
@@ -179,5 +183,50 @@ def test_json_string_multinet(tmp_path, get_gas_example, get_power_example_simpl
     assert nets_equal(mn['nets']['gas'], net_gas)
 
 
+def test_snapshot_multinet(tmp_path, get_gas_example, get_power_example_simple):
+    """
+    Checks if a multinet saved and reloaded as snapshot is identical and if its arrays are
+    mapped into memory without changing the snapshot.
+    """
+    net_gas = get_gas_example
+    net_power = get_power_example_simple
+    profiles = pd.DataFrame({"sink": np.linspace(0.01, 0.02, 1000)})
+    ConstControl(net_gas, "sink", "mdot_kg_per_s", net_gas.sink.index[:1], profile_name=["sink"],
+                 data_source=DFData(profiles))
+    mn = create_empty_multinet("test_p2g")
+    add_nets_to_multinet(mn, power=net_power, gas=net_gas)
+    path = os.path.join(str(tmp_path), "snapshot")
+
+    pandapipes.to_snapshot(mn, path)
+    assert sorted(os.listdir(path)) == ["array_0.npy", "structure.p"]
+
+    mn2 = pandapipes.from_snapshot(path)
+    assert isinstance(mn2, MultiNet)
+    assert nets_equal_pandapower(mn2['nets']['power'], net_power)
+    assert nets_equal(mn2['nets']['gas'], net_gas)
+    df = mn2['nets']['gas'].controller.object.iat[0].data_source.df
+    assert isinstance(df._mgr.blocks[0].values, np.memmap)
+    assert_frame_equal(df, profiles)
+
+    # changes are copied for the loaded multinet only
+    df.iloc[0, 0] = 1.
+    assert pandapipes.from_snapshot(path)['nets']['gas'].controller.object.iat[0] \
+        .data_source.df.iat[0, 0] == 0.01
+
+    df = pandapipes.from_snapshot(path, mode="r")['nets']['gas'].controller.object.iat[0] \
+        .data_source.df
+    with pytest.raises(ValueError):
+        df.iloc[0, 0] = 1.
+    df = pandapipes.from_snapshot(path, mode=None)['nets']['gas'].controller.object.iat[0] \
+        .data_source.df
+    assert not isinstance(df._mgr.blocks[0].values, np.memmap)
+
+    pandapipes.pipeflow(mn2['nets']['gas'])
+    assert mn2['nets']['gas'].converged
+
+    with pytest.raises(UserWarning):
+        pandapipes.from_snapshot(str(tmp_path))
+
+
 if __name__ == '__main__':
     pytest.main(["test_file_io.py"])
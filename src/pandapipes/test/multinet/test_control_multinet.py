@@ -6,15 +6,20 @@ import copy
 
 import numpy as np
 import pandapower
+import pandas as pd
 import pytest
 from pandapower import networks as e_nw
+from pandapower.control.basic_controller import Controller
 from pandapower.control.controller.const_control import ConstControl
+from pandapower.timeseries import DFData
 
 import pandapipes
 from pandapipes import networks as g_nw
+from pandapipes.multinet.control.controller import BulkCouplingControl, merge_coupling_controls
 from pandapipes.multinet.control.controller.multinet_control import P2GControlMultiEnergy, \
-    G2PControlMultiEnergy, GasToGasConversion, coupled_p2g_const_control
-from pandapipes.multinet.control.run_control_multinet import run_control
+    G2PControlMultiEnergy, GasToGasConversion, coupled_p2g_const_control, \
+    coupled_g2p_const_control
+from pandapipes.multinet.control.run_control_multinet import run_control, CouplingAcceleration
 from pandapipes.multinet.create_multinet import create_empty_multinet, add_nets_to_multinet
 from pandapipes.test import runpp_with_mark, pipeflow_with_mark
 
@@ -420,5 +425,244 @@ def test_p2g_single_run_parameter(get_gas_example, get_power_example_simple):
     assert net_gas["mark"] == "pipeflow"
 
 
+def test_run_control_worker_pool(get_gas_example, get_power_example_simple):
+    """ the nets are calculated concurrently in worker processes with the same results"""
+    net_gas = copy.deepcopy(get_gas_example)
+    net_power = copy.deepcopy(get_power_example_simple)
+
+    mn = create_empty_multinet("test_workers")
+    add_nets_to_multinet(mn, power=net_power, gas=net_gas)
+
+    p2g_id_el = pandapower.create_load(net_power, 6, p_mw=50, name="power to gas consumption")
+    p2g_id_gas = pandapipes.create_source(net_gas, 1, 0, name="power to gas feed in")
+    g2p_id_gas = pandapipes.create_sink(net_gas, 2, mdot_kg_per_s=0.5,
+                                        name="gas to power consumption")
+    g2p_id_el = pandapower.create_sgen(net_power, 5, 0, name="gas to power feed in")
+    P2GControlMultiEnergy(mn, p2g_id_el, p2g_id_gas, efficiency=0.5)
+    G2PControlMultiEnergy(mn, g2p_id_el, g2p_id_gas, efficiency=0.4)
+    mn_sequential = copy.deepcopy(mn)
+
+    run_control(mn_sequential, max_iter_hyd=8)
+    ctrl_variables = {"nets": dict()}
+    run_control(mn, ctrl_variables=ctrl_variables, max_iter_hyd=8, parallel_nets=True)
+
+    # the worker processes are stopped after the control loop
+    assert "worker_pool" not in ctrl_variables
+    assert net_gas.converged and net_power.converged
+    for net_name, table in [("gas", "res_junction"), ("gas", "res_source"), ("power", "res_bus"),
+                            ("power", "res_sgen")]:
+        assert np.allclose(mn.nets[net_name][table].values.astype(float),
+                           mn_sequential.nets[net_name][table].values.astype(float),
+                           equal_nan=True)
+    assert np.isclose(net_gas.source.at[p2g_id_gas, "mdot_kg_per_s"],
+                      mn_sequential.nets["gas"].source.at[p2g_id_gas, "mdot_kg_per_s"])
+
+    # the internal results and the warm start state are copied back, the outdated pit is removed
+    assert "_pit" not in net_gas and net_gas._warm_start is not None
+    assert net_gas._internal_results["iterations_hydraulics"] > 0
+    assert net_power._ppc is not None
+    cold_iterations = mn_sequential.nets["gas"]._internal_results["iterations_hydraulics"]
+    pandapipes.pipeflow(net_gas, warm_start=True)
+    assert net_gas._internal_results["iterations_hydraulics"] < cold_iterations
+
+
+class CompressorLoad(Controller):
+    """ power demand of the compressors, which depends on the gas taken from the external grid """
+
+    def __init__(self, multinet, load_index, base_mw, mw_per_kg_per_s):
+        super().__init__(multinet, order=-1)
+        self.load_index = load_index
+        self.base_mw = base_mw
+        self.mw_per_kg_per_s = mw_per_kg_per_s
+
+    def get_all_net_names(self):
+        return ["power", "gas"]
+
+    def target_mw(self, multinet):
+        mdot_ext_grid = -multinet.nets["gas"].res_ext_grid.mdot_kg_per_s.sum()
+        return self.base_mw + self.mw_per_kg_per_s * mdot_ext_grid
+
+    def is_converged(self, multinet):
+        return np.isclose(self.target_mw(multinet),
+                          multinet.nets["power"].load.at[self.load_index, "p_mw"], rtol=0,
+                          atol=1e-9)
+
+    def control_step(self, multinet):
+        multinet.nets["power"].load.at[self.load_index, "p_mw"] = self.target_mw(multinet)
+
+
+def test_coupling_acceleration(get_gas_example, get_power_example_simple):
+    """ the P2G gas production feeds back into the power demand, which is solved as fixed-point
+    iteration with relaxation and with Aitken acceleration """
+    net_gas = copy.deepcopy(get_gas_example)
+    net_power = copy.deepcopy(get_power_example_simple)
+
+    mn = create_empty_multinet("test_coupling_acceleration")
+    add_nets_to_multinet(mn, power=net_power, gas=net_gas)
+
+    demand = 0.3
+    pandapipes.create_sink(net_gas, 2, mdot_kg_per_s=demand)
+    p2g_id_el = pandapower.create_load(net_power, 6, p_mw=10, name="power to gas consumption")
+    p2g_id_gas = pandapipes.create_source(net_gas, 1, 0, name="power to gas feed in")
+    p2g = P2GControlMultiEnergy(mn, p2g_id_el, p2g_id_gas, efficiency=0.5)
+    kgps_per_mw = p2g.conversion_factor_mw_to_kgps() * 0.5
+    # the gas production reduces the power demand with the gain 0.5 of the fixed-point iteration
+    gain, base_mw = 0.5, 5.
+    CompressorLoad(mn, p2g_id_el, base_mw, gain / kgps_per_mw)
+    mdot_p2g = (kgps_per_mw * base_mw + gain * demand) / (1 + gain)
+
+    iterations = dict()
+    for method in CouplingAcceleration.METHODS:
+        mn_method = copy.deepcopy(mn)
+        acceleration = CouplingAcceleration(method, tol=1e-7)
+        run_control(mn_method, coupling_acceleration=acceleration, max_iter_hyd=50)
+        assert np.isclose(mn_method.nets["gas"].source.at[p2g_id_gas, "mdot_kg_per_s"], mdot_p2g,
+                          rtol=0, atol=1e-6)
+        iterations[method] = acceleration.iterations
+    assert iterations["aitken"] < iterations["relaxation"]
+
+    # without feedback, the coupling values converge after the first repetition
+    mn_plain = copy.deepcopy(mn)
+    mn_plain.controller.drop(1, inplace=True)
+    acceleration = CouplingAcceleration()
+    run_control(mn_plain, coupling_acceleration=acceleration, max_iter_hyd=50)
+    assert acceleration.iterations == 2
+    assert np.isclose(mn_plain.nets["gas"].source.at[p2g_id_gas, "mdot_kg_per_s"],
+                      10 * kgps_per_mw)
+
+    with pytest.raises(UserWarning):
+        CouplingAcceleration("newton")
+
+
+class SgenRamp(Controller):
+    """ increases the generation of a static generator in the power net in several steps """
+
+    def __init__(self, net, sgen_index, p_mw_steps):
+        super().__init__(net)
+        self.sgen_index = sgen_index
+        self.p_mw_steps = list(p_mw_steps)
+
+    def initialize_control(self, net):
+        self.remaining = list(self.p_mw_steps)
+
+    def is_converged(self, net):
+        return not self.remaining
+
+    def control_step(self, net):
+        net.sgen.at[self.sgen_index, "p_mw"] = self.remaining.pop(0)
+
+
+def test_skip_unchanged_nets(get_gas_example, get_power_example_simple):
+    """ the gas net is not calculated again while only the power net changes """
+    net_gas = copy.deepcopy(get_gas_example)
+    net_power = copy.deepcopy(get_power_example_simple)
+
+    mn = create_empty_multinet("test_skip_unchanged")
+    add_nets_to_multinet(mn, power=net_power, gas=net_gas)
+
+    p2g_id_el = pandapower.create_load(net_power, 6, p_mw=50, name="power to gas consumption")
+    p2g_id_gas = pandapipes.create_source(net_gas, 1, 0, name="power to gas feed in")
+    P2GControlMultiEnergy(mn, p2g_id_el, p2g_id_gas, efficiency=0.5)
+    sgen_id = pandapower.create_sgen(net_power, 5, 0)
+    SgenRamp(net_power, sgen_id, [5, 10, 15])
+    mn_reference = copy.deepcopy(mn)
+
+    gas_runs = list()
+
+    def counting_pipeflow(net, **kwargs):
+        gas_runs.append(net.source.at[p2g_id_gas, "mdot_kg_per_s"])
+        pandapipes.pipeflow(net, **kwargs)
+
+    def run_counted(multinet, **kwargs):
+        del gas_runs[:]
+        run_control(multinet, ctrl_variables={"nets": {"gas": {"run": counting_pipeflow}}},
+                    **kwargs)
+        return len(gas_runs)
+
+    # initial run and three control steps, but only the first one changes the gas net
+    assert run_counted(mn_reference) == 4
+    assert run_counted(mn, skip_unchanged_tol=1e-9) == 2
+    assert net_gas.converged
+    for net_name, table in [("gas", "res_junction"), ("gas", "res_source"), ("power", "res_bus")]:
+        assert np.allclose(mn.nets[net_name][table].values.astype(float),
+                           mn_reference.nets[net_name][table].values.astype(float),
+                           equal_nan=True)
+
+    # a changed coupling input is calculated again
+    net_power.load.at[p2g_id_el, "p_mw"] = 40
+    assert run_counted(mn, skip_unchanged_tol=1e-9) == 2
+    assert np.isclose(net_gas.res_source.at[p2g_id_gas, "mdot_kg_per_s"],
+                      40 / (net_gas.fluid.get_property('hhv') * 3.6) * 0.5)
+
+
+def test_bulk_coupling_control(get_gas_example, get_power_example_simple):
+    """ many coupling points in one controller give the same results as one controller each """
+    net_gas = copy.deepcopy(get_gas_example)
+    net_power = copy.deepcopy(get_power_example_simple)
+
+    mn = create_empty_multinet("test_bulk_coupling")
+    add_nets_to_multinet(mn, power=net_power, gas=net_gas)
+
+    n_units = 20
+    buses, junctions = np.arange(n_units) % 6 + 1, np.arange(n_units) % 5 + 1
+    p2g_el = pandapower.create_loads(net_power, buses, p_mw=np.linspace(0.1, 2., n_units))
+    p2g_gas = pandapipes.create_sources(net_gas, junctions, 0.)
+    g2p_gas = pandapipes.create_sinks(net_gas, junctions, np.linspace(0.001, 0.02, n_units))
+    g2p_el = pandapower.create_sgens(net_power, buses, 0.)
+    net_power.load.loc[p2g_el[::2], "scaling"] = 0.5
+    efficiencies = np.linspace(0.4, 0.7, n_units)
+    ds_p2g = DFData(pd.DataFrame(np.outer([1., 1.5], np.linspace(0.1, 2., n_units)),
+                                 columns=["p2g_%d" % i for i in range(n_units)]))
+    ds_g2p = DFData(pd.DataFrame(np.outer([1., 0.5], np.linspace(0.001, 0.02, n_units)),
+                                 columns=["g2p_%d" % i for i in range(n_units)]))
+    for i in range(n_units):
+        coupled_p2g_const_control(mn, p2g_el[i], p2g_gas[i], efficiencies[i],
+                                  profile_name="p2g_%d" % i, data_source=ds_p2g)
+        coupled_g2p_const_control(mn, g2p_el[i], g2p_gas[i], efficiencies[i],
+                                  profile_name="g2p_%d" % i, data_source=ds_g2p)
+    mn_bulk = copy.deepcopy(mn)
+    bulk = merge_coupling_controls(mn_bulk)
+    assert len(mn_bulk.controller) == 1 and len(bulk) == 2 * n_units
+
+    for multinet in [mn, mn_bulk]:
+        for net in multinet.nets.values():
+            for ctrl in net.controller.object:
+                ctrl.time_step(net, 1)
+        run_control(multinet)
+    for net_name, table, column in [("gas", "source", "mdot_kg_per_s"),
+                                    ("power", "sgen", "p_mw"),
+                                    ("gas", "res_junction", "p_bar"),
+                                    ("power", "res_bus", "vm_pu")]:
+        assert np.allclose(mn_bulk.nets[net_name][table][column].values,
+                           mn.nets[net_name][table][column].values)
+    assert np.isclose(mn_bulk.nets["gas"].source.at[p2g_gas[0], "mdot_kg_per_s"],
+                      1.5 * 0.1 * 0.5 * efficiencies[0] * bulk.conversion_factor_mw_to_kgps())
+
+    # power led G2P units and vectorized arguments of the constructor
+    mn_led = copy.deepcopy(mn)
+    mn_led.controller.drop(mn_led.controller.index, inplace=True)
+    net_power_led = mn_led.nets["power"]
+    net_power_led.sgen.loc[g2p_el, "p_mw"] = np.linspace(1., 2., n_units)
+    bulk_led = BulkCouplingControl(mn_led, g2p_index_power=g2p_el, g2p_index_gas=g2p_gas,
+                                   g2p_efficiency=0.5, calc_gas_from_power=True)
+    run_control(mn_led)
+    assert np.allclose(mn_led.nets["gas"].sink.loc[g2p_gas, "mdot_kg_per_s"],
+                       np.linspace(1., 2., n_units) * bulk_led.conversion_factor_mw_to_kgps() / 0.5)
+
+    with pytest.raises(UserWarning):
+        bulk_led.add_p2g(p2g_el[:2], p2g_gas[:1], 0.5)
+    with pytest.raises(UserWarning):
+        bulk_led.add_g2p(g2p_el[:1], g2p_gas[:1], 0.5, calc_gas_from_power=True)
+    # the efficiencies are required and have to be positive
+    n_controllers = len(mn_led.controller)
+    with pytest.raises(UserWarning, match="has to be given"):
+        BulkCouplingControl(mn_led, p2g_index_power=p2g_el, p2g_index_gas=p2g_gas)
+    assert len(mn_led.controller) == n_controllers
+    with pytest.raises(UserWarning, match="positive"):
+        bulk_led.add_p2g(p2g_el[:2], p2g_gas[:2], [0.5, np.nan])
+    with pytest.raises(UserWarning, match="positive"):
+        bulk_led.add_g2p(g2p_el[:1], g2p_gas[:1], 0., calc_gas_from_power=True)
+
+
 if __name__ == '__main__':
     pytest.main(['-xs', __file__])
@@ -2,6 +2,8 @@
 # and Energy System Technology (IEE), Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+import copy
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -13,12 +15,16 @@ from pandapipes.multinet.create_multinet import create_empty_multinet, add_nets_
 from pandapipes.multinet.timeseries.run_time_series_multinet import run_timeseries
 from pandapipes.test import runpp_with_mark, pipeflow_with_mark
 from pandapipes.test.multinet.test_control_multinet import get_gas_example, get_power_example_simple
+from pandapipes.timeseries import OutputBuffer, TimeSeriesStatistics
 from pandapower.control.controller.const_control import ConstControl
 from pandapower.timeseries.data_sources.frame_data import DFData
 from pandapower.timeseries.output_writer import OutputWriter
 
 
-def test_time_series_p2g_control(get_gas_example, get_power_example_simple):
+@pytest.mark.parametrize("parallel_nets", [False, True])
+@pytest.mark.parametrize("skip_unchanged_tol", [None, 1e-9])
+def test_time_series_p2g_control(get_gas_example, get_power_example_simple, parallel_nets,
+                                 skip_unchanged_tol):
     net_gas = get_gas_example
     net_power = get_power_example_simple
 
@@ -66,7 +72,8 @@ def test_time_series_p2g_control(get_gas_example, get_power_example_simple):
 
     ow_power = OutputWriter(net_power, range(10), log_variables=log_variables)
     max_iter_hyd = 5
-    run_timeseries(mn, range(10), max_iter_hyd=max_iter_hyd)
+    run_timeseries(mn, range(10), max_iter_hyd=max_iter_hyd, parallel_nets=parallel_nets,
+                   skip_unchanged_tol=skip_unchanged_tol)
 
     gas_res = ow_gas.np_results
     power_res = ow_power.np_results
@@ -132,5 +139,70 @@ def test_time_series_p2g_control_run_parameter(get_gas_example, get_power_exampl
     assert net_gas.mark == "pipeflow"
 
 
+def test_time_series_output_buffers_statistics_chunks(get_gas_example, get_power_example_simple):
+    """ default output writers, per-net statistics and parallel parts of the time steps """
+    net_gas = get_gas_example
+    net_power = get_power_example_simple
+    pandapipes.create_sinks(net_gas, [3, 4], 0.003)
+    pandapower.create_load(net_power, 6, 0.004)
+
+    mn = create_empty_multinet('coupled net')
+    add_nets_to_multinet(mn, power=net_power, gas=net_gas)
+
+    n_steps = 8
+    data = pd.DataFrame({'load_p2g_power': np.linspace(0.5, 1.2, n_steps),
+                         'sink_0': np.linspace(0.2, 0.6, n_steps),
+                         'sink_1': np.linspace(0.4, 0.1, n_steps)})
+    pandapipes.create_source(net_gas, 5, 0.)
+    coupled_p2g_const_control(mn, 0, 0, 0.6, initial_run=True, profile_name='load_p2g_power',
+                              data_source=DFData(data))
+    ConstControl(net_gas, 'sink', 'mdot_kg_per_s', [0, 1], profile_name=['sink_0', 'sink_1'],
+                 data_source=DFData(data))
+    mn_parallel = copy.deepcopy(mn)
+
+    statistics = {"power": TimeSeriesStatistics(), "gas": TimeSeriesStatistics()}
+    run_timeseries(mn, range(n_steps), statistics=statistics)
+    # the pandapower net keeps the default output writer of pandapower
+    assert isinstance(mn.nets["gas"].output_writer.iat[0, 0], OutputBuffer)
+    assert type(mn.nets["power"].output_writer.iat[0, 0]) is OutputWriter
+    for net_name in ["power", "gas"]:
+        steps = statistics[net_name].to_dataframe()
+        assert len(steps) == n_steps
+        assert np.all(steps.control_runs >= 1) and np.all(steps.iterations > 0)
+        assert np.all(steps.pf_converged)
+    assert np.all(statistics["gas"].to_dataframe().iterations_hydraulics > 0)
+
+    # the parallel time series requires OutputBuffers for all nets
+    with pytest.raises(UserWarning, match="OutputBuffer"):
+        run_timeseries(mn_parallel, range(n_steps), n_workers=2)
+    OutputBuffer(mn_parallel.nets["power"], range(n_steps),
+                 log_variables=[("res_bus", "vm_pu"), ("res_line", "loading_percent")])
+    parallel_statistics = {"gas": TimeSeriesStatistics()}
+    run_timeseries(mn_parallel, range(n_steps), n_workers=2, statistics=parallel_statistics)
+    assert list(parallel_statistics["gas"].to_dataframe().index) == list(range(n_steps))
+    for net_name, table in [("gas", "res_junction"), ("power", "res_bus")]:
+        output = mn.nets[net_name].output_writer.iat[0, 0].np_results
+        output_parallel = mn_parallel.nets[net_name].output_writer.iat[0, 0].np_results
+        assert output.keys() == output_parallel.keys()
+        for key in output:
+            assert np.allclose(output[key], output_parallel[key])
+        assert np.allclose(mn.nets[net_name][table].values.astype(float),
+                           mn_parallel.nets[net_name][table].values.astype(float), equal_nan=True)
+    assert np.allclose(mn.nets["gas"].output_writer.iat[0, 0].output["res_sink.mdot_kg_per_s"],
+                       data[['sink_0', 'sink_1']].values)
+
+    with pytest.raises(UserWarning):
+        run_timeseries(mn, range(n_steps), statistics={"heat": TimeSeriesStatistics()})
+
+    # controllers with a state from one time step to the next prevent parallel parts
+    mn_parallel.controller.object.at[0].carries_state = True
+    with pytest.raises(UserWarning, match="carry a state"):
+        run_timeseries(mn_parallel, range(n_steps), n_workers=2)
+    mn_parallel.controller.object.at[0].carries_state = False
+    mn_parallel.nets["gas"].controller.object.at[0].carries_state = True
+    with pytest.raises(UserWarning, match="carry a state"):
+        run_timeseries(mn_parallel, range(n_steps), n_workers=2)
+
+
 if __name__ == '__main__':
     pytest.main(['-xs', __file__])
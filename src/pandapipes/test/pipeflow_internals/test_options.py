@@ -4,9 +4,14 @@
 
 import copy
 
+import numpy as np
 import pytest
 
+from pandapower.control.basic_controller import Controller
+
 import pandapipes
+from pandapipes import networks as nw
+from pandapipes.control.run_control import run_control, prepare_run_ctrl
 import pandapipes.pf.pipeflow_setup
 from pandapipes.pf.pipeflow_setup import PipeflowNotConverged
 from pandapipes.pf.pipeflow_setup import _iteration_check
@@ -152,5 +157,181 @@ def test_unrelated_key():
     assert opts == {"unrelated_key": "some_value"}
 
 
+@pytest.mark.parametrize("keep_internals", ["full", "results", "minimal"])
+def test_keep_internals(keep_internals):
+    net = nw.gas_versatility()
+    pandapipes.pipeflow(net, keep_internals=keep_internals)
+    assert ("_pit" in net) == (keep_internals == "full")
+    assert ("_lookups" in net) == (keep_internals == "full")
+    assert "_active_pit" not in net or keep_internals == "full"
+    assert ("_warm_start" in net) == (keep_internals == "minimal")
+    assert not net.res_junction.p_bar.isnull().all()
+
+
+@pytest.mark.parametrize("keep_internals", ["results", "minimal"])
+def test_keep_internals_not_converged(keep_internals):
+    net = nw.gas_versatility()
+    with pytest.raises(PipeflowNotConverged):
+        pandapipes.pipeflow(net, keep_internals=keep_internals, max_iter_hyd=1)
+    assert "_pit" not in net and "_lookups" not in net and "_active_pit" not in net
+    assert "_warm_start" not in net or net["_warm_start"] is None
+
+
+def test_keep_internals_invalid():
+    net = nw.gas_versatility()
+    with pytest.raises(UserWarning):
+        pandapipes.pipeflow(net, keep_internals="nothing")
+
+
+@pytest.mark.parametrize("keep_internals", ["full", "minimal"])
+def test_warm_start(keep_internals):
+    net = nw.gas_versatility()
+    pandapipes.pipeflow(net, keep_internals=keep_internals)
+    cold_iterations = net._internal_results["iterations_hydraulics"]
+    res_junction = net.res_junction.copy()
+
+    pandapipes.pipeflow(net, warm_start=True, keep_internals=keep_internals)
+    assert net._internal_results["iterations_hydraulics"] < cold_iterations
+    assert np.allclose(net.res_junction.values, res_junction.values, atol=1e-5, equal_nan=True)
+
+    # changed structure --> warm start state is not applicable
+    pandapipes.create_junction(net, 1, 293.15)
+    pandapipes.pipeflow(net, warm_start=True, keep_internals=keep_internals)
+    assert net._internal_results["iterations_hydraulics"] == cold_iterations
+
+
+def test_warm_start_fixed_initial_values():
+    net = pandapipes.create_empty_network(fluid="water")
+    juncs = pandapipes.create_junctions(net, 6, 5, 350)
+    pandapipes.create_pipes_from_parameters(net, juncs[[0, 1, 4, 3]], juncs[[1, 2, 5, 4]], 0.5, 100,
+                                            u_w_per_m2k=1, text_k=283, sections=3)
+    pandapipes.create_circ_pump_const_pressure(net, juncs[-1], juncs[0], 5, 2, 360, type='pt')
+    pandapipes.create_heat_consumer(net, juncs[1], juncs[4], controlled_mdot_kg_per_s=1,
+                                    qext_w=50000)
+    pandapipes.create_heat_consumer(net, juncs[2], juncs[3], treturn_k=320, qext_w=30000)
+    pandapipes.pipeflow(net, mode="bidirectional", max_iter_bidirect=30)
+
+    # changed controlled values must not be overwritten by the warm start state
+    net.heat_consumer.loc[0, "controlled_mdot_kg_per_s"] = 1.5
+    net.heat_consumer.loc[1, "treturn_k"] = 315
+    net.circ_pump_pressure.loc[0, "p_flow_bar"] = 5.5
+    pandapipes.pipeflow(net, mode="bidirectional", max_iter_bidirect=30, warm_start=True)
+    res_warm = net.res_heat_consumer.copy()
+    pandapipes.pipeflow(net, mode="bidirectional", max_iter_bidirect=30)
+    assert np.allclose(res_warm.values, net.res_heat_consumer.values, atol=1e-4)
+    assert np.isclose(res_warm.at[0, "mdot_from_kg_per_s"], 1.5)
+    assert np.isclose(res_warm.at[1, "t_to_k"], 315)
+
+
+def test_reuse_structure():
+    net = nw.gas_versatility()
+    pandapipes.pipeflow(net, reuse_structure=True)
+
+    def check_results(changed_lookups):
+        lookups = net["_lookups"]
+        net_cold = copy.deepcopy(net)
+        pandapipes.pipeflow(net_cold)
+        pandapipes.pipeflow(net, reuse_structure=True)
+        assert (net["_lookups"] is not lookups) == changed_lookups
+        for res_table in ["res_junction", "res_pipe", "res_valve", "res_sink"]:
+            assert np.allclose(net[res_table].values, net_cold[res_table].values, equal_nan=True)
+
+    # changed values and connectivity --> lookups are reused
+    net.sink.mdot_kg_per_s *= 1.1
+    check_results(False)
+    assert "_internal_data" in net
+    net.valve.loc[net.valve.index[0], "opened"] = False
+    check_results(False)
+    net.pipe.loc[3, "in_service"] = False
+    check_results(False)
+    net.pipe.loc[3, "in_service"] = True
+    check_results(False)
+
+    # changed structure --> lookups are created again
+    pandapipes.create_junction(net, 1, 293.15)
+    check_results(True)
+
+    # changed number of internal nodes and branches --> lookups are created again
+    net.pipe.sections = 5
+    check_results(True)
+    assert len(net.res_pipe) == len(net.pipe)
+    net.pipe.sections = 1
+    check_results(True)
+    check_results(False)
+
+
+class SinkPressureControl(Controller):
+    """
+    Adapts the mass flow of a sink with the secant method until the pressure at its junction
+    reaches the target pressure.
+    """
+
+    def __init__(self, net, sink, p_target, **kwargs):
+        super().__init__(net, **kwargs)
+        self.sink = sink
+        self.junction = net.sink.at[sink, "junction"]
+        self.p_target = p_target
+        self.last = None
+
+    def initialize_control(self, net):
+        self.last = None
+
+    def is_converged(self, net):
+        return abs(net.res_junction.at[self.junction, "p_bar"] - self.p_target) < 1e-5
+
+    def control_step(self, net):
+        p = net.res_junction.at[self.junction, "p_bar"]
+        mdot = net.sink.at[self.sink, "mdot_kg_per_s"]
+        if self.last is None:
+            mdot_new = mdot * 1.1
+        else:
+            mdot_new = mdot + (self.p_target - p) * (mdot - self.last[0]) / (p - self.last[1])
+        self.last = (mdot, p)
+        net.sink.at[self.sink, "mdot_kg_per_s"] = mdot_new
+
+
+def test_run_control_partial_resolve():
+    net = nw.gas_versatility()
+    pandapipes.pipeflow(net)
+    sink = net.sink.index[0]
+    p_target = net.res_junction.at[net.sink.at[sink, "junction"], "p_bar"] - 0.05
+    SinkPressureControl(net, sink, p_target)
+
+    iterations = dict()
+    for partial_resolve in [False, True]:
+        n = copy.deepcopy(net)
+        iterations[partial_resolve] = list()
+
+        def run(net, **kwargs):
+            pandapipes.pipeflow(net, **kwargs)
+            iterations[partial_resolve].append(net._internal_results["iterations_hydraulics"])
+
+        ctrl_variables = prepare_run_ctrl(n, None)
+        ctrl_variables["run"] = run
+        run_control(n, ctrl_variables=ctrl_variables, partial_resolve=partial_resolve)
+        assert ctrl_variables["run"] is run
+        junction = n.sink.at[sink, "junction"]
+        assert np.isclose(n.res_junction.at[junction, "p_bar"], p_target, atol=1e-5)
+
+    # only the first pipeflow of the control loop is cold started
+    assert len(iterations[False]) > 3
+    assert iterations[True][0] == iterations[False][0]
+    assert max(iterations[True][1:]) < iterations[False][0]
+    assert sum(iterations[True]) < sum(iterations[False])
+
+
+def test_result_dtype():
+    net = nw.gas_versatility()
+    pandapipes.pipeflow(net)
+    res_64 = net.res_junction.p_bar.values.copy()
+    pandapipes.pipeflow(net, result_dtype="float32")
+    for res_table in ["res_junction", "res_pipe", "res_ext_grid", "res_sink"]:
+        assert np.all(net[res_table].dtypes == np.float32)
+    assert net["_pit"]["node"].dtype == np.float64
+    assert np.allclose(net.res_junction.p_bar.values, res_64, rtol=1e-6)
+    with pytest.raises(UserWarning):
+        pandapipes.pipeflow(net, result_dtype="int64")
+
+
 if __name__ == '__main__':
     pytest.main(["test_options.py"])
@@ -0,0 +1,149 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandapower.control import ConstControl
+from pandapower.timeseries import DFData
+
+import pandapipes
+from pandapipes.control import run_control, PressureBandControl, FlowBandControl, \
+    ReturnTemperatureControl, MassStorageLimitControl, MassStorageIntegrationControl, \
+    BulkProfileControl
+from pandapipes.timeseries import run_timeseries
+
+
+def create_branched_net(parallel_pipe=False):
+    net = pandapipes.create_empty_network(fluid="water")
+    j = pandapipes.create_junctions(net, 7, 5, 293.15)
+    pandapipes.create_ext_grid(net, j[0], 6, 293.15)
+    for k in range(2):
+        a, b, c = j[1 + 3 * k:4 + 3 * k]
+        pandapipes.create_pipe_from_parameters(net, j[0], a, 1, 100)
+        if parallel_pipe:
+            pandapipes.create_flow_control(net, a, b, 2.)
+            pandapipes.create_pipe_from_parameters(net, a, c, 1, 100)
+        else:
+            pandapipes.create_pressure_control(net, a, b, b, 4.)
+        pandapipes.create_pipe_from_parameters(net, b, c, 2, 100)
+        pandapipes.create_sink(net, c, 5. * (k + 1))
+    return net
+
+
+def test_pressure_band_control():
+    net = create_branched_net()
+    PressureBandControl(net, None, [3, 6], [3.5, 2.5], [3.6, 2.7], max_p_bar=[5., 4.2])
+    run_control(net)
+    p = net.res_junction.p_bar.values[[3, 6]]
+    assert 3.5 - 1e-4 <= p[0] <= 3.6 + 1e-4
+    # the set point of the second pressure control is limited
+    assert p[1] < 2.5
+    assert np.isclose(net.press_control.at[1, "controlled_p_bar"], 4.2)
+
+    with pytest.raises(UserWarning):
+        PressureBandControl(net, None, [3, 6], 3.5, [3.4, 2.7])
+
+
+def test_pressure_band_control_time_series():
+    net = create_branched_net()
+    ctrl = PressureBandControl(net, None, [3, 6], 3.5, 3.6)
+    loads = pd.DataFrame({"0": [5., 9.], "1": [10., 4.]})
+    ConstControl(net, "sink", "mdot_kg_per_s", net.sink.index, profile_name=["0", "1"],
+                 data_source=DFData(loads))
+    p = list()
+
+    def run_fct(net, **kwargs):
+        pandapipes.pipeflow(net, **kwargs)
+        p.append(net.res_junction.p_bar.values[[3, 6]])
+
+    run_timeseries(net, range(2), verbose=False, run=run_fct)
+    assert np.all((p[-1] >= 3.5 - 1e-4) & (p[-1] <= 3.6 + 1e-4))
+    # the secant of the first control step of a time step does not include the load change
+    assert np.all(ctrl.sensitivity > 0)
+    ctrl.time_step(net, 1)
+    assert ctrl._last_setpoints is None and ctrl._last_measured is None
+
+
+def test_flow_band_control():
+    net = create_branched_net(parallel_pipe=True)
+    # the mass flows of the pipes parallel to the flow controls are limited
+    ctrl = FlowBandControl(net, None, [1, 4], [1., 4.], [2., 5.], measurement_table="res_pipe",
+                           measurement_column="mdot_from_kg_per_s")
+    run_control(net)
+    mdot = net.res_pipe.mdot_from_kg_per_s.values[[1, 4]]
+    assert np.all(mdot >= [1. - 1e-4, 4. - 1e-4]) and np.all(mdot <= [2. + 1e-4, 5. + 1e-4])
+    assert np.allclose(ctrl.sensitivity, -1.)
+
+
+def test_return_temperature_control():
+    net = pandapipes.create_empty_network(fluid="water")
+    juncs = pandapipes.create_junctions(net, 6, 5, 350)
+    pandapipes.create_pipes_from_parameters(net, juncs[[0, 1, 4, 3]], juncs[[1, 2, 5, 4]], 0.5,
+                                            100, u_w_per_m2k=1, text_k=283, sections=3)
+    pandapipes.create_circ_pump_const_pressure(net, juncs[-1], juncs[0], 5, 2, 360, type='pt')
+    pandapipes.create_heat_consumers(net, juncs[[1, 2]], juncs[[4, 3]],
+                                     controlled_mdot_kg_per_s=1, qext_w=[50000, 30000])
+    ReturnTemperatureControl(net, None, [340., 330.], max_mdot_kg_per_s=[2., 0.3])
+    run_control(net, mode="bidirectional", max_iter_bidirect=30)
+    assert np.isclose(net.res_heat_consumer.at[0, "t_to_k"], 340., atol=0.01)
+    # the mass flow of the second heat consumer is limited
+    assert np.isclose(net.heat_consumer.at[1, "controlled_mdot_kg_per_s"], 0.3)
+    assert net.res_heat_consumer.at[1, "t_to_k"] < 330.
+
+
+def test_mass_storage_limit_control():
+    net = pandapipes.create_empty_network(fluid="water")
+    j = pandapipes.create_junctions(net, 2, 5, 293.15)
+    pandapipes.create_ext_grid(net, j[0], 5, 293.15)
+    pandapipes.create_pipe_from_parameters(net, j[0], j[1], 1, 100)
+    for mdot, init_m in [(1., 3000.), (-1., 1000.), (0.5, 500.)]:
+        pandapipes.create_mass_storage(net, j[1], mdot, init_m_stored_kg=init_m,
+                                       min_m_stored_kg=0., max_m_stored_kg=4000.)
+    ctrl = MassStorageLimitControl(net, 3600.)
+    run_control(net)
+    assert np.allclose(net.mass_storage.mdot_kg_per_s.values, [1000. / 3600, -1000. / 3600, 0.5])
+    assert np.isclose(net.res_mass_storage.mdot_kg_per_s.sum(), 1000. / 3600 - 1000. / 3600 + 0.5)
+
+    # the limits are applied in the time step with the current stored mass
+    net.mass_storage["m_stored_kg"] = [4000., 0., 4000.]
+    net.mass_storage["mdot_kg_per_s"] = [-1., 1., 1.]
+    ctrl.time_step(net, 0)
+    assert np.allclose(net.mass_storage.mdot_kg_per_s.values, [-1., 1., 0.])
+    assert ctrl.is_converged(net)
+
+
+def test_mass_storage_integration_control():
+    net = pandapipes.create_empty_network(fluid="water")
+    j = pandapipes.create_junctions(net, 2, 5, 293.15)
+    pandapipes.create_ext_grid(net, j[0], 5, 293.15)
+    pandapipes.create_pipe_from_parameters(net, j[0], j[1], 1, 100)
+    for init_m, max_m in [(3000., 4000.), (1000., 4000.), (500., np.inf)]:
+        pandapipes.create_mass_storage(net, j[1], 0., init_m_stored_kg=init_m,
+                                       min_m_stored_kg=0., max_m_stored_kg=max_m)
+    BulkProfileControl(net, {("mass_storage", "mdot_kg_per_s"): np.tile([1., -1., 0.5], (4, 1))})
+    # the buffers are enlarged during the time series
+    ctrl = MassStorageIntegrationControl(net, 3600., n_time_steps=2)
+    run_timeseries(net, range(4), verbose=False)
+    m_stored, soc = ctrl.get_trajectories()
+    assert list(m_stored.index) == [0, 1, 2, 3]
+    assert np.allclose(m_stored.values, [[4000., 0., 2300.], [4000., 0., 4100.],
+                                         [4000., 0., 5900.], [4000., 0., 7700.]])
+    assert np.allclose(soc.values[:, :2], [[1., 0.]] * 4) and np.all(np.isnan(soc.values[:, 2]))
+    assert np.allclose(net.mass_storage.m_stored_kg.values, [4000., 0., 7700.])
+    assert np.allclose(net.mass_storage.mdot_kg_per_s.values, [0., 0., 0.5])
+
+    ctrl.reset(net)
+    assert np.allclose(net.mass_storage.m_stored_kg.values, [3000., 1000., 500.])
+    assert ctrl.get_trajectories()[0].empty
+
+    # the stored masses depend on the previous time steps
+    assert ctrl.carries_state
+    net.mass_storage["in_service"] = False
+    with pytest.raises(UserWarning, match="carry a state"):
+        run_timeseries(net, range(4), verbose=False, n_workers=2)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
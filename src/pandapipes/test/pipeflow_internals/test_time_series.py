@@ -11,9 +11,17 @@ import pandas as pd
 import pytest
 from pandapower.timeseries import OutputWriter, DFData
 
+import pandapipes
 from pandapipes import networks as nw
-from pandapipes import pp_dir
-from pandapipes.timeseries import run_timeseries, init_default_outputwriter
+from pandapipes import pp_dir, pipeflow, set_user_pf_options
+from pandapipes.control import BulkProfileControl, merge_const_controls
+from pandapipes.pf.pipeflow_setup import PipeflowNotConverged
+from pandapipes.timeseries import run_timeseries, init_default_outputwriter, OutputBuffer, \
+    ChunkedOutputSink, read_chunked_output, get_stored_time_steps, ResultCache, \
+    ChangeDetector, TimeSeriesStatistics, run_transient, run_transient_adaptive
+from pandapipes.timeseries.output_sink import PYARROW_INSTALLED, TABLES_INSTALLED, \
+    _remove_stored_output
+from pandapipes.timeseries.input_state import get_input_state_key
 from pandapipes.test import data_path
 
 try:
@@ -174,6 +182,563 @@ def test_time_series_default_ow():
     run_timeseries(net, time_steps, max_iter_hyd=max_iter_hyd, calc_compression_power = False)
     ow = net.output_writer.iat[0, 0]
     _compare_results(ow)
+    # the default output writer stores the same files as the pandapower OutputWriter
+    assert isinstance(ow, OutputBuffer) and ow.output_file_type == ".p"
+
+
+def test_time_series_float32():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(25)
+    _output_writer(net, time_steps)
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False,
+                   result_dtype="float32")
+    ow = net.output_writer.iat[0, 0]
+    assert all(res.dtype == np.float32 for res in ow.np_results.values())
+    assert net.res_junction.p_bar.dtype == np.float32
+    _compare_results(ow)
+
+
+def test_time_series_output_buffer():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(25)
+    _output_writer(net, time_steps)
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False)
+    ow = net.output_writer.iat[0, 0]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        buffer = OutputBuffer(net, time_steps, output_path=tmp_dir, output_file_type=".npz",
+                              log_variables=[
+            ('res_junction', 'p_bar'), ('res_pipe', 'v_mean_m_per_s'), ('res_pipe', 'reynolds'),
+            ('res_pipe', 'lambda'), ('res_sink', 'mdot_kg_per_s'),
+            ('res_source', 'mdot_kg_per_s'), ('res_ext_grid', 'mdot_kg_per_s')])
+        buffer.log_variable('res_junction', 't_k', index=[12, 3])
+        buffer.log_variable('res_junction', 'p_bar', eval_function=np.max, eval_name="p_max")
+        run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False)
+        assert net.output_writer.iat[0, 0] is buffer
+        _compare_results(buffer)
+        for name, res in ow.np_results.items():
+            assert np.allclose(buffer.np_results[name], res)
+        assert np.allclose(buffer.np_results["p_max"][:, 0],
+                           np.max(buffer.np_results["res_junction.p_bar"], axis=1))
+        assert list(buffer.output["res_junction.t_k"].columns) == [12, 3]
+        assert not np.any(buffer.output["Parameters"]["powerflow_failed"])
+
+        stored = np.load(os.path.join(tmp_dir, "results.npz"))
+        assert np.array_equal(stored["time_steps"], np.arange(25))
+        assert np.array_equal(stored["res_junction.p_bar"], buffer.np_results["res_junction.p_bar"])
+
+
+@pytest.mark.parametrize("mark_failed", [False, True])
+def test_time_series_output_buffer_failed_steps(mark_failed):
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+
+    def run_fct(net, **kwargs):
+        if net.sink.mdot_kg_per_s.sum() < 0:
+            net["converged"] = False
+            raise PipeflowNotConverged
+        pipeflow(net, **kwargs)
+
+    profiles = pd.read_csv(os.path.join(data_path, 'test_time_series_sink_profiles.csv'),
+                           index_col=0).iloc[:3]
+    profiles.iloc[1] *= -1
+    net.controller.object.iat[0].data_source = DFData(profiles)
+    buffer = OutputBuffer(net, range(3), log_variables=[('res_junction', 'p_bar')],
+                          mark_failed=mark_failed)
+    run_timeseries(net, range(3), calc_compression_power=False, run=run_fct,
+                   continue_on_divergence=True)
+    p_bar = buffer.np_results["res_junction.p_bar"]
+    assert buffer.output["Parameters"]["powerflow_failed"].tolist() == [False, True, False]
+    # as in the pandapower OutputWriter, the results of failed time steps are not stored
+    assert np.all(np.isnan(p_bar[1])) if mark_failed else np.all(p_bar[1] == 0)
+    assert np.all(p_bar[[0, 2]] > 0)
+
+
+@pytest.mark.parametrize("file_format", [
+    "npz",
+    pytest.param("parquet", marks=pytest.mark.skipif(not PYARROW_INSTALLED,
+                                                     reason="pyarrow not installed")),
+    pytest.param("hdf5", marks=pytest.mark.skipif(not TABLES_INSTALLED,
+                                                  reason="pytables not installed"))])
+def test_time_series_chunked_output(file_format):
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(25)
+    log_variables = [('res_junction', 'p_bar'), ('res_pipe', 'v_mean_m_per_s'),
+                     ('res_sink', 'mdot_kg_per_s'), ('res_source', 'mdot_kg_per_s'),
+                     ('res_ext_grid', 'mdot_kg_per_s')]
+    buffer = OutputBuffer(net, time_steps, log_variables=list(log_variables))
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sink = ChunkedOutputSink(net, time_steps, tmp_dir, file_format, chunk_size=7,
+                                 log_variables=list(log_variables))
+        run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False)
+        assert sink.np_results["res_junction.p_bar"].shape == (7, len(net.junction))
+        assert np.array_equal(get_stored_time_steps(tmp_dir, file_format), np.arange(25))
+        for name, res in buffer.np_results.items():
+            stored = read_chunked_output(tmp_dir, name, file_format=file_format)
+            assert np.allclose(stored.values, res)
+
+        # subset of elements and time steps
+        junctions = net.junction.index[[5, 1]]
+        subset = read_chunked_output(tmp_dir, "res_junction.p_bar", elements=junctions,
+                                     time_steps=[18, 3, 17], file_format=file_format)
+        assert list(subset.columns) == list(junctions) and list(subset.index) == [3, 17, 18]
+        assert np.allclose(subset.values, buffer.np_results["res_junction.p_bar"][[3, 17, 18]][
+            :, [5, 1]])
+
+        if file_format == "hdf5":
+            # only the given time steps are removed, also if they are not ascending
+            _remove_stored_output(tmp_dir, file_format, [17, 3])
+            assert np.array_equal(get_stored_time_steps(tmp_dir, file_format),
+                                  np.setdiff1d(np.arange(25), [3, 17]))
+
+        # interrupted run that is resumed by appending the remaining time steps
+        ChunkedOutputSink(net, range(10), tmp_dir, file_format, chunk_size=4,
+                          log_variables=list(log_variables))
+        run_timeseries(net, range(10), max_iter_hyd=9, calc_compression_power=False)
+        stored_steps = get_stored_time_steps(tmp_dir, file_format)
+        assert np.array_equal(stored_steps, np.arange(10))
+        remaining = [t for t in time_steps if t not in stored_steps]
+        ChunkedOutputSink(net, remaining, tmp_dir, file_format, chunk_size=4, append=True,
+                          log_variables=list(log_variables))
+        run_timeseries(net, remaining, max_iter_hyd=9, calc_compression_power=False)
+        stored = read_chunked_output(tmp_dir, "res_pipe.v_mean_m_per_s", file_format=file_format)
+        assert np.array_equal(stored.index, np.arange(25))
+        assert np.allclose(stored.values, buffer.np_results["res_pipe.v_mean_m_per_s"])
+
+
+def test_time_series_parallel():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(25)
+    log_variables = [('res_junction', 'p_bar'), ('res_pipe', 'v_mean_m_per_s'),
+                     ('res_sink', 'mdot_kg_per_s'), ('res_ext_grid', 'mdot_kg_per_s')]
+    serial = OutputBuffer(net, time_steps, log_variables=list(log_variables))
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False)
+    res_junction = net.res_junction.copy()
+
+    parallel = OutputBuffer(net, time_steps, log_variables=list(log_variables))
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False, n_workers=3)
+    # the parallel time series uses the same pipeflow options as the sequential one
+    for name, res in serial.np_results.items():
+        assert np.array_equal(parallel.np_results[name], res)
+    assert not np.any(parallel.output["Parameters"]["powerflow_failed"])
+    assert np.allclose(net.res_junction.values, res_junction.values)
+
+    # with warm starts, the results only differ within the tolerance of the pipeflow
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False, n_workers=3,
+                   warm_start=True)
+    for name, res in serial.np_results.items():
+        assert np.allclose(parallel.np_results[name], res, rtol=1e-3, atol=1e-3)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ChunkedOutputSink(net, time_steps, tmp_dir, chunk_size=4,
+                          log_variables=list(log_variables))
+        run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False,
+                       n_workers=2)
+        assert np.array_equal(get_stored_time_steps(tmp_dir), np.arange(25))
+        stored = read_chunked_output(tmp_dir, "res_junction.p_bar")
+        assert np.allclose(stored.values, serial.np_results["res_junction.p_bar"], rtol=1e-3)
+
+    with pytest.raises(UserWarning):
+        _output_writer(net, time_steps)
+        run_timeseries(net, time_steps, max_iter_hyd=9, n_workers=2)
+
+
+def test_time_series_parallel_dependent_time_steps():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    OutputBuffer(net, range(4))
+    with pytest.raises(UserWarning, match="transient"):
+        run_timeseries(net, range(4), n_workers=2, transient=True)
+
+    # controllers with a state from one time step to the next
+    ctrl = net.controller.object.at[0]
+    ctrl.carries_state = True
+    with pytest.raises(UserWarning, match="carry a state"):
+        run_timeseries(net, range(4), n_workers=2, calc_compression_power=False)
+    net.controller.at[0, "in_service"] = False
+    run_timeseries(net, range(4), n_workers=2, calc_compression_power=False)
+
+    pandapipes.create_mass_storage(net, 0, 0.1, init_m_stored_kg=100., max_m_stored_kg=1000.)
+    with pytest.raises(UserWarning, match="mass storages"):
+        run_timeseries(net, range(4), n_workers=2, calc_compression_power=False)
+
+
+def test_time_series_warm_start():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(25)
+    iterations = list()
+
+    def run_fct(net, **kwargs):
+        iterations.append(kwargs.get("warm_start"))
+        pipeflow(net, **kwargs)
+        iterations[-1] = net._internal_results["iterations_hydraulics"]
+
+    cold = OutputBuffer(net, time_steps, log_variables=[('res_junction', 'p_bar')])
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False,
+                   warm_start=False, run=run_fct)
+    cold_iterations = np.array(iterations)
+    iterations.clear()
+    warm = OutputBuffer(net, time_steps, log_variables=[('res_junction', 'p_bar')])
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False,
+                   warm_start=True, run=run_fct)
+    assert np.sum(iterations) < np.sum(cold_iterations)
+    assert np.allclose(warm.np_results["res_junction.p_bar"], cold.np_results["res_junction.p_bar"],
+                       rtol=1e-4)
+
+    # steady-state time series with pipeflow reuse the structure of the previous time step by
+    # default
+    lookups = list()
+
+    class LookupRecorder(control.basic_controller.Controller):
+        def time_step(self, net, time):
+            lookups.append(net.get("_lookups"))
+
+        def is_converged(self, net):
+            return True
+
+    LookupRecorder(net)
+    default = OutputBuffer(net, time_steps, log_variables=[('res_junction', 'p_bar')])
+    run_timeseries(net, time_steps, max_iter_hyd=9, calc_compression_power=False)
+    assert all(lookup is lookups[1] for lookup in lookups[1:])
+    assert np.array_equal(default.np_results["res_junction.p_bar"],
+                          cold.np_results["res_junction.p_bar"])
+
+    # other run functions do not get the option
+    def strict_run_fct(net, **kwargs):
+        assert "reuse_structure" not in kwargs
+        pipeflow(net, **kwargs)
+
+    run_timeseries(net, range(2), max_iter_hyd=9, calc_compression_power=False,
+                   run=strict_run_fct)
+
+
+def test_time_series_cold_fallback():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    warm_starts = list()
+
+    def run_fct(net, **kwargs):
+        warm_starts.append(kwargs.get("warm_start", net.user_pf_options.get("warm_start")))
+        if warm_starts[-1]:
+            raise PipeflowNotConverged
+        # the cold start does not reuse the structure of the previous time step
+        assert not kwargs.get("reuse_structure", False)
+        pipeflow(net, **kwargs)
+
+    buffer = OutputBuffer(net, range(3), log_variables=[('res_junction', 'p_bar')])
+    run_timeseries(net, range(3), calc_compression_power=False, run=run_fct, warm_start=True)
+    assert warm_starts == [True, False] * 3
+    assert not np.any(buffer.output["Parameters"]["powerflow_failed"])
+
+    warm_starts.clear()
+    set_user_pf_options(net, warm_start=True)
+    run_timeseries(net, range(3), calc_compression_power=False, run=run_fct)
+    assert warm_starts == [True, False] * 3
+    assert not np.any(buffer.output["Parameters"]["powerflow_failed"])
+
+
+def test_time_series_result_cache():
+    net = nw.gas_versatility()
+    profiles_sink = pd.read_csv(os.path.join(data_path, 'test_time_series_sink_profiles.csv'),
+                                index_col=0).iloc[:3]
+    profiles_sink = pd.concat([profiles_sink] * 3, ignore_index=True)
+    control.ConstControl(net, element='sink', variable='mdot_kg_per_s',
+                         element_index=net.sink.index.values, data_source=DFData(profiles_sink),
+                         profile_name=net.sink.index.values.astype(str))
+    time_steps = range(9)
+    log_variables = [('res_junction', 'p_bar'), ('res_pipe', 'v_mean_m_per_s')]
+
+    ow = OutputBuffer(net, time_steps, log_variables=log_variables)
+    run_timeseries(net, time_steps, calc_compression_power=False)
+    cache = ResultCache()
+    cached = OutputBuffer(net, time_steps, log_variables=log_variables)
+    run_timeseries(net, time_steps, calc_compression_power=False, result_cache=cache)
+    assert (cache.hits, cache.misses, len(cache)) == (6, 3, 3)
+    for name, res in ow.np_results.items():
+        assert np.array_equal(cached.np_results[name], res)
+
+    # the least recently used states are removed, so that no state is repeated in time
+    cache = ResultCache(max_size=2)
+    run_timeseries(net, time_steps, calc_compression_power=False, result_cache=cache)
+    assert (cache.hits, cache.misses, len(cache)) == (0, 9, 2)
+
+    # with a tolerance, input states that differ only slightly are treated as identical
+    profiles_sink.iloc[3:] *= 1 + 1e-9
+    cache = ResultCache(tol=1e-6)
+    run_timeseries(net, time_steps, calc_compression_power=False, result_cache=cache)
+    assert cache.hits + cache.misses == 9 and cache.hits >= 3
+
+    # string columns (e.g. standard types) and the fluid are part of the input state
+    key = cache.get_key(net)
+    net.pipe.loc[net.pipe.index[0], "std_type"] = "changed_std_type"
+    assert cache.get_key(net) != key
+    net.pipe.loc[net.pipe.index[0], "std_type"] = None
+    assert cache.get_key(net) == key
+    fluid = net.fluid
+    pandapipes.create_fluid_from_lib(net, "hgas", overwrite=True)
+    assert cache.get_key(net) != key
+    net.fluid = fluid
+
+    # on a cache hit, the internals of the previous pipeflow are removed
+    pipeflow(net, calc_compression_power=False)
+    cache.store(net, key)
+    assert cache.load(net, key)
+    assert "_pit" not in net and net._internal_results == dict()
+
+
+def test_time_series_result_cache_transient():
+    # the temperatures of a transient time series change even with constant inputs
+    net = nw.schutterwald_heat(80)
+    net.junction.tfluid_k = 300.
+    ref_net = net.deepcopy()
+    log_variables = [('res_junction', 't_k')]
+    kwargs = dict(mode="sequential", transient=True, dt=60, verbose=False)
+
+    ref = OutputBuffer(ref_net, range(4), log_variables=log_variables)
+    run_timeseries(ref_net, range(4), **kwargs)
+    cache = ResultCache()
+    cached = OutputBuffer(net, range(4), log_variables=log_variables)
+    run_timeseries(net, range(4), result_cache=cache, **kwargs)
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+    assert np.array_equal(cached.np_results["res_junction.t_k"], ref.np_results["res_junction.t_k"])
+    assert np.all(np.diff(cached.np_results["res_junction.t_k"].mean(axis=1)) > 0)
+
+
+def test_time_series_change_detector():
+    net = nw.gas_versatility()
+    # hourly profiles in 15 minute time steps
+    profiles_sink = pd.read_csv(os.path.join(data_path, 'test_time_series_sink_profiles.csv'),
+                                index_col=0).iloc[:4]
+    profiles_sink = profiles_sink.loc[profiles_sink.index.repeat(4)].reset_index(drop=True)
+    control.ConstControl(net, element='sink', variable='mdot_kg_per_s',
+                         element_index=net.sink.index.values, data_source=DFData(profiles_sink),
+                         profile_name=net.sink.index.values.astype(str))
+    time_steps = range(16)
+    log_variables = [('res_junction', 'p_bar'), ('res_pipe', 'v_mean_m_per_s')]
+
+    ow = OutputBuffer(net, time_steps, log_variables=log_variables)
+    run_timeseries(net, time_steps, calc_compression_power=False)
+    detector = ChangeDetector()
+    statistics = TimeSeriesStatistics()
+    sparse = OutputBuffer(net, time_steps, log_variables=log_variables)
+    run_timeseries(net, time_steps, calc_compression_power=False, change_detector=detector,
+                   statistics=statistics)
+    assert (detector.skipped, detector.sparse + detector.full) == (12, 4)
+    assert statistics.summary().at[("steps", "without_pipeflow"), "value"] == 12
+    for name, res in ow.np_results.items():
+        assert np.allclose(sparse.np_results[name], res, rtol=1e-4, atol=1e-4)
+
+    # if only one profile changes, the pipeflows are updated with the last results
+    profiles_sink.iloc[:, 1:] = profiles_sink.iloc[0, 1:].values
+    detector.clear()
+    run_timeseries(net, time_steps, calc_compression_power=False, change_detector=detector)
+    assert (detector.skipped, detector.sparse, detector.full) == (12, 3, 1)
+    pipeflow(net, calc_compression_power=False)
+    assert np.allclose(sparse.np_results["res_junction.p_bar"][-1], net.res_junction.p_bar.values,
+                       rtol=1e-4, atol=1e-6)
+
+    # the change detector shares the input state of the result cache
+    state = detector.get_input_state(net)
+    assert detector.count_changes(state)[0] == 0
+    assert get_input_state_key(state) == ResultCache().get_key(net)
+    net.pipe.loc[net.pipe.index[0], "std_type"] = "changed_std_type"
+    assert detector.count_changes(detector.get_input_state(net))[0] == 1
+    net.pipe.loc[net.pipe.index[0], "std_type"] = None
+    pandapipes.create_fluid_from_lib(net, "hgas", overwrite=True)
+    assert detector.count_changes(detector.get_input_state(net))[0] is None
+
+    with pytest.raises(UserWarning):
+        ChangeDetector(sparse_share=2.)
+
+
+def test_time_series_bulk_profile_control():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(10)
+    log_variables = [('res_junction', 'p_bar'), ('res_sink', 'mdot_kg_per_s')]
+    ow = OutputBuffer(net, time_steps, log_variables=log_variables)
+    run_timeseries(net, time_steps, calc_compression_power=False)
+
+    bulk_net = nw.gas_versatility()
+    _prepare_grid(bulk_net)
+    ctrl = merge_const_controls(bulk_net)
+    assert len(bulk_net.controller) == 1 and bulk_net.controller.object.at[0] is ctrl
+    bulk = OutputBuffer(bulk_net, time_steps, log_variables=log_variables)
+    run_timeseries(bulk_net, time_steps, calc_compression_power=False)
+    for name, res in ow.np_results.items():
+        assert np.array_equal(bulk.np_results[name], res)
+
+    # profiles as arrays for a subset of the elements, also for boolean columns
+    bulk_net.controller.drop(bulk_net.controller.index, inplace=True)
+    mdot = np.tile(bulk_net.sink.mdot_kg_per_s.values[::-1], (3, 1)) * np.arange(1, 4)[:, None]
+    in_service = np.array([[True], [False], [False]])
+    BulkProfileControl(bulk_net, {("sink", "mdot_kg_per_s"): mdot,
+                                  ("pipe", "in_service"): in_service},
+                       time_steps=[5, 6, 7], element_index={("pipe", "in_service"): [3]},
+                       scale_factor=0.5)
+    bulk = OutputBuffer(bulk_net, [5, 6, 7], log_variables=[('res_sink', 'mdot_kg_per_s')])
+    run_timeseries(bulk_net, [5, 6, 7], calc_compression_power=False)
+    assert np.allclose(bulk.np_results["res_sink.mdot_kg_per_s"], mdot * 0.5)
+    assert not bulk_net.pipe.in_service.at[3]
+    assert bulk_net.pipe.in_service.dtype == bool
+    assert not np.any(bulk.output["Parameters"]["powerflow_failed"])
+
+    with pytest.raises(UserWarning, match="shape"):
+        BulkProfileControl(bulk_net, {("sink", "mdot_kg_per_s"): mdot[:, 1:]})
+    with pytest.raises(UserWarning, match="do not exist"):
+        BulkProfileControl(bulk_net, {("sink", "mdot_kg_per_s"): mdot[:, :1]},
+                           element_index={("sink", "mdot_kg_per_s"): [100]})
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_time_series_resume_from_checkpoint(chunked):
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(10)
+    log_variables = [('res_junction', 'p_bar'), ('res_pipe', 'v_mean_m_per_s')]
+    ow = OutputBuffer(net, time_steps, log_variables=log_variables)
+    run_timeseries(net, time_steps, calc_compression_power=False)
+    calls = list()
+
+    def run_fct(net, **kwargs):
+        calls.append(True)
+        if len(calls) == 6:
+            raise PipeflowNotConverged
+        pipeflow(net, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint_path = os.path.join(tmp, "checkpoint.p")
+        if chunked:
+            interrupted = ChunkedOutputSink(net, time_steps, os.path.join(tmp, "results"),
+                                            chunk_size=4, log_variables=log_variables)
+        else:
+            interrupted = OutputBuffer(net, time_steps, log_variables=log_variables)
+        with pytest.raises(PipeflowNotConverged):
+            run_timeseries(net, time_steps, calc_compression_power=False, run=run_fct,
+                           checkpoint_path=checkpoint_path, checkpoint_interval=3)
+
+        resumed_net = nw.gas_versatility()
+        run_timeseries(resumed_net, calc_compression_power=False, run=run_fct,
+                       resume_from=checkpoint_path)
+        # only the time steps after the checkpoint (after 3 time steps) are calculated again
+        assert len(calls) == 6 + 7
+        resumed = resumed_net.output_writer.iat[0, 0]
+        assert resumed is not interrupted
+        for name, res in ow.np_results.items():
+            if chunked:
+                stored = read_chunked_output(os.path.join(tmp, "results"), name)
+                assert np.array_equal(stored.index, time_steps)
+                assert np.array_equal(stored.values, res)
+            else:
+                assert np.array_equal(resumed.np_results[name], res)
+
+        with pytest.raises(UserWarning, match="differ"):
+            run_timeseries(nw.gas_versatility(), range(5), resume_from=checkpoint_path)
+
+
+def test_time_series_statistics():
+    net = nw.gas_versatility()
+    _prepare_grid(net)
+    time_steps = range(6)
+    statistics = TimeSeriesStatistics()
+    ow = OutputBuffer(net, time_steps, log_variables=[('res_junction', 'p_bar')])
+    run_timeseries(net, time_steps, calc_compression_power=False, statistics=statistics)
+
+    steps = statistics.to_dataframe()
+    assert np.array_equal(steps.index, time_steps)
+    assert np.all(steps.control_runs == 1)
+    assert np.all(steps.iterations == steps.iterations_hydraulics)
+    assert np.all(steps.iterations > 0) and steps.pf_converged.all()
+    times = steps[["setup_time_s", "solve_time_s", "extract_time_s", "output_time_s"]]
+    assert np.all(times > 0)
+    assert np.all(times.sum(axis=1) < steps.step_time_s)
+
+    summary = statistics.summary(percentiles=[50, 99], iteration_threshold=3)
+    assert summary.at[("steps", "total"), "value"] == 6
+    assert summary.at[("iterations", "steps_above_3"), "value"] == np.sum(steps.iterations > 3)
+    assert np.isclose(summary.at[("step_time_s", "p99"), "value"],
+                      np.percentile(steps.step_time_s, 99))
+
+    # the statistics of parallel processes are merged
+    parallel = TimeSeriesStatistics()
+    run_timeseries(net, time_steps, calc_compression_power=False, statistics=parallel,
+                   n_workers=2)
+    assert np.array_equal(parallel.to_dataframe().index, time_steps)
+
+    # time steps with results from the result cache need no pipeflow
+    cached = TimeSeriesStatistics()
+    ow = OutputBuffer(net, [0, 1, 0], log_variables=[('res_junction', 'p_bar')])
+    run_timeseries(net, [0, 1, 0], calc_compression_power=False, statistics=cached,
+                   result_cache=ResultCache())
+    assert cached.to_dataframe().control_runs.tolist() == [1, 1, 0]
+    assert cached.summary().at[("steps", "without_pipeflow"), "value"] == 1
+
+
+def test_run_transient():
+    net = nw.schutterwald_heat(80)
+    net.junction.tfluid_k = 300.
+    ref_net = net.deepcopy()
+    n_steps, dt = 10, 60
+
+    def update_inputs(net, step):
+        if step == 6:
+            net.circ_pump_pressure.t_flow_k = 363.15
+
+    out = np.empty((n_steps, len(net.junction)))
+    t_k = run_transient(net, dt, n_steps, update_inputs=update_inputs, out=out)
+    assert np.shares_memory(t_k.values, out)
+    assert np.allclose(t_k.index, np.arange(n_steps) * dt)
+    # only the initial step and the step with the new supply temperature need a pipeflow, all
+    # other steps reuse the factorization of the thermal system matrix
+    assert net._internal_results["transient_full_steps"] == 2
+    assert net._internal_results["transient_factorizations"] == 2
+
+    ref = np.empty_like(out)
+    for step in range(n_steps):
+        update_inputs(ref_net, step)
+        pipeflow(ref_net, mode="sequential", transient=True, dt=dt, simulation_time_step=step)
+        ref[step] = ref_net.res_junction.t_k.values
+    assert np.allclose(t_k.values, ref, rtol=0, atol=1e-6)
+    assert np.all(np.diff(t_k.values[:6].mean(axis=1)) > 0)
+    assert np.allclose(net.res_pipe.t_outlet_k, ref_net.res_pipe.t_outlet_k, rtol=0, atol=1e-6)
+
+    with pytest.raises(UserWarning):
+        run_transient(net, dt, n_steps, mode="hydraulics")
+
+
+def test_run_transient_adaptive():
+    net = nw.schutterwald_heat(80)
+    pipeflow(net, mode="sequential")
+    net.junction.tfluid_k = net.res_junction.t_k.values
+    ref_net = net.deepcopy()
+
+    def update_inputs(net, time):
+        net.circ_pump_pressure.t_flow_k = 363.15 if time >= 3600 else 353.15
+
+    dt_min, duration = 60, 4 * 3600
+    t_k = run_transient_adaptive(net, duration, dt_min, 3600, tol_temp=0.1,
+                                 update_inputs=update_inputs, input_times=[3600])
+    assert np.isclose(t_k.index[-1], duration) and 3600 in t_k.index
+    dts = np.diff(t_k.index.values)
+    # the time steps are refined after the change of the supply temperature and grow afterwards
+    assert dts[t_k.index[:-1] >= 3600][0] == dt_min
+    assert dts.max() >= 16 * dt_min
+    assert len(t_k) < duration / dt_min / 4
+    assert net._internal_results["transient_full_steps"] == 2
+
+    ref = run_transient(ref_net, dt_min, duration // dt_min + 1,
+                        update_inputs=lambda net, step: update_inputs(net, (step - 1) * dt_min))
+    assert np.max(np.abs(ref.loc[t_k.index].values - t_k.values)) < 1
+
+    with pytest.raises(UserWarning):
+        run_transient_adaptive(net, duration, 600, 60)
 
 
 if __name__ == "__main__":
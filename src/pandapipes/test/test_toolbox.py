@@ -343,5 +343,23 @@ def pipeflow_with_mark(net, **kwargs):
     net['mark'] = "pipeflow"
 
 
+def test_memory_report():
+    net = nw.gas_versatility()
+    report = pandapipes.memory_report(net)
+    assert set(report.category) == {"input"}
+    assert np.all(report.loc[report.element == "pipe", "bytes"] > 0)
+
+    pandapipes.pipeflow(net)
+    report = pandapipes.memory_report(net)
+    pipe_pit_bytes = report.loc[(report.category == "pit_branch") & (report.element == "pipe"),
+                                "bytes"].values[0]
+    f, t = pandapipes.get_lookup(net, "branch", "from_to")["pipe"]
+    assert pipe_pit_bytes == net["_pit"]["branch"][f:t].nbytes
+    assert report.loc[report.category == "pit_node", "bytes"].sum() == net["_pit"]["node"].nbytes
+    assert np.all(report.loc[report.category == "active_pit", "droppable"])
+    assert not np.any(report.loc[report.category.isin(["pit_node", "pit_branch", "lookups",
+                                                       "input", "result"]), "droppable"])
+
+
 if __name__ == '__main__':
     n = pytest.main(["test_toolbox.py"])
@@ -2,5 +2,13 @@
 # and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+from pandapipes.timeseries.change_detector import ChangeDetector
+from pandapipes.timeseries.checkpoint import save_checkpoint, load_checkpoint
+from pandapipes.timeseries.output_buffer import OutputBuffer
+from pandapipes.timeseries.output_sink import ChunkedOutputSink, read_chunked_output, \
+    get_stored_time_steps
+from pandapipes.timeseries.result_cache import ResultCache
 from pandapipes.timeseries.run_time_series import run_timeseries
-from pandapipes.timeseries.run_time_series import init_default_outputwriter
+from pandapipes.timeseries.run_time_series import init_default_outputwriter, set_output_dtype
+from pandapipes.timeseries.statistics import TimeSeriesStatistics
+from pandapipes.timeseries.transient import run_transient, run_transient_adaptive
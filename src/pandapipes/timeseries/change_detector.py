@@ -0,0 +1,139 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+from pandapipes.timeseries.input_state import get_input_state, count_changed_inputs
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeDetector:
+    """
+    The ChangeDetector compares the input state of the net before each pipeflow of a time series
+    with the input state of the last converged pipeflow, so that time series in which only few
+    inputs change from one time step to the next (e.g. hourly schedules in 15 minute time steps)
+    are calculated with fewer and cheaper pipeflows:
+
+        - If no input value changed by more than *tol*, the pipeflow is skipped and the results \
+            of the last pipeflow are kept.
+        - If at most the share *sparse_share* of all input values changed, the pipeflow is run \
+            with the options reuse_structure and warm_start, i.e. the internal structures of the \
+            last pipeflow are reused and the pipeflow is initialized with its results. If such a \
+            pipeflow does not converge, it is repeated with a cold start.
+        - Otherwise, the pipeflow is run with the given options.
+
+    The input state is given by all columns of all component tables after the controllers have
+    written their values and by the name of the fluid (c.f. ResultCache). The counters *skipped*, *sparse*
+    and *full* contain the number of pipeflows of each kind.
+
+    :param tol: Tolerance for the comparison of input values. If 0, only identical values are \
+            treated as unchanged.
+    :type tol: float, default 0.
+    :param sparse_share: Maximum share of changed input values for which the cheap update is used
+    :type sparse_share: float, default 0.1
+    """
+
+    def __init__(self, tol=0., sparse_share=0.1):
+        if tol < 0:
+            raise UserWarning("The tolerance of the ChangeDetector must not be negative.")
+        if not 0 <= sparse_share <= 1:
+            raise UserWarning("The sparse_share of the ChangeDetector must be between 0 and 1, "
+                              "not %s." % sparse_share)
+        self.tol = tol
+        self.sparse_share = sparse_share
+        self.skipped = 0
+        self.sparse = 0
+        self.full = 0
+        self._state = None
+
+    def __repr__(self):
+        return "ChangeDetector (%d skipped, %d sparse and %d full pipeflows)" \
+            % (self.skipped, self.sparse, self.full)
+
+    def clear(self):
+        """
+        Removes the stored input state and resets the counters.
+        """
+        self._state = None
+        self.skipped = 0
+        self.sparse = 0
+        self.full = 0
+
+    @staticmethod
+    def get_input_state(net):
+        """
+        Returns the current input state of the net (c.f. pandapipes.timeseries.input_state).
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :return: state - input state of the net
+        :rtype: dict
+        """
+        return get_input_state(net)
+
+    def count_changes(self, state):
+        """
+        Returns the number of input values that changed by more than the tolerance compared to the
+        stored input state and the total number of input values.
+
+        :param state: The current input state (c.f. get_input_state)
+        :type state: dict
+        :return: (n_changed, n_total) - n_changed is None if no input state is stored or if the \
+                fluid, the tables, the indices or the columns changed
+        :rtype: tuple
+        """
+        return count_changed_inputs(state, self._state, self.tol)
+
+    def store(self, net, state):
+        """
+        Stores the given input state if the last pipeflow of the net converged, otherwise removes
+        the stored input state.
+        """
+        self._state = state if net.get("converged", False) else None
+
+
+def run_on_input_change(run_fct, detector, errors, net, **kwargs):
+    """
+    Runs the given run function depending on the changes of the input state of the net since the
+    last converged run (c.f. ChangeDetector).
+
+    :param run_fct: The run function (e.g. pipeflow)
+    :type run_fct: function
+    :param detector: The change detector
+    :type detector: ChangeDetector
+    :param errors: The errors of the run function that indicate a failed calculation
+    :type errors: tuple
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param kwargs: Keyword arguments for the run function
+    :type kwargs: dict
+    :return: No output
+    """
+    if kwargs.get("transient", False):
+        # the state of a transient calculation changes even with constant inputs
+        run_fct(net, **kwargs)
+        return
+    state = detector.get_input_state(net)
+    n_changed, n_total = detector.count_changes(state)
+    if n_changed == 0:
+        logger.debug("The inputs did not change, the results of the last pipeflow are kept.")
+        detector.skipped += 1
+        return
+    detector._state = None
+    if n_changed is None or n_changed > detector.sparse_share * n_total:
+        detector.full += 1
+        run_fct(net, **kwargs)
+    else:
+        detector.sparse += 1
+        try:
+            run_fct(net, **dict(kwargs, reuse_structure=True, warm_start=True))
+        except errors:
+            logger.info("The warm started calculation of the changed inputs did not converge. It "
+                        "is repeated with a cold start.")
+            run_fct(net, **dict(kwargs, reuse_structure=False, warm_start=False))
+    detector.store(net, state)
@@ -0,0 +1,86 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import os
+import pickle
+
+from pandapipes.timeseries.output_buffer import OutputBuffer
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+def save_checkpoint(net, time_steps, n_completed, checkpoint_path):
+    """
+    Stores the state of a time series after *n_completed* time steps in a checkpoint file, from
+    which the time series can be continued with run_timeseries(resume_from=checkpoint_path).
+
+    The checkpoint contains the complete net, i.e. also the controllers with their states and data
+    sources, the current input values (e.g. the stored mass of mass storages) and the internal
+    structures or the warm start state of the last pipeflow. Additionally, the buffers of the
+    output writer (for a ChunkedOutputSink also the position of the time steps that are already
+    written to disk) are stored. The file is replaced only after the new checkpoint is completely
+    written.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param time_steps: All time steps of the time series
+    :type time_steps: list
+    :param n_completed: The number of time steps that are completed
+    :type n_completed: int
+    :param checkpoint_path: The path of the checkpoint file
+    :type checkpoint_path: str
+    :return: No output
+    """
+    ow = net.output_writer.iat[0, 0]
+    if not isinstance(ow, OutputBuffer):
+        raise UserWarning("Checkpoints require an OutputBuffer or a ChunkedOutputSink as output "
+                          "writer.")
+    output_state = ow.get_state()
+    # the buffers are stored only once as part of the output state, and the options of the last
+    # pipeflow (which contain the run function of the time series) are set again in the next one
+    np_results, ow.np_results = ow.np_results, dict()
+    options = net.pop("_options", None)
+    try:
+        pickled_net = pickle.dumps(net, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        ow.np_results = np_results
+        if options is not None:
+            net["_options"] = options
+    checkpoint = {"net": pickled_net, "time_steps": list(time_steps), "n_completed": n_completed,
+                  "output_state": output_state}
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, checkpoint_path)
+    logger.debug("Checkpoint after %d time steps written to %s" % (n_completed, checkpoint_path))
+
+
+def load_checkpoint(net, checkpoint_path):
+    """
+    Restores the state of a time series from a checkpoint file (c.f. save_checkpoint). The content
+    of the given net is replaced by the net of the checkpoint, and the output writer restores its
+    buffers when it is initialized for the time series.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param checkpoint_path: The path of the checkpoint file
+    :type checkpoint_path: str
+    :return: time_steps - all time steps of the time series, n_completed - the number of \
+            completed time steps
+    :rtype: list, int
+    """
+    with open(checkpoint_path, "rb") as f:
+        checkpoint = pickle.load(f)
+    stored_net = pickle.loads(checkpoint["net"])
+    net.clear()
+    net.update(stored_net)
+    net.output_writer.iat[0, 0]._resume_state = checkpoint["output_state"]
+    logger.info("Time series resumed after %d of %d time steps from %s"
+                % (checkpoint["n_completed"], len(checkpoint["time_steps"]), checkpoint_path))
+    return checkpoint["time_steps"], checkpoint["n_completed"]
@@ -0,0 +1,121 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# tables and columns that are no inputs of a pipeflow or power flow
+INPUT_STATE_EXCLUDED_TABLES = ["controller", "output_writer"]
+INPUT_STATE_EXCLUDED_COLUMNS = ["geo"]
+
+
+def get_input_tables(net):
+    """
+    Returns the names of the input tables of the net, i.e. the component tables of a pandapipes
+    net or all element tables of a pandapower net (apart from the result tables, the controllers,
+    the output writer and the geodata).
+
+    :param net: The pandapipes or pandapower network
+    :type net: pandapipesNet or pandapowerNet
+    :return: table_names - names of the input tables
+    :rtype: list
+    """
+    if "component_list" in net:
+        return [comp.table_name() for comp in net.component_list if comp.table_name() in net]
+    return [key for key, table in net.items() if isinstance(table, pd.DataFrame)
+            and not key.startswith(("res_", "_")) and not key.endswith("_geodata")
+            and key not in INPUT_STATE_EXCLUDED_TABLES]
+
+
+def get_input_state(net):
+    """
+    Returns the input state of the net, i.e. all values of the input tables (c.f.
+    get_input_tables) after the controllers have written their values and the name of the fluid.
+    The numerical and boolean columns are stored as float64 array, all other columns (e.g. the
+    standard types of pumps) as hashes of their string representation.
+
+    :param net: The pandapipes or pandapower network
+    :type net: pandapipesNet or pandapowerNet
+    :return: state - dictionary with the fluid name ("fluid") and, for each table, the tuple \
+            (index, numerical columns, numerical values, other columns, hashes of the other \
+            values) ("tables")
+    :rtype: dict
+    """
+    tables = dict()
+    state = {"fluid": str(getattr(net.get("fluid", None), "name", None)), "tables": tables}
+    for table_name in get_input_tables(net):
+        table = net[table_name]
+        numerical = table.select_dtypes(include=[np.number, np.bool_])
+        others = table.columns.difference(numerical.columns) \
+            .difference(INPUT_STATE_EXCLUDED_COLUMNS)
+        hashes = np.column_stack([pd.util.hash_pandas_object(table[column].astype(str),
+                                                             index=False).to_numpy()
+                                  for column in others]) if len(others) \
+            else np.empty((len(table), 0), dtype=np.uint64)
+        tables[table_name] = (table.index.values.copy(), numerical.columns.values,
+                             numerical.to_numpy(dtype=np.float64, copy=True), others.values,
+                             hashes)
+    return state
+
+
+def get_input_state_key(state, tol=0.):
+    """
+    Returns a hash of the given input state. The numerical values are rounded to multiples of
+    *tol* before hashing.
+
+    :param state: The input state (c.f. get_input_state)
+    :type state: dict
+    :param tol: Tolerance for the numerical values. If 0, the values are not rounded.
+    :type tol: float, default 0.
+    :return: key - hash of the input state
+    :rtype: str
+    """
+    key = hashlib.blake2b(digest_size=16)
+    key.update(state["fluid"].encode())
+    for table_name, (index, columns, values, other_columns, hashes) in state["tables"].items():
+        if tol > 0:
+            values = np.round(values / tol)
+        key.update(table_name.encode())
+        key.update(index.astype(np.int64).tobytes())
+        key.update(str(list(columns) + list(other_columns)).encode())
+        key.update(np.ascontiguousarray(values).tobytes())
+        key.update(np.ascontiguousarray(hashes).tobytes())
+    return key.hexdigest()
+
+
+def count_changed_inputs(state, previous, tol=0.):
+    """
+    Returns the number of input values that differ between two input states and the total number
+    of input values. Numerical values are only counted if they differ by more than *tol*.
+
+    :param state: The current input state (c.f. get_input_state)
+    :type state: dict
+    :param previous: The previous input state
+    :type previous: dict
+    :param tol: Absolute tolerance for the numerical values
+    :type tol: float, default 0.
+    :return: (n_changed, n_total) - n_changed is None if there is no previous state or if the \
+            fluid, the tables, the indices or the columns changed
+    :rtype: tuple
+    """
+    tables = state["tables"]
+    n_total = sum(values.size + hashes.size for _, _, values, _, hashes in tables.values())
+    if previous is None or state["fluid"] != previous["fluid"] \
+            or tables.keys() != previous["tables"].keys():
+        return None, n_total
+    n_changed = 0
+    for table_name, (index, columns, values, other_columns, hashes) in tables.items():
+        prev_index, prev_columns, prev_values, prev_other_columns, prev_hashes = \
+            previous["tables"][table_name]
+        if values.shape != prev_values.shape or hashes.shape != prev_hashes.shape \
+                or not np.array_equal(index, prev_index) \
+                or not np.array_equal(columns, prev_columns) \
+                or not np.array_equal(other_columns, prev_other_columns):
+            return None, n_total
+        n_changed += np.count_nonzero(~np.isclose(values, prev_values, rtol=0, atol=tol,
+                                                  equal_nan=True))
+        n_changed += np.count_nonzero(hashes != prev_hashes)
+    return n_changed, n_total
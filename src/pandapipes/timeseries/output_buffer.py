@@ -0,0 +1,232 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import os
+from time import perf_counter
+from types import FunctionType
+
+import numpy as np
+import pandas as pd
+from pandapower.io_utils import mkdirs_if_not_existent
+from pandapower.timeseries.output_writer import OutputWriter
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutputBuffer(OutputWriter):
+    """
+    The OutputBuffer is a pandapipes specific OutputWriter that stores the logged result columns
+    of each time step directly in preallocated numpy arrays of shape (n_time_steps, n_elements).
+
+    In contrast to the pandapower OutputWriter, the positions of the logged elements in the result
+    tables are only determined once, so that saving the results of a time step is a plain copy of
+    the result columns into the buffers. The buffers are converted to DataFrames (net.output_writer
+    .output) and written to disk only at the end of the time series (or periodically, if
+    *write_time* is given). Logged variables with an evaluation function are handled in the same
+    way as by the pandapower OutputWriter.
+
+    Besides the file types of the OutputWriter, the file type ".npz" can be chosen to store all
+    buffers in one (uncompressed) numpy archive without conversion to DataFrames. By default, the
+    output is written to the same files as by the OutputWriter.
+
+    As in the OutputWriter, the results of time steps in which the pipeflow failed or the
+    controllers did not converge are not stored (i.e. they remain 0), and these time steps are
+    flagged in output["Parameters"] (powerflow_failed, controller_unstable). With
+    *mark_failed=True*, the results of failed time steps are set to NaN instead, and the results of
+    time steps with unconverged controllers are stored.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param time_steps: Time steps to calculate as list or range
+    :type time_steps: list, range
+    :param output_path: Path to a folder where the output is written to
+    :type output_path: str, default None
+    :param output_file_type: Output file type, ".npz" or any type supported by the OutputWriter
+    :type output_file_type: str, default ".p"
+    :param write_time: Time in minutes after which the results are periodically written to disk
+    :type write_time: int, default None
+    :param log_variables: List of tuples with (table, column) values to be logged
+    :type log_variables: list, default None
+    :param dtype: Data type of the result buffers
+    :type dtype: str, default "float64"
+    :param csv_separator: The separator used when writing to csv files
+    :type csv_separator: str, default ";"
+    :param mark_failed: If True, the results of failed time steps are set to NaN and the results \
+            of time steps with unconverged controllers are stored.
+    :type mark_failed: bool, default False
+    """
+
+    def __init__(self, net, time_steps=None, output_path=None, output_file_type=".p",
+                 write_time=None, log_variables=None, dtype="float64", csv_separator=";",
+                 mark_failed=False):
+        self.dtype = np.dtype(dtype).name
+        self.mark_failed = mark_failed
+        self._buffer_lookup = None
+        self._failed = None
+        self._unstable = None
+        self._resume_state = None
+        super().__init__(net, time_steps, output_path, output_file_type, write_time, log_variables,
+                         csv_separator)
+
+    def _add_log_defaults(self):
+        self.default_log_variables = [("res_junction", "p_bar"), ("res_pipe", "v_mean_m_per_s")]
+        super()._add_log_defaults()
+
+    def init_all(self, net):
+        super().init_all(net)
+        self._buffer_lookup = None
+        self._failed = np.zeros(self._n_buffer_rows(), dtype=bool)
+        self._unstable = np.zeros(self._n_buffer_rows(), dtype=bool)
+        if self._resume_state is not None:
+            self.set_state(self._resume_state)
+            self._resume_state = None
+
+    def _n_buffer_rows(self):
+        return len(self.time_steps)
+
+    def _init_np_array(self, partial_func):
+        # same number of columns as in the OutputWriter, but with the given dtype and number of rows
+        index, eval_function = partial_func.args[3], partial_func.args[4]
+        n_columns = len(index)
+        if eval_function is not None:
+            n_columns = 1
+            if isinstance(eval_function, FunctionType) \
+                    and "n_columns" in eval_function.__code__.co_varnames:
+                n_columns = eval_function.__defaults__[0]
+        self.np_results[self._get_np_name(partial_func.args)] = \
+            np.zeros((self._n_buffer_rows(), n_columns), dtype=self.dtype)
+
+    def _init_buffer_lookup(self, net):
+        """
+        Determines for all logged variables without evaluation function the positions of the
+        logged elements in the result tables. All other logged variables are kept as output
+        functions, as in the OutputWriter.
+        """
+        self._buffer_lookup = list()
+        for partial_func in self.output_list:
+            table, variable, _, index, eval_function, eval_name = partial_func.args
+            if eval_function is not None or partial_func.func != self._log \
+                    or table not in net or variable not in net[table]:
+                self._buffer_lookup.append((partial_func, None, None, None))
+                continue
+            res_index = net[table].index
+            positions = res_index.get_indexer(pd.Index(index))
+            if np.any(positions < 0):
+                self._buffer_lookup.append((partial_func, None, None, None))
+                continue
+            if len(positions) == len(res_index) and np.all(positions == np.arange(len(positions))):
+                positions = None
+            self._buffer_lookup.append((partial_func, table, variable, positions))
+
+    def save_results(self, net, time_step, pf_converged, ctrl_converged, recycle_options=None):
+        """
+        Copies the logged result columns of the current time step into the buffers.
+        """
+        self.time_step = time_step
+        time_step_idx = self.time_step_lookup[time_step]
+
+        self._failed[time_step_idx] = not pf_converged
+        self._unstable[time_step_idx] = pf_converged and not ctrl_converged
+        if not pf_converged or (not ctrl_converged and not self.mark_failed):
+            # the rows of the buffers can be reused (e.g. by the ChunkedOutputSink)
+            fill_value = np.nan if self.mark_failed else 0.
+            for res in self.np_results.values():
+                res[time_step_idx, :] = fill_value
+        else:
+            if self._buffer_lookup is None:
+                self._init_buffer_lookup(net)
+            for partial_func, table, variable, positions in self._buffer_lookup:
+                if table is None:
+                    partial_func()
+                    continue
+                res = net[table][variable].values
+                self.np_results[partial_func.__name__][time_step_idx, :] = \
+                    res if positions is None else res[positions]
+
+        if self.write_time is not None:
+            if perf_counter() - self.cur_realtime > self.write_time:
+                self.dump(net)
+        if time_step == self.time_steps[-1]:
+            self.dump(net, recycle_options)
+
+    def merge_results(self, time_steps, np_results, powerflow_failed, controller_unstable):
+        """
+        Writes results of some time steps that were calculated elsewhere (e.g. by another process
+        with a copy of the net) into the buffers.
+
+        :param time_steps: The time steps of the given results
+        :type time_steps: list
+        :param np_results: The buffers with the results of the given time steps (same names as \
+                in np_results of this buffer)
+        :type np_results: dict
+        :param powerflow_failed: Flags if the pipeflow failed in the given time steps
+        :type powerflow_failed: numpy.ndarray
+        :param controller_unstable: Flags if the controllers did not converge in the given time \
+                steps
+        :type controller_unstable: numpy.ndarray
+        :return: No output
+        """
+        rows = np.array([self.time_step_lookup[t] for t in time_steps], dtype=np.int64)
+        for name, res in np_results.items():
+            self.np_results[name][rows] = res
+        self._failed[rows] = powerflow_failed
+        self._unstable[rows] = controller_unstable
+
+    def get_state(self):
+        """
+        Returns the buffers and flags, e.g. to store them in a checkpoint of the time series.
+
+        :return: state - dictionary with the buffers and flags
+        :rtype: dict
+        """
+        return {"np_results": self.np_results, "powerflow_failed": self._failed,
+                "controller_unstable": self._unstable}
+
+    def set_state(self, state):
+        """
+        Copies the buffers and flags of a state (c.f. get_state) into the buffers of this output
+        buffer, which have to be initialized for the same time steps and logged variables.
+
+        :param state: The state to restore
+        :type state: dict
+        :return: No output
+        """
+        for name, res in state["np_results"].items():
+            self.np_results[name][:] = res
+        self._failed[:] = state["powerflow_failed"]
+        self._unstable[:] = state["controller_unstable"]
+
+    def _np_to_pd(self):
+        super()._np_to_pd()
+        if self._failed is not None:
+            self.output["Parameters"]["powerflow_failed"] = self._failed
+            self.output["Parameters"]["controller_unstable"] = self._unstable
+
+    def dump_to_file(self, net, append=False, recycle_options=None):
+        """
+        Saves the buffers to the output_path. For the file type ".npz", all buffers are written into
+        one numpy archive "results.npz", otherwise the output is written as by the OutputWriter.
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :param append: Option for appending instead of overwriting the file (not used for ".npz")
+        :type append: bool, default False
+        :param recycle_options: Not used, only for compatibility with the OutputWriter
+        :type recycle_options: dict, default None
+        :return: No output
+        """
+        if self.output_file_type != ".npz":
+            super().dump_to_file(net, append, recycle_options)
+            return
+        self._np_to_pd()
+        if self.output_path is not None:
+            mkdirs_if_not_existent(self.output_path)
+            np.savez(os.path.join(self.output_path, "results.npz"), time_steps=self.time_steps,
+                     powerflow_failed=self._failed, controller_unstable=self._unstable,
+                     **self.np_results)
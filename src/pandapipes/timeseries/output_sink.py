@@ -0,0 +1,377 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import glob
+import os
+import struct
+import zipfile
+from types import FunctionType
+
+import numpy as np
+import pandas as pd
+from pandapower.io_utils import mkdirs_if_not_existent
+
+from pandapipes.timeseries.output_buffer import OutputBuffer
+
+try:
+    import pyarrow
+    PYARROW_INSTALLED = True
+except ImportError:
+    PYARROW_INSTALLED = False
+
+try:
+    import tables
+    TABLES_INSTALLED = True
+except ImportError:
+    TABLES_INSTALLED = False
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+FILE_FORMATS = ["npz", "parquet", "hdf5"]
+HDF5_FILE_NAME = "results.h5"
+PARAMETERS = "Parameters"
+
+
+class ChunkedOutputSink(OutputBuffer):
+    """
+    The ChunkedOutputSink is an OutputBuffer that only keeps *chunk_size* time steps in memory.
+    Whenever a chunk of time steps is completed, the buffers are appended to files in the
+    output_path, so that the memory stays bounded also for long time series on large nets.
+
+    The following file formats are available:
+
+        - "npz": one numpy archive per logged variable and chunk (no additional dependencies)
+        - "parquet": one parquet file per logged variable and chunk (requires pyarrow)
+        - "hdf5": one HDF5 file with one appendable table per logged variable (requires pytables)
+
+    The results can be read back with :func:`read_chunked_output`, also only for some elements
+    and time steps without loading all results. The time steps that are already stored can be
+    retrieved with :func:`get_stored_time_steps`. With *append=True*, the stored results are kept
+    and the new time steps are appended, e.g. to resume an interrupted time series with the
+    remaining time steps.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param time_steps: Time steps to calculate as list or range
+    :type time_steps: list, range
+    :param output_path: Path to a folder where the output is written to
+    :type output_path: str
+    :param file_format: The file format of the stored results ("npz", "parquet" or "hdf5")
+    :type file_format: str, default "npz"
+    :param chunk_size: Number of time steps that are kept in memory before writing them to disk
+    :type chunk_size: int, default 1000
+    :param log_variables: List of tuples with (table, column) values to be logged
+    :type log_variables: list, default None
+    :param dtype: Data type of the result buffers and stored results
+    :type dtype: str, default "float64"
+    :param append: If True, existing results in the output_path are kept and new results are \
+            appended, otherwise they are removed at the start of the time series.
+    :type append: bool, default False
+    :param mark_failed: If True, the results of failed time steps are set to NaN and the results \
+            of time steps with unconverged controllers are stored (c.f. OutputBuffer).
+    :type mark_failed: bool, default False
+    """
+
+    def __init__(self, net, time_steps=None, output_path=None, file_format="npz",
+                 chunk_size=1000, log_variables=None, dtype="float64", append=False,
+                 mark_failed=False):
+        if output_path is None:
+            raise UserWarning("The ChunkedOutputSink requires an output_path.")
+        _check_file_format(file_format)
+        if int(chunk_size) < 1:
+            raise UserWarning("The chunk_size must be a positive integer, not %s." % chunk_size)
+        self.file_format = file_format
+        self.chunk_size = int(chunk_size)
+        self.append = append
+        self._chunk_start = 0
+        self._step_idx = None
+        super().__init__(net, time_steps, output_path, "." + file_format, None, log_variables,
+                         dtype, mark_failed=mark_failed)
+
+    def init_all(self, net):
+        resume = self._resume_state is not None
+        self._chunk_start = 0
+        super().init_all(net)
+        mkdirs_if_not_existent(self.output_path)
+        if resume:
+            # chunks that were written after the stored state are calculated again
+            _remove_stored_output(self.output_path, self.file_format,
+                                  self.time_steps[self._chunk_start:])
+        elif not self.append:
+            _remove_stored_output(self.output_path, self.file_format)
+        elif len(self.time_steps):
+            stored = get_stored_time_steps(self.output_path, self.file_format)
+            if np.any(np.isin(self.time_steps, stored)):
+                logger.warning("Some of the time steps are already stored in %s and will be stored"
+                               " again." % self.output_path)
+
+    def init_timesteps(self, time_steps):
+        super().init_timesteps(time_steps)
+        # the lookup of the output functions points to the row in the chunk buffers
+        self._step_idx = self.time_step_lookup
+        self.time_step_lookup = {t: idx % self.chunk_size for t, idx in self._step_idx.items()}
+
+    def _n_buffer_rows(self):
+        return min(self.chunk_size, len(self.time_steps))
+
+    def save_results(self, net, time_step, pf_converged, ctrl_converged, recycle_options=None):
+        """
+        Copies the logged result columns of the current time step into the buffers and writes the
+        chunk to disk if it is completed.
+        """
+        super().save_results(net, time_step, pf_converged, ctrl_converged, recycle_options)
+        idx = self._step_idx[time_step]
+        if (idx + 1 - self._chunk_start) == self.chunk_size:
+            self._write_chunk(idx)
+
+    def get_state(self):
+        """
+        Returns the buffers and flags of the current chunk and the position of the first time step
+        that is not yet written to disk.
+
+        :return: state - dictionary with the buffers, flags and written time steps
+        :rtype: dict
+        """
+        state = super().get_state()
+        state["chunk_start"] = self._chunk_start
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self._chunk_start = state["chunk_start"]
+
+    def _np_to_pd(self):
+        # the results are not kept in memory, c.f. read_chunked_output
+        pass
+
+    def dump_to_file(self, net, append=False, recycle_options=None):
+        """
+        Writes the time steps of the current chunk that are not yet stored to disk.
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :param append: Not used, only for compatibility with the OutputWriter
+        :type append: bool, default False
+        :param recycle_options: Not used, only for compatibility with the OutputWriter
+        :type recycle_options: dict, default None
+        :return: No output
+        """
+        if self.time_step is not None and self._step_idx[self.time_step] >= self._chunk_start:
+            self._write_chunk(self._step_idx[self.time_step])
+
+    def _write_chunk(self, last_idx):
+        n_rows = last_idx + 1 - self._chunk_start
+        time_steps = pd.Index(self.time_steps[self._chunk_start:last_idx + 1], name="time_step")
+        for partial_func in self.output_list:
+            name = self._get_np_name(partial_func.args)
+            columns = _output_columns(partial_func)
+            chunk = pd.DataFrame(self.np_results[name][:n_rows], index=time_steps,
+                                 columns=columns)
+            _write(chunk, self.output_path, name, self.file_format)
+        parameters = pd.DataFrame({"powerflow_failed": self._failed[:n_rows],
+                                   "controller_unstable": self._unstable[:n_rows]},
+                                  index=time_steps)
+        _write(parameters, self.output_path, PARAMETERS, self.file_format)
+        self._failed[:] = False
+        self._unstable[:] = False
+        self._chunk_start = last_idx + 1
+
+
+def read_chunked_output(output_path, name, elements=None, time_steps=None, file_format="npz"):
+    """
+    Reads results that were stored by a ChunkedOutputSink. Only the chunks that contain the
+    requested time steps are read, and of these only the rows of the requested time steps (and,
+    for parquet and HDF5 files, only the requested columns).
+
+    :param output_path: The output_path of the ChunkedOutputSink
+    :type output_path: str
+    :param name: Name of the logged variable (e.g. "res_junction.p_bar", or the eval_name of \
+            an evaluation function) or "Parameters"
+    :type name: str
+    :param elements: The elements (columns) to read. If None, all elements are read.
+    :type elements: list, default None
+    :param time_steps: The time steps to read. If None, all time steps are read.
+    :type time_steps: list, default None
+    :param file_format: The file format of the stored results ("npz", "parquet" or "hdf5")
+    :type file_format: str, default "npz"
+    :return: results - DataFrame with the time steps as index and the elements as columns
+    :rtype: pandas.DataFrame
+    """
+    _check_file_format(file_format)
+    columns = None if elements is None else [str(e) for e in elements]
+    if file_format == "npz":
+        res = _read_npz(output_path, name, columns, time_steps)
+    elif file_format == "parquet":
+        filters = None if time_steps is None else [("time_step", "in", list(time_steps))]
+        read_columns = None if columns is None else ["time_step"] + columns
+        res = pd.read_parquet(os.path.join(output_path, name), columns=read_columns,
+                              filters=filters).set_index("time_step").sort_index()
+    else:
+        with pd.HDFStore(os.path.join(output_path, HDF5_FILE_NAME), mode="r") as store:
+            where = None if time_steps is None \
+                else _hdf5_coordinates(store, _hdf5_key(name), time_steps)
+            res = store.select(_hdf5_key(name), where=where, columns=columns)
+    res.columns = _restore_labels(res.columns)
+    return res
+
+
+def get_stored_time_steps(output_path, file_format="npz"):
+    """
+    Returns the time steps that are stored by a ChunkedOutputSink in the given output_path.
+
+    :param output_path: The output_path of the ChunkedOutputSink
+    :type output_path: str
+    :param file_format: The file format of the stored results ("npz", "parquet" or "hdf5")
+    :type file_format: str, default "npz"
+    :return: time_steps - The stored time steps
+    :rtype: numpy.ndarray
+    """
+    _check_file_format(file_format)
+    if not _stored_files(output_path, PARAMETERS, file_format):
+        return np.array([], dtype=np.int64)
+    return read_chunked_output(output_path, PARAMETERS, file_format=file_format).index.values
+
+
+def _check_file_format(file_format):
+    if file_format not in FILE_FORMATS:
+        raise UserWarning("The file format %s is not available. Choose one of %s."
+                          % (file_format, FILE_FORMATS))
+    if file_format == "parquet" and not PYARROW_INSTALLED:
+        raise ImportError("The file format 'parquet' requires pyarrow, which is not installed.")
+    if file_format == "hdf5" and not TABLES_INSTALLED:
+        raise ImportError("The file format 'hdf5' requires pytables, which is not installed.")
+
+
+def _output_columns(partial_func):
+    index, eval_function, eval_name = partial_func.args[3:6]
+    if eval_name is not None and eval_function is not None:
+        if not isinstance(eval_function, FunctionType) \
+                or "n_columns" not in eval_function.__code__.co_varnames:
+            return [eval_name]
+    return index
+
+
+def _restore_labels(columns):
+    # the element indices are stored as strings in all file formats
+    try:
+        return pd.Index(columns.astype(np.int64))
+    except (ValueError, TypeError):
+        return columns
+
+
+def _hdf5_key(name):
+    return "/" + name.replace(".", "/")
+
+
+def _hdf5_coordinates(store, key, time_steps):
+    # the rows of the given time steps, which need not be ascending or integer
+    stored_steps = store.select_column(key, "index")
+    return np.flatnonzero(stored_steps.isin(list(time_steps)).values)
+
+
+def _chunk_file_name(chunk, file_format):
+    return "chunk_%012d.%s" % (chunk.index[0], file_format)
+
+
+def _write(chunk, output_path, name, file_format):
+    chunk.columns = [str(c) for c in chunk.columns]
+    if file_format == "hdf5":
+        chunk.to_hdf(os.path.join(output_path, HDF5_FILE_NAME), key=_hdf5_key(name),
+                     format="table", append=True)
+        return
+    variable_path = os.path.join(output_path, name)
+    mkdirs_if_not_existent(variable_path)
+    file_path = os.path.join(variable_path, _chunk_file_name(chunk, file_format))
+    if file_format == "npz":
+        np.savez(file_path, values=chunk.values, time_steps=chunk.index.values,
+                 columns=np.array(chunk.columns, dtype=str))
+    else:
+        chunk.reset_index().to_parquet(file_path, index=False)
+
+
+def _read_npz(output_path, name, columns, time_steps):
+    chunks = list()
+    for file_path in _stored_files(output_path, name, "npz"):
+        # only the time steps and columns are loaded, the values are read row by row below
+        with np.load(file_path) as stored:
+            chunk_steps = stored["time_steps"]
+            stored_columns = pd.Index(stored["columns"])
+        rows = np.arange(len(chunk_steps)) if time_steps is None \
+            else np.flatnonzero(np.isin(chunk_steps, time_steps))
+        if not len(rows):
+            continue
+        cols = slice(None) if columns is None else stored_columns.get_indexer(columns)
+        if columns is not None and np.any(cols < 0):
+            raise UserWarning("The elements %s are not stored for %s."
+                              % (np.array(columns)[cols < 0], name))
+        values = _load_npz_rows(file_path, "values", rows)[:, cols]
+        chunks.append(pd.DataFrame(values, index=pd.Index(chunk_steps[rows], name="time_step"),
+                                   columns=stored_columns[cols]))
+    if not chunks:
+        raise UserWarning("No results for %s are stored in %s." % (name, output_path))
+    return pd.concat(chunks).sort_index()
+
+
+def _load_npz_rows(file_path, key, rows):
+    """
+    Reads the given rows of an array of a numpy archive. As the archives are written without
+    compression, the array is memory-mapped, so that only the requested rows are read from disk.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        info = archive.getinfo(key + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        with np.load(file_path) as stored:
+            return stored[key][rows]
+    with open(file_path, "rb") as f:
+        # the data of a zip member starts after its local header with file name and extra field
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", f.read(4))
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) \
+            else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+    values = np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                       order="F" if fortran_order else "C")
+    try:
+        return np.array(values[rows])
+    finally:
+        del values
+
+
+def _stored_files(output_path, name, file_format):
+    if file_format == "hdf5":
+        file_path = os.path.join(output_path, HDF5_FILE_NAME)
+        if not os.path.isfile(file_path):
+            return []
+        with pd.HDFStore(file_path, mode="r") as store:
+            return [file_path] if _hdf5_key(name) in store else []
+    return sorted(glob.glob(os.path.join(output_path, name, "chunk_*." + file_format)))
+
+
+def _remove_stored_output(output_path, file_format, time_steps=None):
+    # removes all stored chunks or only the chunks starting with one of the given time steps
+    if file_format == "hdf5":
+        file_path = os.path.join(output_path, HDF5_FILE_NAME)
+        if not os.path.isfile(file_path):
+            return
+        if time_steps is None:
+            os.remove(file_path)
+        elif len(time_steps):
+            with pd.HDFStore(file_path, mode="a") as store:
+                for key in store.keys():
+                    coordinates = _hdf5_coordinates(store, key, time_steps)
+                    if len(coordinates):
+                        store.remove(key, where=coordinates)
+        return
+    remove = None if time_steps is None else set(np.asarray(time_steps).tolist())
+    for file_path in glob.glob(os.path.join(output_path, "*", "chunk_*." + file_format)):
+        if remove is None or int(os.path.basename(file_path)[6:18]) in remove:
+            os.remove(file_path)
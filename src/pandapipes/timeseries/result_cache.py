@@ -0,0 +1,155 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+from collections import OrderedDict
+
+from pandapipes.pf.pipeflow_setup import get_warm_start_state, create_internal_results, \
+    RELEASABLE_INTERNALS
+from pandapipes.timeseries.input_state import get_input_state, get_input_state_key
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    The ResultCache stores the results of pipeflows for the input states of the net, so that time
+    steps with the same inputs (e.g. repeating profiles) do not have to be calculated again.
+
+    The input state (c.f. get_input_state) is given by all columns of all component tables (e.g.
+    mdot_kg_per_s of sinks and sources, the set points of external grids, the states of valves,
+    qext_w of heat consumers or the standard types of pumps) after the controllers have written
+    their values, and by the name of the fluid. The numerical values are rounded to multiples of
+    *tol* before hashing, i.e. states that differ by less than the tolerance are usually (but not
+    always, close to the rounding boundaries) treated as identical. On a cache hit, the result
+    tables (and with the pipeflow option warm_start also the warm start state) of the stored
+    pipeflow are copied to the net, and the internal structures and results of the previous
+    pipeflow are removed. If more than *max_size* states are stored, the least recently used state
+    is removed. In transient time series, the cache is not used, as the results also depend on the
+    previous time steps.
+
+    :param max_size: Maximum number of stored states
+    :type max_size: int, default 128
+    :param tol: Tolerance for the comparison of input values. If 0, only identical values are \
+            treated as identical.
+    :type tol: float, default 0.
+    """
+
+    def __init__(self, max_size=128, tol=0.):
+        if int(max_size) < 1:
+            raise UserWarning("The max_size of the ResultCache must be a positive integer, not %s."
+                              % max_size)
+        if tol < 0:
+            raise UserWarning("The tolerance of the ResultCache must not be negative.")
+        self.max_size = int(max_size)
+        self.tol = tol
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return "ResultCache with %d of max. %d states (%d hits, %d misses)" \
+            % (len(self), self.max_size, self.hits, self.misses)
+
+    def clear(self):
+        """
+        Removes all stored states and resets the hit and miss counters.
+        """
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, net):
+        """
+        Returns the hash of the current input state of the net.
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :return: key - hash of the input state
+        :rtype: str
+        """
+        return get_input_state_key(get_input_state(net), self.tol)
+
+    def load(self, net, key):
+        """
+        Copies the stored results for the given key to the net.
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :param key: Hash of the input state (c.f. get_key)
+        :type key: str
+        :return: loaded - True if results were stored for the key, otherwise False
+        :rtype: bool
+        """
+        if key not in self._results:
+            self.misses += 1
+            return False
+        self._results.move_to_end(key)
+        res_tables, warm_start_state = self._results[key]
+        for res_table, res in res_tables.items():
+            net[res_table] = res.copy()
+        # the internal structures and results belong to the previous pipeflow
+        for internal in RELEASABLE_INTERNALS + ["_warm_start"]:
+            net.pop(internal, None)
+        create_internal_results(net)
+        if warm_start_state is not None:
+            net["_warm_start"] = warm_start_state
+        net["converged"] = True
+        self.hits += 1
+        return True
+
+    def store(self, net, key):
+        """
+        Stores the current results of the net for the given key.
+
+        :param net: The pandapipes network
+        :type net: pandapipesNet
+        :param key: Hash of the input state (c.f. get_key)
+        :type key: str
+        :return: No output
+        """
+        res_tables = {"res_" + comp.table_name(): net["res_" + comp.table_name()].copy()
+                      for comp in net.component_list if "res_" + comp.table_name() in net}
+        warm_start_state = None
+        if net.get("_options", dict()).get("warm_start", False):
+            warm_start_state = get_warm_start_state(net)
+        self._results[key] = (res_tables, warm_start_state)
+        self._results.move_to_end(key)
+        if len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+
+def run_with_result_cache(run_fct, cache, net, **kwargs):
+    """
+    Runs the given run function only if no results are stored in the cache for the current input
+    state of the net. The results of new input states are stored in the cache. Transient
+    calculations are always run, as their results also depend on the previous time steps.
+
+    :param run_fct: The run function (e.g. pipeflow)
+    :type run_fct: function
+    :param cache: The result cache
+    :type cache: ResultCache
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param kwargs: Keyword arguments for the run function
+    :type kwargs: dict
+    :return: No output
+    """
+    if kwargs.get("transient", net.get("user_pf_options", dict()).get("transient", False)):
+        # the state of a transient calculation changes even with constant inputs
+        run_fct(net, **kwargs)
+        return
+    key = cache.get_key(net)
+    if cache.load(net, key):
+        logger.debug("Results loaded from the result cache.")
+        return
+    run_fct(net, **kwargs)
+    cache.store(net, key)
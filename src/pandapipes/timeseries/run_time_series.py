@@ -2,15 +2,25 @@
 # and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 
+import pickle
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from time import perf_counter
 
+import numpy as np
 from pandapipes.control import run_control
 from pandapipes.pipeflow import PipeflowNotConverged, pipeflow
+from pandapipes.timeseries.change_detector import run_on_input_change
+from pandapipes.timeseries.checkpoint import save_checkpoint, load_checkpoint
+from pandapipes.timeseries.output_buffer import OutputBuffer
+from pandapipes.timeseries.output_sink import ChunkedOutputSink
+from pandapipes.timeseries.result_cache import run_with_result_cache
+from pandapipes.timeseries.statistics import run_with_statistics
 from pandapower.control import NetCalculationNotConverged
 from pandapower.control.util.diagnostic import control_diagnostic
-from pandapower.timeseries.output_writer import OutputWriter
 from pandapower.timeseries.run_time_series import init_time_series as init_time_series_pp, cleanup, \
-    print_progress, run_time_step, _call_output_writer
+    print_progress, _call_output_writer, run_time_step as run_time_step_pp
 
 try:
     import pandaplan.core.pplog as logging
@@ -40,7 +50,7 @@ def init_default_outputwriter(net, time_steps, **kwargs):
         
     # If no output_writer exists, create one
     if "output_writer" not in net or net.output_writer.iat[0, 0] is None:
-        ow = OutputWriter(net, time_steps, output_path=tempfile.gettempdir(), log_variables=[])
+        ow = OutputBuffer(net, time_steps, output_path=tempfile.gettempdir(), log_variables=[])
         
         # Define a mapping of network components to result variables
         component_to_variables = {
@@ -95,23 +105,131 @@ def init_time_series(net, time_steps, continue_on_divergence=False, verbose=True
     :type continue_on_divergence: bool, default False
     :param verbose: Prints progress bar or logger debug messages
     :type verbose: bool, default True
-    :param kwargs: Keyword arguments for run_control and runpp
+    :param kwargs: Keyword arguments for run_control and runpp. A ResultCache can be given as \
+            *result_cache* to reuse the results of repeated input states, a ChangeDetector as \
+            *change_detector* to skip or cheapen the pipeflows of unchanged or sparsely changed \
+            inputs, and a TimeSeriesStatistics as *statistics* to collect statistics of each time \
+            step.
     :type kwargs: dict
     :return: ts_variables, kwargs
     :rtype: dict, dict
     """
 
     run = kwargs.pop("run", pipeflow)
+    result_cache = kwargs.pop("result_cache", None)
+    change_detector = kwargs.pop("change_detector", None)
+    statistics = kwargs.pop("statistics", None)
     init_default_outputwriter(net, time_steps, **kwargs)
 
     ts_variables = init_time_series_pp(net, time_steps, continue_on_divergence, verbose, run=run,
                                        **kwargs)
 
     ts_variables["errors"] = tuple([PipeflowNotConverged, NetCalculationNotConverged])
+    if statistics is not None:
+        ts_variables["run"] = partial(run_with_statistics, ts_variables["run"], statistics)
+    user_options = net.get("user_pf_options", dict())
+    transient = kwargs.get("transient", user_options.get("transient", False))
+    if run is pipeflow and not transient and "reuse_structure" not in kwargs \
+            and "reuse_structure" not in user_options:
+        # the time steps of a steady-state time series reuse the lookups, the connectivity check
+        # and the structure of the system matrix of the previous time step by default
+        ts_variables["run"] = partial(ts_variables["run"], reuse_structure=True)
+    if kwargs.get("warm_start", user_options.get("warm_start", False)):
+        ts_variables["run"] = partial(_run_with_cold_fallback, ts_variables["run"],
+                                      ts_variables["errors"])
+    if result_cache is not None:
+        ts_variables["run"] = partial(run_with_result_cache, ts_variables["run"], result_cache)
+    if change_detector is not None:
+        # the change detector has to compare with the results in the net, which might have been
+        # loaded from the result cache
+        ts_variables["run"] = partial(run_on_input_change, ts_variables["run"], change_detector,
+                                      ts_variables["errors"])
+    ts_variables["result_cache"] = result_cache
+    ts_variables["change_detector"] = change_detector
+    ts_variables["statistics"] = statistics
+    set_output_dtype(net, kwargs.get("result_dtype", None))
 
     return ts_variables
 
 
+def _run_with_cold_fallback(run_fct, errors, net, **kwargs):
+    """
+    Runs the given run function. If the calculation was warm started with the results of the
+    previous calculation and did not converge, it is repeated with a cold start and without
+    reusing the internal structures of the previous calculation.
+    """
+    try:
+        run_fct(net, **kwargs)
+    except errors:
+        logger.info("The warm started calculation did not converge. It is repeated with a cold "
+                    "start.")
+        kwargs["warm_start"] = False
+        if kwargs.get("reuse_structure",
+                      net.get("user_pf_options", dict()).get("reuse_structure", False)):
+            kwargs["reuse_structure"] = False
+        run_fct(net, **kwargs)
+
+
+def set_output_dtype(net, result_dtype=None):
+    """
+    Sets the data type of the result arrays of the output writer. If no data type is given, the
+    pipeflow option "result_dtype" (c.f. set_user_pf_options) is used. The results are only stored
+    with this data type, the pipeflow itself is always calculated in float64 precision.
+
+    :param net: The pandapipes format network
+    :type net: pandapipesNet
+    :param result_dtype: The data type of the stored results ("float32" or "float64")
+    :type result_dtype: str, default None
+    :return: No output
+    """
+    if result_dtype is None:
+        result_dtype = net.get("user_pf_options", dict()).get("result_dtype", "float64")
+    if "output_writer" not in net or net.output_writer.iat[0, 0] is None:
+        return
+    ow = net.output_writer.iat[0, 0]
+    ow.np_results = {name: res.astype(result_dtype, copy=False)
+                     for name, res in ow.np_results.items()}
+
+
+def run_time_step(net, time_step, ts_variables, run_control_fct=run_control,
+                  output_writer_fct=_call_output_writer, **kwargs):
+    """
+    Calculates one time step of the time series with the pandapower run_time_step: the controllers
+    (e.g. profiles) are updated for the time step, the control loop (and thereby the pipeflow) is
+    run and the results are handed to the output writer. If a TimeSeriesStatistics is given in the
+    ts_variables, the statistics of the time step are collected in addition.
+
+    :param net: The pandapipes format network (or a multinet)
+    :type net: pandapipesNet
+    :param time_step: The time step to be calculated
+    :type time_step: int
+    :param ts_variables: Contains settings for controller and time series simulation. \n
+                         See init_time_series()
+    :type ts_variables: dict
+    :param run_control_fct: The function that runs the control loop
+    :type run_control_fct: function, default run_control
+    :param output_writer_fct: The function that saves the results of the time step
+    :type output_writer_fct: function, default _call_output_writer
+    :param kwargs: Keyword arguments for run_control and pipeflow
+    :type kwargs: dict
+    :return: No output
+    """
+    statistics = ts_variables.get("statistics", None)
+    if statistics is not None:
+        statistics.start_step(time_step)
+        output_writer_fct = partial(_output_with_statistics, output_writer_fct, statistics)
+    run_time_step_pp(net, time_step, ts_variables, run_control_fct, output_writer_fct, **kwargs)
+
+
+def _output_with_statistics(output_writer_fct, statistics, net, time_step, pf_converged,
+                            ctrl_converged, ts_variables):
+    """
+    Calls the output writer function and completes the statistics of the time step.
+    """
+    output_start = perf_counter()
+    output_writer_fct(net, time_step, pf_converged, ctrl_converged, ts_variables)
+    statistics.finish_step(pf_converged, ctrl_converged, perf_counter() - output_start)
+
 def run_loop(net, ts_variables, run_control_fct=run_control, output_writer_fct=_call_output_writer, **kwargs):
     """
     runs the time series loop which calls pp.runpp (or another run function) in each iteration
@@ -122,16 +240,142 @@ def run_loop(net, ts_variables, run_control_fct=run_control, output_writer_fct=_
     ts_variables - settings for time series
 
     """
-    for i, time_step in enumerate(ts_variables["time_steps"]):
+    time_steps = ts_variables["time_steps"]
+    checkpoint_path = ts_variables.get("checkpoint_path", None)
+    for i in range(ts_variables.get("start_index", 0), len(time_steps)):
+        time_step = time_steps[i]
         print_progress(i, time_step, ts_variables["time_steps"], ts_variables["verbose"], ts_variables=ts_variables,
                        **kwargs)
         transient = kwargs.get('transient', False)
         if transient:
             kwargs["simulation_time_step"] = i
         run_time_step(net, time_step, ts_variables, run_control_fct, output_writer_fct, **kwargs)
+        if checkpoint_path is not None and (i + 1) % ts_variables["checkpoint_interval"] == 0 \
+                and i + 1 < len(time_steps):
+            save_checkpoint(net, time_steps, i + 1, checkpoint_path)
+
+
+def check_independent_time_steps(net, **kwargs):
+    """
+    Checks if the time steps of a time series are independent of each other, so that they can be
+    calculated in parallel. This is not the case for transient time series, for nets with mass
+    storages in service and for nets with controllers in service that carry a state from one
+    time step to the next (i.e. whose attribute *carries_state* is True).
+
+    :param net: The pandapipes format network
+    :type net: pandapipesNet
+    :param kwargs: Keyword arguments for run_control and pipeflow
+    :type kwargs: dict
+    :return: No output
+    """
+    if kwargs.get("transient", False):
+        raise UserWarning("The time steps of a transient time series depend on each other and "
+                          "cannot be calculated in parallel.")
+    if "mass_storage" in net and np.any(net.mass_storage.in_service.values):
+        raise UserWarning("The stored masses of the mass storages depend on the previous time "
+                          "steps, so that the time steps cannot be calculated in parallel.")
+    if "controller" in net and len(net.controller):
+        stateful = [str(ctrl) for ctrl, in_service in
+                    zip(net.controller.object.values, net.controller.in_service.values)
+                    if in_service and getattr(ctrl, "carries_state", False)]
+        if stateful:
+            raise UserWarning("The controllers %s carry a state from one time step to the next, "
+                              "so that the time steps cannot be calculated in parallel."
+                              % ", ".join(stateful))
+
+
+def run_loop_parallel(net, ts_variables, n_workers, **kwargs):
+    """
+    Runs the time series loop in several processes. The time steps are split into n_workers
+    contiguous parts, and each process calculates one part with its own copy of the net (which is
+    pickled only once). The results are merged into the output writer of the given net in the
+    order of the time steps.
+
+    This is only valid if the time steps are independent of each other, i.e. not for transient
+    simulations, mass storages or controllers that carry a state from one time step to the next
+    (c.f. check_independent_time_steps), otherwise a UserWarning is raised. The output writer has
+    to be an OutputBuffer or a ChunkedOutputSink (not with HDF5 files). The pipeflow options (e.g.
+    warm_start) are the same as in a sequential time series, so that both yield the same results.
+
+    :param net: The pandapipes format network
+    :type net: pandapipesNet
+    :param ts_variables: Contains settings for controller and time series simulation. \n
+                         See init_time_series()
+    :type ts_variables: dict
+    :param n_workers: Number of processes
+    :type n_workers: int
+    :param kwargs: Keyword arguments for run_control and pipeflow
+    :type kwargs: dict
+    :return: No output
+    """
+    check_independent_time_steps(net, **kwargs)
+    ow = net.output_writer.iat[0, 0]
+    sink = isinstance(ow, ChunkedOutputSink)
+    if not isinstance(ow, OutputBuffer) or (sink and ow.file_format == "hdf5"):
+        raise UserWarning("A parallel time series requires an OutputBuffer or a "
+                          "ChunkedOutputSink with npz or parquet files as output writer.")
+
+    parts = [p for p in np.array_split(np.asarray(ts_variables["time_steps"]), n_workers)
+             if len(p)]
+    # the buffers are initialized again in each process and need not be pickled
+    np_results, ow.np_results = ow.np_results, dict()
+    try:
+        pickled_net = pickle.dumps(net)
+    finally:
+        ow.np_results = np_results
+    kwargs = {k: v for k, v in kwargs.items() if k not in ["output_writer", "progress_function"]}
+    if ts_variables.get("result_cache", None) is not None:
+        # each process uses its own copy of the result cache
+        kwargs["result_cache"] = ts_variables["result_cache"]
+    if ts_variables.get("change_detector", None) is not None:
+        # each process uses its own copy of the change detector
+        kwargs["change_detector"] = ts_variables["change_detector"]
+    if ts_variables.get("statistics", None) is not None:
+        kwargs["statistics"] = ts_variables["statistics"]
+
+    with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+        futures = {executor.submit(_run_time_series_part, pickled_net, part.tolist(),
+                                   ts_variables["continue_on_divergence"], i == len(parts) - 1,
+                                   kwargs): part for i, part in enumerate(parts)}
+        for future in as_completed(futures):
+            part = futures[future]
+            part_results, failed, unstable, res_tables, statistics = future.result()
+            if not sink:
+                ow.merge_results(part, part_results, failed, unstable)
+            if res_tables is not None:
+                for res_table, res in res_tables.items():
+                    net[res_table] = res
+            if statistics is not None:
+                ts_variables["statistics"].merge(statistics)
+            if "progress_bar" in ts_variables:
+                ts_variables["progress_bar"].update(len(part))
+
+    if not sink:
+        ow.time_step = ts_variables["time_steps"][-1]
+        ow.dump(net)
+
+
+def _run_time_series_part(pickled_net, time_steps, continue_on_divergence, return_res_tables,
+                          kwargs):
+    net = pickle.loads(pickled_net)
+    ow = net.output_writer.iat[0, 0]
+    ow.write_time = None
+    if isinstance(ow, ChunkedOutputSink):
+        # all processes append their chunks to the same output path
+        ow.append = True
+    else:
+        ow.output_path = None
+    run_timeseries(net, time_steps, continue_on_divergence, verbose=False, **kwargs)
+    res_tables = {k: net[k] for k in net.keys() if k.startswith("res_")} \
+        if return_res_tables else None
+    statistics = kwargs.get("statistics", None)
+    if isinstance(ow, ChunkedOutputSink):
+        return None, None, None, res_tables, statistics
+    return ow.np_results, ow._failed, ow._unstable, res_tables, statistics
 
 
-def run_timeseries(net, time_steps=None, continue_on_divergence=False, verbose=True, **kwargs):
+def run_timeseries(net, time_steps=None, continue_on_divergence=False, verbose=True, n_workers=1,
+                   checkpoint_path=None, checkpoint_interval=100, resume_from=None, **kwargs):
     """
     Time Series main function
 
@@ -149,14 +393,65 @@ def run_timeseries(net, time_steps=None, continue_on_divergence=False, verbose=T
     :type continue_on_divergence: bool, default False
     :param verbose: Prints progress bar or if *logger.level == Debug*, it prints debug messages
     :type verbose: bool, default True
-    :param kwargs: Keyword arguments for run_control and runpp
+    :param n_workers: Number of processes in which the time steps are calculated. If larger than \
+            1, the time steps are split into contiguous parts that are calculated in parallel \
+            (c.f. run_loop_parallel). Only valid if the time steps are independent of each other.
+    :type n_workers: int, default 1
+    :param checkpoint_path: If given, the state of the time series is stored in this file every \
+            *checkpoint_interval* time steps (c.f. save_checkpoint). Requires an OutputBuffer or \
+            a ChunkedOutputSink as output writer.
+    :type checkpoint_path: str, default None
+    :param checkpoint_interval: Number of time steps between two checkpoints
+    :type checkpoint_interval: int, default 100
+    :param resume_from: Path of a checkpoint file from which an interrupted time series is \
+            continued. The net is restored from the checkpoint and only the time steps that were \
+            not completed are calculated. If time_steps are given, they must be the same as in \
+            the interrupted time series.
+    :type resume_from: str, default None
+    :param kwargs: Keyword arguments for run_control and runpp. If the run function is \
+            pipeflow and the pipeflow option *reuse_structure* is not given here or in the user \
+            options of the net, the time steps of a steady-state time series reuse the \
+            lookups, the connectivity check and the structure of the system matrix of the \
+            previous time step. With the pipeflow option \
+            *warm_start* (given here or in the user options of the net), each time step is \
+            additionally initialized with the results of the previous time step. If such a warm \
+            started time step does not converge, it is repeated with a cold start and without \
+            reusing the structure. With a ResultCache as \
+            *result_cache*, time steps with the same input state as a previous time step are not \
+            calculated again, but the stored results are used. With a ChangeDetector as \
+            *change_detector*, the pipeflow is skipped if no input changed since the last \
+            pipeflow and only updated with the internal structures and results of the last \
+            pipeflow if few inputs changed. With a TimeSeriesStatistics as \
+            *statistics*, the iterations, wall times and convergence of each time step are \
+            collected.
     :type kwargs: dict
     :return: No output
     """
+    if n_workers > 1 and (checkpoint_path is not None or resume_from is not None):
+        raise UserWarning("Checkpoints are not available for parallel time series.")
+    start_index = 0
+    if resume_from is not None:
+        stored_time_steps, start_index = load_checkpoint(net, resume_from)
+        if time_steps is None:
+            time_steps = stored_time_steps
+        elif list(time_steps) != stored_time_steps:
+            raise UserWarning("The time steps differ from the time steps of the checkpoint %s."
+                              % resume_from)
     ts_variables = init_time_series(net, time_steps, continue_on_divergence, verbose, **kwargs)
+    kwargs.pop("result_cache", None)
+    kwargs.pop("change_detector", None)
+    kwargs.pop("statistics", None)
+    ts_variables["start_index"] = start_index
+    ts_variables["checkpoint_path"] = checkpoint_path
+    ts_variables["checkpoint_interval"] = int(checkpoint_interval)
+    if start_index and "progress_bar" in ts_variables:
+        ts_variables["progress_bar"].update(start_index)
     # A bad fix, need to sequence better - before the controllers are activated!
     control_diagnostic(net)
-    run_loop(net, ts_variables, **kwargs)
+    if n_workers > 1:
+        run_loop_parallel(net, ts_variables, n_workers, **kwargs)
+    else:
+        run_loop(net, ts_variables, **kwargs)
 
     # cleanup functions after the last time step was calculated
     cleanup(net, ts_variables)
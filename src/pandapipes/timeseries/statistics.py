@@ -0,0 +1,202 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from pandapipes.pandapipes_net import pandapipesNet
+from pandapipes.pf.pipeflow_setup import create_internal_results
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+STEP_COLUMNS = ["step_time_s", "setup_time_s", "solve_time_s", "extract_time_s", "output_time_s",
+                "control_runs", "iterations", "iterations_hydraulics", "iterations_heat",
+                "pf_converged", "ctrl_converged"]
+SUMMARY_METRICS = ["step_time_s", "setup_time_s", "solve_time_s", "extract_time_s",
+                   "output_time_s", "control_runs", "iterations"]
+
+
+class TimeSeriesStatistics:
+    """
+    Collects statistics of each time step of a time series, if it is given to run_timeseries as
+    *statistics*:
+
+        - **step_time_s**: wall time of the whole time step
+        - **setup_time_s**, **solve_time_s**, **extract_time_s**: wall times of the pipeflows in \
+            the time step (summed up over all runs of the control loop), split into the setup of \
+            the internal structures, the solution of the equation systems and the result extraction
+        - **output_time_s**: wall time of saving the results in the output writer
+        - **control_runs**: number of pipeflows in the control loop (0 if the results were taken \
+            from a ResultCache)
+        - **iterations**, **iterations_hydraulics**, **iterations_heat**: number of Newton-Raphson \
+            iterations of all pipeflows in the time step (for pandapower nets in a multinet, \
+            **iterations** contains the iterations of the power flows)
+        - **pf_converged**, **ctrl_converged**: convergence of the pipeflow and the controllers
+
+    The remaining time of a time step (step_time_s minus the other times) is spent in the
+    controllers and the time series loop itself. The statistics of all time steps can be
+    retrieved with to_dataframe(), a summary with percentiles with summary().
+    """
+
+    def __init__(self):
+        self._steps = list()
+        self._current = None
+        self._step_start = None
+
+    def __len__(self):
+        return len(self._steps)
+
+    def clear(self):
+        """
+        Removes the statistics of all time steps.
+        """
+        self._steps = list()
+        self._current = None
+
+    def start_step(self, time_step):
+        """
+        Starts the collection of the statistics of a time step.
+        """
+        self._step_start = perf_counter()
+        self._current = dict.fromkeys(STEP_COLUMNS, 0)
+        self._current["time_step"] = time_step
+
+    def record_run(self, net, run_time):
+        """
+        Adds the iterations and wall times of a pipeflow of the control loop to the statistics of
+        the current time step.
+
+        :param net: The pandapipes network after the pipeflow
+        :type net: pandapipesNet
+        :param run_time: Wall time of the whole run function
+        :type run_time: float
+        :return: No output
+        """
+        if self._current is None:
+            return
+        internal_results = net.get("_internal_results", dict())
+        setup, solve, extract = [internal_results.get(key, np.nan) for key in
+                                 ("time_setup_s", "time_solve_s", "time_extract_s")]
+        if np.isnan(setup):
+            # the pipeflow did not finish (or another run function is used), so that only the
+            # total wall time of the run is known
+            setup, solve, extract = 0., run_time, 0.
+        current = self._current
+        current["setup_time_s"] += setup
+        current["solve_time_s"] += solve
+        current["extract_time_s"] += extract
+        current["control_runs"] += 1
+        for mode in ("hydraulics", "heat"):
+            current["iterations_" + mode] += internal_results.get("iterations_" + mode, 0)
+        ppc = net.get("_ppc", None)
+        if not isinstance(net, pandapipesNet) and isinstance(ppc, dict):
+            # power flow of a pandapower net
+            current["iterations"] += ppc.get("iterations", 0)
+
+    def finish_step(self, pf_converged, ctrl_converged, output_time):
+        """
+        Completes the statistics of the current time step.
+        """
+        if self._current is None:
+            return
+        current = self._current
+        current["iterations"] += current["iterations_hydraulics"] + current["iterations_heat"]
+        current["output_time_s"] = output_time
+        current["pf_converged"] = pf_converged
+        current["ctrl_converged"] = ctrl_converged
+        current["step_time_s"] = perf_counter() - self._step_start
+        self._steps.append(current)
+        self._current = None
+
+    def merge(self, statistics):
+        """
+        Adds the time steps of other statistics (e.g. of a parallel process) to these statistics.
+
+        :param statistics: The statistics to add
+        :type statistics: TimeSeriesStatistics
+        :return: No output
+        """
+        self._steps.extend(statistics._steps)
+        self._steps.sort(key=lambda step: step["time_step"])
+
+    def to_dataframe(self):
+        """
+        Returns the statistics of all time steps.
+
+        :return: statistics - DataFrame with the time steps as index and the statistics as columns
+        :rtype: pandas.DataFrame
+        """
+        return pd.DataFrame(self._steps, columns=["time_step"] + STEP_COLUMNS) \
+            .set_index("time_step")
+
+    def summary(self, percentiles=(50, 90, 99), iteration_threshold=5):
+        """
+        Returns a summary of the statistics of all time steps, e.g. the 99th percentile of the
+        step time as summary.at[("step_time_s", "p99"), "value"] or the number of time steps that
+        needed more than *iteration_threshold* iterations as summary.at[("iterations", \
+        "steps_above_5"), "value"].
+
+        :param percentiles: The percentiles of the metrics to include
+        :type percentiles: iterable, default (50, 90, 99)
+        :param iteration_threshold: Threshold for the number of time steps with more iterations
+        :type iteration_threshold: int, default 5
+        :return: summary - DataFrame with (metric, statistic) as index and the column "value"
+        :rtype: pandas.DataFrame
+        """
+        steps = self.to_dataframe()
+        index, values = list(), list()
+
+        def add(metric, statistic, value):
+            index.append((metric, statistic))
+            values.append(value)
+
+        add("steps", "total", len(steps))
+        add("steps", "pf_failed", int((~steps.pf_converged.astype(bool)).sum()))
+        add("steps", "ctrl_unstable", int((~steps.ctrl_converged.astype(bool)).sum()))
+        add("steps", "without_pipeflow", int((steps.control_runs == 0).sum()))
+        add("iterations", "steps_above_%d" % iteration_threshold,
+            int((steps.iterations > iteration_threshold).sum()))
+        for metric in SUMMARY_METRICS:
+            metric_values = steps[metric].values.astype(np.float64)
+            empty = not len(metric_values)
+            add(metric, "sum", np.sum(metric_values))
+            add(metric, "mean", np.nan if empty else np.mean(metric_values))
+            for percentile in percentiles:
+                add(metric, "p%s" % percentile,
+                    np.nan if empty else np.percentile(metric_values, percentile))
+            add(metric, "max", np.nan if empty else np.max(metric_values))
+        return pd.DataFrame({"value": values},
+                            index=pd.MultiIndex.from_tuples(index, names=["metric", "statistic"]))
+
+
+def run_with_statistics(run_fct, statistics, net, **kwargs):
+    """
+    Runs the given run function and adds its iterations and wall times to the statistics of the
+    current time step.
+
+    :param run_fct: The run function (e.g. pipeflow)
+    :type run_fct: function
+    :param statistics: The statistics collector
+    :type statistics: TimeSeriesStatistics
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param kwargs: Keyword arguments for the run function
+    :type kwargs: dict
+    :return: No output
+    """
+    if isinstance(net, pandapipesNet):
+        # internal results of a previous pipeflow must not be counted again
+        create_internal_results(net)
+    start = perf_counter()
+    try:
+        run_fct(net, **kwargs)
+    finally:
+        statistics.record_run(net, perf_counter() - start)
@@ -0,0 +1,343 @@
+# Copyright (c) 2020-2026 by Fraunhofer Institute for Energy Economics
+# and Energy System Technology (IEE), Kassel, and University of Kassel. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.linalg import factorized
+
+from pandapipes.idx_branch import TOUTINIT
+from pandapipes.idx_node import TINIT
+from pandapipes.pf.build_system_matrix import build_system_matrix, build_load_vector_heat
+from pandapipes.pf.pipeflow_setup import get_lookup, get_net_option, set_net_option, \
+    check_infeed_number, write_internal_results, PipeflowNotConverged
+from pandapipes.pf.result_extraction import extract_all_results, extract_results_active_pit
+from pandapipes.pipeflow import pipeflow, calculate_thermal_derivatives_active_pit
+from pandapipes.timeseries.input_state import get_input_state, get_input_state_key
+
+try:
+    import pandaplan.core.pplog as logging
+except ImportError:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+# if the temperature corrections of an iteration are not reduced at least by this factor with the
+# reused factorization, the system matrix is factorized again
+MIN_CONTRACTION = 0.25
+
+
+class _ThermalStepper:
+    """
+    Calculates time steps of the transient temperature equations on the internal structures of the
+    last pipeflow, i.e. with fixed hydraulic results and connectivity. The thermal system matrix
+    is only factorized once per time step size and reused (as simplified Newton method) in all
+    iterations and time steps, as it only changes with the (slightly temperature dependent) fluid
+    properties. If the corrections of the iterations decrease too slowly, the matrix is factorized
+    again.
+    """
+
+    def __init__(self, net, mode, **kwargs):
+        self.net = net
+        self.mode = mode
+        self.kwargs = kwargs
+        self.n_factorizations = 0
+        self.n_full_steps = 0
+        self.iterations = 0
+        self._input_key = None
+        self._results_current = True
+
+    def full_step(self, dt, step):
+        """
+        Calculates a time step with a complete pipeflow (also updating the hydraulic results).
+        """
+        net = self.net
+        if not self._results_current:
+            extract_results_active_pit(net, mode="heat_transfer")
+        pipeflow(net, mode=self.mode, transient=True, dt=dt, simulation_time_step=step,
+                 **self.kwargs)
+        self.n_full_steps += 1
+        self._results_current = True
+        if self._input_key is not None:
+            # the pipeflow can add or convert columns of the component tables
+            self._input_key = get_input_state_key(get_input_state(net))
+        self._solvers = dict()
+        self.node_pit = net["_active_pit"]["node"]
+        self.branch_pit = net["_active_pit"]["branch"]
+        self.node_pit_old = net["_active_old_pit"]["node"]
+        self.branch_pit_old = net["_active_old_pit"]["branch"]
+        self.old_tinit = net["_lookups"]["node_old_pit_cols"][TINIT]
+        self.old_toutinit = net["_lookups"]["branch_old_pit_cols"][TOUTINIT]
+        # positions of the junctions in the active pit of the heat transfer calculation
+        f, t = get_lookup(net, "node", "from_to")["junction"]
+        active_nodes = get_lookup(net, "node", "active_heat_transfer")
+        active_rows = np.cumsum(active_nodes) - 1
+        self.junction_active = active_nodes[f:t]
+        self.junction_rows = active_rows[f:t][self.junction_active]
+
+    def inputs_changed(self):
+        """
+        Checks if any input value of the net changed since the last call.
+        """
+        key = get_input_state_key(get_input_state(self.net))
+        changed = self._input_key is not None and key != self._input_key
+        self._input_key = key
+        return changed
+
+    def get_temperatures(self):
+        return self.node_pit[:, TINIT].copy(), self.branch_pit[:, TOUTINIT].copy()
+
+    def set_temperatures(self, temperatures):
+        self.node_pit[:, TINIT], self.branch_pit[:, TOUTINIT] = temperatures
+
+    def write_junction_temperatures(self, row):
+        row[self.junction_active] = self.node_pit[self.junction_rows, TINIT]
+
+    def step(self, dt, keep_factorization=True):
+        """
+        Calculates the temperatures after the time step *dt* from the current temperatures.
+
+        :param dt: The time step size in s
+        :type dt: float
+        :param keep_factorization: If False, the factorization for this time step size is not \
+                stored for later time steps
+        :type keep_factorization: bool, default True
+        :return: No output
+        """
+        net = self.net
+        node_pit, branch_pit = self.node_pit, self.branch_pit
+        self._results_current = False
+        self.node_pit_old[:, self.old_tinit] = node_pit[:, TINIT]
+        self.branch_pit_old[:, self.old_toutinit] = branch_pit[:, TOUTINIT]
+        set_net_option(net, "dt", dt)
+        max_iter, tol_temp, tol_res = [get_net_option(net, opt) for opt in
+                                       ("max_iter_therm", "tol_T", "tol_res")]
+        len_n = len(node_pit)
+        solver = self._solvers.get(dt)
+        refactorize, error_old = False, np.inf
+        for niter in range(max_iter):
+            calculate_thermal_derivatives_active_pit(net)
+            if not check_infeed_number(node_pit):
+                break
+            if solver is None or refactorize:
+                jacobian, epsilon = build_system_matrix(net, branch_pit, node_pit, True)
+                solver = factorized(jacobian.tocsc())
+                if keep_factorization:
+                    self._solvers[dt] = solver
+                self.n_factorizations += 1
+            else:
+                epsilon = build_load_vector_heat(net, branch_pit, node_pit)
+            x = solver(epsilon)
+            if np.any(np.isnan(x)):
+                break
+            node_pit[:, TINIT] -= x[:len_n]
+            branch_pit[:, TOUTINIT] -= x[len_n:]
+            error = np.max(np.abs(x))
+            if error <= tol_temp and np.max(np.abs(epsilon)) <= tol_res:
+                self.iterations += niter + 1
+                return
+            refactorize = error > MIN_CONTRACTION * error_old
+            error_old = error
+        raise PipeflowNotConverged("The transient heat transfer calculation did not converge to a "
+                                   "solution.")
+
+    def finalize(self):
+        """
+        Writes the current temperatures into the result tables of the net.
+        """
+        net = self.net
+        if not self._results_current:
+            extract_results_active_pit(net, mode="heat_transfer")
+            extract_all_results(net, self.mode)
+            self._results_current = True
+        write_internal_results(net, transient_full_steps=self.n_full_steps,
+                               transient_factorizations=self.n_factorizations,
+                               transient_iterations=self.iterations)
+
+
+def _check_transient_mode(mode):
+    if mode not in ["sequential", "bidirectional"]:
+        raise UserWarning("The transient simulation requires the mode 'sequential' or "
+                          "'bidirectional', not %s." % mode)
+
+
+def run_transient(net, dt, n_steps, update_inputs=None, mode="sequential", out=None, **kwargs):
+    """
+    Runs a transient heat transfer simulation with *n_steps* time steps of the size *dt* and
+    returns the temperature trajectories of all junctions.
+
+    The first time step is a complete pipeflow with the option transient. In all following time
+    steps, only the transient temperature equations are solved on the internal structures of this
+    pipeflow, i.e. the hydraulic results are kept fixed and the connectivity check, the setup of
+    the internal structures and the result extraction are skipped. The sparsity pattern and the
+    factorization of the thermal system matrix are reused between the time steps, as long as the
+    iterations converge quickly.
+
+    If a function *update_inputs(net, step)* is given, it is called before each following time
+    step and can change the inputs of the net (e.g. the supply temperature or the mass flows of
+    the consumers). If any input value changes, the time step is calculated with a complete
+    pipeflow (and the hydraulic results are updated).
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param dt: The time step size in s
+    :type dt: float
+    :param n_steps: The number of time steps
+    :type n_steps: int
+    :param update_inputs: Function to change the inputs of the net before each time step
+    :type update_inputs: function, default None
+    :param mode: The mode of the complete pipeflows ("sequential" or "bidirectional")
+    :type mode: str, default "sequential"
+    :param out: Preallocated array of shape (n_steps, n_junctions) for the junction \
+            temperatures, e.g. a numpy.memmap for long simulations
+    :type out: numpy.ndarray, default None
+    :param kwargs: Additional options for the pipeflow (c.f. pipeflow)
+    :type kwargs: dict
+    :return: t_k - DataFrame with the junction temperatures in K (time in s as index, junction \
+            indices as columns) that uses the array *out*
+    :rtype: pandas.DataFrame
+    """
+    _check_transient_mode(mode)
+    if dt is None or dt <= 0:
+        raise UserWarning("The time step size dt must be positive.")
+    n_junctions = len(net.junction)
+    if out is None:
+        out = np.empty((n_steps, n_junctions), dtype=np.float64)
+    elif out.shape != (n_steps, n_junctions):
+        raise UserWarning("The output array has the shape %s instead of (%d, %d) (time steps, "
+                          "junctions)." % (out.shape, n_steps, n_junctions))
+
+    stepper = _ThermalStepper(net, mode, **kwargs)
+    stepper.full_step(dt, 0)
+    out[0] = net.res_junction.t_k.values
+    if update_inputs is not None:
+        stepper.inputs_changed()
+    for step in range(1, n_steps):
+        if update_inputs is not None:
+            update_inputs(net, step)
+            if stepper.inputs_changed():
+                stepper.full_step(dt, step)
+                out[step] = net.res_junction.t_k.values
+                continue
+        stepper.step(dt)
+        out[step] = out[step - 1]
+        stepper.write_junction_temperatures(out[step])
+    stepper.finalize()
+    return pd.DataFrame(out, index=np.arange(n_steps) * dt, columns=net.junction.index, copy=False)
+
+
+def run_transient_adaptive(net, duration, dt_min, dt_max, tol_temp=0.1, update_inputs=None,
+                           input_times=None, mode="sequential", **kwargs):
+    """
+    Runs a transient heat transfer simulation over *duration* seconds with adaptive time steps
+    and returns the temperature trajectories of all junctions at the accepted time steps.
+
+    As in run_transient, the first time step (and every time step with changed inputs) is a
+    complete pipeflow with the option transient, while the other time steps only solve the
+    transient temperature equations. The local error of each time step is estimated by step
+    doubling, i.e. by comparing the result of one step of the size dt with the result of two steps
+    of the size dt / 2 (which is used as solution). If the maximum temperature difference exceeds
+    *tol_temp*, the step is rejected and repeated with half the step size. If it is below a quarter
+    of *tol_temp* (the local error of the implicit Euler method scales with dt^2), the step size is
+    doubled for the next time step. Thus, large time steps are taken in quasi-stationary periods,
+    and the time steps are refined around sudden changes. The step sizes are always dt_min * 2^k
+    (apart from steps that end at input times or the end of the simulation), so that the
+    factorizations of the thermal system matrix can be reused.
+
+    If a function *update_inputs(net, time)* is given, it is called with the time in s at the start
+    of each time step and can change the inputs of the net, which are then kept until the next
+    time step. If any input value changes (e.g. a new supply temperature or mass flows that cause
+    flow reversals), the time step is calculated with a complete pipeflow and the size dt_min. The
+    time steps end exactly at the given *input_times* (e.g. the times of steps in the supply
+    temperature profile), so that no input change is skipped by a large time step.
+
+    :param net: The pandapipes network
+    :type net: pandapipesNet
+    :param duration: The simulated time in s
+    :type duration: float
+    :param dt_min: The minimum time step size in s (used for the first time step)
+    :type dt_min: float
+    :param dt_max: The maximum time step size in s
+    :type dt_max: float
+    :param tol_temp: The tolerance for the estimated local error of the temperatures in K
+    :type tol_temp: float, default 0.1
+    :param update_inputs: Function to change the inputs of the net at the start of each time step
+    :type update_inputs: function, default None
+    :param input_times: The times in s at which the inputs change
+    :type input_times: list, default None
+    :param mode: The mode of the complete pipeflows ("sequential" or "bidirectional")
+    :type mode: str, default "sequential"
+    :param kwargs: Additional options for the pipeflow (c.f. pipeflow)
+    :type kwargs: dict
+    :return: t_k - DataFrame with the junction temperatures in K (time in s as index, junction \\
+            indices as columns)
+    :rtype: pandas.DataFrame
+    """
+    _check_transient_mode(mode)
+    if dt_min is None or dt_min <= 0 or dt_max < dt_min:
+        raise UserWarning("The time step sizes must fulfill 0 < dt_min <= dt_max.")
+    if tol_temp <= 0:
+        raise UserWarning("The tolerance tol_temp must be positive.")
+    max_level = int(np.floor(np.log2(dt_max / dt_min) + 1e-9))
+    input_times = np.sort(np.asarray([] if input_times is None else input_times, dtype=float))
+    eps_time = 1e-9 * dt_min
+
+    stepper = _ThermalStepper(net, mode, **kwargs)
+    if update_inputs is not None:
+        update_inputs(net, 0.)
+        stepper.inputs_changed()
+    stepper.full_step(dt_min, 0)
+    times, rows = [0.], [net.res_junction.t_k.values.copy()]
+    time, level, n_accepted, n_rejected = 0., 0, 0, 0
+    while duration - time > eps_time:
+        if update_inputs is not None and time > 0:
+            update_inputs(net, time)
+            if stepper.inputs_changed():
+                dt = min(dt_min, duration - time)
+                stepper.full_step(dt, len(times))
+                time += dt
+                times.append(time)
+                rows.append(net.res_junction.t_k.values.copy())
+                level = 0
+                continue
+        dt = dt_min * 2 ** level
+        next_inputs = input_times[input_times > time + eps_time]
+        t_end = min(time + dt, duration, next_inputs[0] if len(next_inputs) else np.inf)
+        regular = t_end - time > dt - eps_time
+        dt = t_end - time
+
+        start = stepper.get_temperatures()
+        try:
+            stepper.step(dt, keep_factorization=regular)
+            full = stepper.get_temperatures()
+            stepper.set_temperatures(start)
+            stepper.step(dt / 2, keep_factorization=regular)
+            stepper.step(dt / 2, keep_factorization=regular)
+            error = max(np.max(np.abs(h - f), initial=0.)
+                        for h, f in zip(stepper.get_temperatures(), full))
+        except PipeflowNotConverged:
+            if dt <= dt_min + eps_time:
+                raise
+            error = np.inf
+        if error > tol_temp and dt > dt_min + eps_time:
+            # repeat the time step with the next smaller regular step size
+            stepper.set_temperatures(start)
+            level = max(int(np.ceil(np.log2(dt / dt_min) - 1e-9)) - 1, 0)
+            n_rejected += 1
+            continue
+        if error > tol_temp:
+            logger.debug("The estimated error %.3g K of the time step at %.1f s exceeds the "
+                         "tolerance with the minimum step size." % (error, time))
+        n_accepted += 1
+        time = t_end
+        times.append(time)
+        row = rows[-1].copy()
+        stepper.write_junction_temperatures(row)
+        rows.append(row)
+        if regular and error <= tol_temp / 4 and level < max_level:
+            level += 1
+
+    stepper.finalize()
+    write_internal_results(net, transient_accepted_steps=n_accepted,
+                           transient_rejected_steps=n_rejected)
+    return pd.DataFrame(np.array(rows), index=np.array(times), columns=net.junction.index)
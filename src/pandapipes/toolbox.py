@@ -3,6 +3,7 @@
 # Use of this source code is governed by a BSD-style license that can be found in the LICENSE file.
 import copy
 import os
+import sys
 from collections.abc import Iterable
 import warnings
 
@@ -638,6 +639,112 @@ def get_internal_tables_pandas(net, convert_types=True):
 
     return node_table, branch_table
 
+_droppable_internals = {
+    "_active_pit": "Only required during the pipeflow, the results are already written to "
+                   "the general pit and the result tables.",
+    "_active_old_pit": "Only required during the pipeflow.",
+    "_old_pit": "Only required for transient simulations (option 'transient').",
+    "_internal_data": "Cached system matrix, only required if 'reuse_internal_data' is set.",
+    "_internal_results": "Iteration statistics of the last pipeflow, only informative.",
+}
+
+
+def _nbytes(obj):
+    """
+    Auxiliary function to estimate the number of bytes used by (nested) internal structures.
+
+    :param obj: the object to evaluate (arrays, sparse matrices, DataFrames or nested containers)
+    :type obj: any
+    :return: nbytes - the estimated number of bytes
+    :rtype: int
+    """
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if hasattr(obj, "data") and hasattr(obj, "nnz"):
+        # scipy sparse matrices (csr, csc, coo)
+        return int(sum(getattr(obj, attr).nbytes for attr in ("data", "indices", "indptr", "row",
+                                                              "col") if hasattr(obj, attr)))
+    if isinstance(obj, dict):
+        return int(sum(_nbytes(v) for v in obj.values()))
+    if isinstance(obj, (list, tuple, set)):
+        return int(sum(_nbytes(v) for v in obj))
+    return int(sys.getsizeof(obj))
+
+
+def memory_report(net):
+    """
+    Break down the memory used by a pandapipes net. Considered are the internal structures \
+    (general pit, active pit, old pit, component arrays, lookups and cached internal data) as well \
+    as the input and result tables. The pit arrays are split up per component type by the \
+    respective from_to lookups.
+
+    The column "droppable" marks internal structures that are not needed after a pipeflow (e.g. \
+    the active pit or cached matrices) and can be removed to reduce the memory footprint. The \
+    column "suggestion" states under which condition they are required.
+
+    :param net: pandapipes network
+    :type net: pandapipesNet
+    :return: report - DataFrame with the columns "category", "element", "bytes", "droppable" and \
+        "suggestion"
+    :rtype: pandas.DataFrame
+
+    :Example:
+        >>> report = memory_report(net)
+        >>> report.groupby("category").bytes.sum()
+    """
+    entries = []
+
+    def add_entry(category, element, nbytes, suggestion=None):
+        entries.append((category, element, nbytes, suggestion is not None,
+                        "" if suggestion is None else suggestion))
+
+    if "_pit" in net:
+        for pit_type in ("node", "branch"):
+            pit = net["_pit"][pit_type]
+            row_bytes = pit.shape[1] * pit.itemsize
+            ft_lookup = net["_lookups"].get("%s_from_to" % pit_type, dict())
+            for tbl, (f, t) in ft_lookup.items():
+                add_entry("pit_" + pit_type, tbl, int((t - f) * row_bytes))
+        for tbl, comp_array in net["_pit"].get("components", dict()).items():
+            add_entry("component_array", tbl, _nbytes(comp_array))
+
+    for key in ("_active_pit", "_old_pit", "_active_old_pit"):
+        if key not in net:
+            continue
+        for pit_type in ("node", "branch"):
+            if pit_type in net[key]:
+                add_entry(key.lstrip("_"), pit_type, _nbytes(net[key][pit_type]),
+                          _droppable_internals[key])
+
+    if "_warm_start" in net and net["_warm_start"] is not None:
+        add_entry("warm_start", "state", _nbytes(net["_warm_start"]))
+
+    for lookup_name, lookup in net.get("_lookups", dict()).items():
+        add_entry("lookups", lookup_name, _nbytes(lookup))
+
+    for key in ("_internal_data", "_internal_results"):
+        if key in net and net[key] is not None:
+            for name, data in net[key].items():
+                add_entry(key.lstrip("_"), name, _nbytes(data), _droppable_internals[key])
+
+    for comp in net.component_list:
+        tbl = comp.table_name()
+        if tbl in net and isinstance(net[tbl], pd.DataFrame):
+            add_entry("input", tbl, _nbytes(net[tbl]))
+        if "res_" + tbl in net and isinstance(net["res_" + tbl], pd.DataFrame):
+            add_entry("result", tbl, _nbytes(net["res_" + tbl]))
+
+    report = pd.DataFrame(entries, columns=["category", "element", "bytes", "droppable",
+                                            "suggestion"])
+    droppable = report.loc[report.droppable, "bytes"].sum()
+    if droppable > 0:
+        logger.info("%d of %d bytes are used by internal structures that can be dropped after "
+                    "the pipeflow." % (droppable, report.bytes.sum()))
+    return report
+
+
 def _deprecation_check_u(kwargs):
     if ("alpha_w_per_m2k" in kwargs) and not ("u_w_per_m2k" in kwargs):
         warnings.warn("The parameter alpha_w_per_m2k has been renamed to u_w_per_m2k "